@@ -0,0 +1,242 @@
+import argparse
+import glob
+import hashlib
+import os
+import numpy as np
+import pygame
+from settings import SCALE, HEADLESS, AS_CACHE, AS_SHEETS, RC_STEPS
+from spritecache import rotations
+
+# sprite sets by name, images of a unit kind and team in costume order
+SETS = {
+    "blueCompany": ('images/blue_battalion.png',
+                    'images/blue_battalion_fire.png',
+                    'images/blue_square.png',
+                    'images/blue_flag.png'),
+    "greenCompany": ('images/green_battalion.png',
+                     'images/green_battalion_fire.png',
+                     'images/green_square.png',
+                     'images/green_flag.png'),
+    "blueBattery": ('images/blue_cannon.png',
+                    'images/blue_cannon_firing.png',
+                    'images/blue_flag.png',
+                    'images/cannonball.png'),
+    "greenBattery": ('images/green_cannon.png',
+                     'images/green_cannon_firing.png',
+                     'images/green_flag.png',
+                     'images/cannonball.png'),
+    "blueSquadron": ('images/blue_cavalry.png',
+                     'images/blue_flag.png'),
+    "greenSquadron": ('images/green_cavalry.png',
+                      'images/green_flag.png'),
+    "town": ('images/town.png',),
+}
+# images troops are drawn rotated, pre-rotated sheets are baked for them
+COSTUMES = {'images/blue_battalion.png', 'images/blue_battalion_fire.png',
+            'images/blue_square.png', 'images/green_battalion.png',
+            'images/green_battalion_fire.png', 'images/green_square.png',
+            'images/blue_cannon.png', 'images/blue_cannon_firing.png',
+            'images/green_cannon.png', 'images/green_cannon_firing.png',
+            'images/blue_cavalry.png', 'images/green_cavalry.png'}
+SHEET_COLUMNS = 36  # frames per row of a pre-rotated sheet
+
+
+class Assets():
+    """Sprite sets loaded on first use from baked copies
+
+    Images are scaled by scale once and baked into the cache directory
+    under a name made of the source file, a hash of its contents and the
+    scale, so changed art or another SCALE bakes new copies and later
+    launches load the baked copy as it is. Only the sets asked for are
+    loaded, images shared by sets are loaded once. Sets drawn at another
+    zoom are baked at scale times zoom by an Assets of their own. With
+    sheets, the rotations of costumes are baked into one sheet per costume
+    as well, and handed to the rotation cache when the costume is loaded.
+
+    Attributes
+    ----------
+    scale : float, > 0
+        size of baked images relative to source
+    cache : str
+        directory of baked images
+    sheets : bool
+        whether pre-rotated sheets are baked and loaded
+    images : dict of str: pygame.Surface
+        source path to loaded image
+    sets : dict of str: tuple of pygame.Surface
+        name to images of loaded sprite sets
+    paths : dict of pygame.Surface: str
+        loaded image to its source path
+    levels : dict of float: Assets
+        zoom to assets baked at scale times zoom
+    zooms : dict of (pygame.Surface, float): pygame.Surface
+        loaded image and zoom to image at that zoom
+
+    Methods
+    -------
+    get
+        images of a sprite set, loaded on first use
+    image
+        scaled image of a source file, baked on first use
+    zoomed
+        loaded image at a zoom, baked on first use
+    baked
+        path of baked copy of a source file, stale copies deleted
+    sheet
+        rotations of a costume, baked on first use
+    """
+
+    def __init__(self, scale=SCALE, cache=AS_CACHE, sheets=AS_SHEETS):
+        self.scale = scale
+        self.cache = cache
+        self.sheets = sheets
+        self.images = {}
+        self.sets = {}
+        self.paths = {}
+        self.levels = {}
+        self.zooms = {}
+
+    def get(self, name):
+        # images of a sprite set, loaded on first use
+        if name not in self.sets:
+            self.sets[name] = tuple(self.image(path) for path in SETS[name])
+        return self.sets[name]
+
+    def image(self, path):
+        # scaled image of a source file, baked on first use
+        if path in self.images:
+            return self.images[path]
+        file = self.baked(path, "")
+        if os.path.exists(file):
+            image = pygame.image.load(file)
+        else:
+            image = pygame.image.load(path)
+            if image.get_colorkey() is not None:
+                # saved copies drop the colorkey, bake it into alpha
+                keyed, image = image, pygame.Surface(image.get_size(),
+                                                     pygame.SRCALPHA)
+                image.blit(keyed, (0, 0))
+            size = [int(i * self.scale) for i in image.get_rect().size]
+            image = pygame.transform.scale(image, size)
+            self.save(image, file)
+        # convert_alpha needs a display mode, which headless never sets
+        if not HEADLESS:
+            image = image.convert_alpha()
+        self.images[path] = image
+        self.paths[image] = path
+        if self.sheets and path in COSTUMES:
+            rotations.preload(image, self.sheet(path, image))
+        return image
+
+    def zoomed(self, image, zoom):
+        # loaded image at zoom, from sets baked at scale times zoom
+        if zoom == 1:
+            return image
+        key = (image, zoom)
+        if key not in self.zooms:
+            if zoom not in self.levels:
+                self.levels[zoom] = Assets(self.scale * zoom, self.cache,
+                                           self.sheets)
+            self.zooms[key] = self.levels[zoom].image(self.paths[image])
+        return self.zooms[key]
+
+    def baked(self, path, suffix):
+        # path of baked copy of a source file, stale copies deleted
+        with open(path, "rb") as source:
+            digest = hashlib.sha1(source.read()).hexdigest()[:12]
+        stem = os.path.splitext(os.path.basename(path))[0]
+        ending = "-%g%s" % (self.scale, suffix)
+        file = os.path.join(self.cache, stem + "-" + digest + ending + ".png")
+        if not os.path.exists(file):
+            for old in glob.glob(os.path.join(self.cache,
+                                              stem + "-*" + ending + ".*")):
+                os.remove(old)
+        return file
+
+    def save(self, image, file):
+        # write a baked image, skipped when the cache can't be written
+        try:
+            os.makedirs(self.cache, exist_ok=True)
+            pygame.image.save(image, file)
+        except (OSError, pygame.error):
+            pass
+
+    def sheet(self, path, image):
+        # rotations of a costume by direction, baked on first use
+        file = self.baked(path, "-r%d" % RC_STEPS)
+        rects = os.path.splitext(file)[0] + ".npy"
+        if os.path.exists(file) and os.path.exists(rects):
+            sheet = pygame.image.load(file)
+            if not HEADLESS:
+                sheet = sheet.convert_alpha()
+            return [sheet.subsurface(rect)
+                    for rect in np.load(rects).tolist()]
+        frames = [pygame.transform.rotate(image, step * 360 / RC_STEPS)
+                  for step in range(RC_STEPS)]
+        # rows of SHEET_COLUMNS frames, each row as high as its highest
+        rows = [frames[n:n + SHEET_COLUMNS]
+                for n in range(0, len(frames), SHEET_COLUMNS)]
+        width = max(sum(frame.get_width() for frame in row) for row in rows)
+        height = sum(max(frame.get_height() for frame in row) for row in rows)
+        sheet = pygame.Surface((width, height), pygame.SRCALPHA)
+        places, y = [], 0
+        for row in rows:
+            x = 0
+            for frame in row:
+                places.append(sheet.blit(frame, (x, y)))
+                x += frame.get_width()
+            y += max(frame.get_height() for frame in row)
+        self.save(sheet, file)
+        try:
+            np.save(rects, np.array([tuple(rect) for rect in places]))
+        except OSError:
+            pass
+        return frames
+
+
+def bake(scale=SCALE, sheets=AS_SHEETS, cache=AS_CACHE):
+    """ bake every sprite set for a scale
+
+    Parameters
+    ----------
+    scale : float, > 0
+        size of baked images relative to source
+    sheets : bool
+        whether pre-rotated sheets of costumes are baked as well
+    cache : str
+        directory of baked images
+
+    Returns
+    -------
+    int
+        number of images of all sets
+    """
+    baker = Assets(scale, cache, sheets)
+    for name in SETS:
+        baker.get(name)
+    return len(baker.images)
+
+
+def main(argv=None):
+    """ bake sprites from the command line """
+    parser = argparse.ArgumentParser(
+        description="Bake scaled sprites, and optionally pre-rotated "
+                    "sheets of costumes, into the asset cache.")
+    parser.add_argument("--scale", type=float, default=SCALE,
+                        help="size of baked images relative to source")
+    parser.add_argument("--sheets", action="store_true", default=AS_SHEETS,
+                        help="bake pre-rotated sheets of costumes")
+    parser.add_argument("--cache", default=AS_CACHE,
+                        help="directory of baked images")
+    args = parser.parse_args(argv)
+    count = bake(args.scale, args.sheets, args.cache)
+    print("baked %d images at scale %g into %s" % (count, args.scale,
+                                                   args.cache))
+
+
+# sprites of the game, loaded as units ask for them
+assets = Assets()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,15 @@
 # import pygame
 import math
 from cannon import Cannon
-from settings import C_SIGHT, C_GAPY, FB_SIZE
-from settings import blueCannon, greenCannon
+from settings import C_SIGHT, C_GAPY, FB_SIZE, HEADLESS
+from assets import assets
 from flag import Flag
 import pygame
 import numpy as np
 from button import Button
+from battlestate import state
+from commandlog import commands
+from camera import camera
 
 "click on any Cannon - bring up orders: canister, round shot, etc."
 
@@ -50,13 +53,13 @@ class Battery():
         team Battery is on for friend-foe detection
     defense : bool
         whether unit will ignore AI move orders
-    allies : list of Battery, Company, Squadron
-        list of all units with same team value
-    enemies : list of Battery, Company, Squadron
-        list of all units with different team value
+    rows : slice
+        rows of BattleState holding the troops of Battery
 
     Properties
     ----------
+    coords : float 1-D numpy.ndarray [2], >=0
+        coords of center of Battery
     size : int, >= 0
         number of Cannoneers contained in Battery
     cannonSize : int, >= 0
@@ -80,8 +83,6 @@ class Battery():
 
     Methods
     -------
-    unitInit
-        set allies and enemies
     setSpeed
         set speed to min of default, distance to coords
     distance
@@ -91,15 +92,13 @@ class Battery():
     stop
         stop Battery, Cannon
     update
-        move Battery, update Cannon, panic if necessary
+        drop troops that died or fled, after BattleState update
     follow
-        move Battery and Cannon to flag
+        drag flag, pass flag variables to rows of Cannon
     lookAt
         set rotation to angle from current center to new point
     findTarget
         select enemy as target
-    aim
-        turn toward selected target
     getHit
         kill own Cannoneer when shot
     getShelled
@@ -110,6 +109,8 @@ class Battery():
         orders Battery to move to coords
     AIsupport
         move to visible allies in combat
+    setRect
+        move rects of troops to current coords without drawing
     blitme
         print elements of Battery
     __str__
@@ -120,9 +121,9 @@ class Battery():
                  play=True, defense=False):
         super().__init__()
         if team == "green":
-            file1, file2, fileFlag, fileBall = greenCannon
+            file1, file2, fileFlag, fileBall = assets.get("greenBattery")
         elif team == "blue":
-            file1, file2, fileFlag, fileBall = blueCannon
+            file1, file2, fileFlag, fileBall = assets.get("blueBattery")
         coords = np.array([x, y], dtype=float)
         self.troops = []
         for i in range(sizey):
@@ -135,6 +136,7 @@ class Battery():
             self.troops.append(Cannon(screen, angle, shiftx, shifty, strength,
                                        file1, file2, fileBall, team,
                                        coords, defense))
+        self.rows = state.rows(self.troops)
         self.flag = Flag(screen, (x, y), angle, fileFlag, play)
         flags.append(self.flag)
         # 0,1=click,release to show buttons, 2,3=click,release to select
@@ -143,16 +145,9 @@ class Battery():
         self.healthDisp = Button(screen, str(self.health))
         self.play = play
         self.team = team
-        self.oldUnits = []
         # used to id object for testing, not meant to be seen/used
         self.id = file1
 
-    def unitInit(self, units):
-        # set allies and enemies
-        if units != self.oldUnits:
-            self.oldUnits = units
-            [unit.unitInit(units) for unit in self.troops]
-
     @property
     def size(self):
         # number of Cannons currently contained in Battery
@@ -165,28 +160,27 @@ class Battery():
 
     @property
     def health(self):
-        return sum(inf.size for inf in self.troops)
+        sizes = state.size[self.rows]
+        return sizes[state.alive[self.rows]].sum()
+
+    @property
+    def coords(self):
+        # center of troops still in Battery
+        coords = state.coords[self.rows]
+        return coords[state.alive[self.rows]].mean(axis=0)
 
     def update(self):
-        # move Battery, update Cannons, panic if necessary
-        [can.panic() for can in self.troops if can.panicTime > 0]
-        for cannon in self.troops:
-            if cannon.size <= 0:
-                self.troops.remove(cannon)
-            elif cannon.panicTime == -1:
-                cannon.update()
+        # drop troops that died or fled, after BattleState update
+        self.troops = [troop for troop in self.troops if troop.alive]
 
     def follow(self, flags):
         # move Battery and Cannons to flag
-        if self.play:
+        if self.play and not HEADLESS:
             self.flag.checkDrag(flags)
-        [unit.follow(*self.flagVars) for unit in self.troops]
+        commands.flag(self)
+        state.setFlag(self.rows, *self.flagVars)
         self.flag.change = False
 
-    def aim(self):
-        # turn toward selected target
-        [troop.aim() for troop in self.troops]
-
     def orders(self):
         # give orders other than move for Battery
         if not self.play or self.size == 0:
@@ -195,7 +189,8 @@ class Battery():
             self.showOrders = 0
         mouse = pygame.mouse.get_pos()
         click = pygame.mouse.get_pressed()[0]
-        touch = any([can.rect.collidepoint(mouse) for can in self.troops])
+        point = camera.toWorld(mouse)
+        touch = any([can.rect.collidepoint(point) for can in self.troops])
         if click and self.showOrders == 0 and touch:
             self.showOrders = 1
         if self.showOrders == 1 and not click:
@@ -210,6 +205,7 @@ class Battery():
 
     def AIcommand(self, coords, attackMove=False):
         # orders Battery to move to coords
+        commands.ai(self, coords, attackMove)
         self.flag.coords = coords
         self.flag.attackMove = attackMove
 
@@ -218,21 +214,24 @@ class Battery():
         if self.play or self.size == 0:
             return
         trp = self.troops[0]
-        allyDist = trp.distanceMany([grp.coords for grp in trp.allies])
-        for ally, d in zip(trp.allies, allyDist):
-            cannon = hasattr(ally, 'shot')
-            canSee = d < C_SIGHT
-            if trp.idle and ally.target is not None and canSee and not cannon:
-                self.AIcommand(ally.target.coords, True)
-                break
+        if not trp.idle:
+            return
+        ally = state.allyInCombat(trp.idx, C_SIGHT)
+        if ally is not None:
+            self.AIcommand(ally.target.coords, True)
+
+    def setRect(self):
+        # move rects of troops to current coords without drawing
+        [troop.setRect() for troop in self.troops]
 
     def blitme(self):
         # print elements of Battery
-        [cannon.blitme() for cannon in self.troops]
+        if camera.shows(self.rows):
+            [cannon.blitme() for cannon in self.troops]
         if self.size > 0:
             self.flag.blitme()
         if self.showOrders > 1:
-            coords = self.troops[0].coords
+            coords = camera.toScreen(self.troops[0].coords)
             healthCoords = (coords[0], coords[1] - FB_SIZE[1])
             self.healthDisp.draw(healthCoords, str(self.health))
             self.healthDisp.blitme()
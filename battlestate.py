@@ -0,0 +1,638 @@
+import math
+import numpy as np
+from settings import I_SPEED, I_RANGE, I_SIGHT, I_FIRE_ANGLE, I_AIM, I_DELAY
+from settings import I_LOAD, I_END_FIRE, I_CHANCE, I_BAY_CHANCE
+from settings import CV_SPEED, CV_SIGHT, CV_FIRE_ANGLE, CV_AIM, CV_DELAY
+from settings import CV_LOAD, CV_END_FIRE, CV_RANGE, CV_ACCEL, CV_BAY_CHANCE
+from settings import C_SPEED, C_RANGE, C_SIGHT, C_FIRE_ANGLE, C_AIM, C_DELAY
+from settings import C_LOAD, C_END_FIRE
+from settings import SH_CELL, DF_CELL, SCREEN_WIDTH, SCREEN_HEIGHT
+from settings import TICK_RATE, PJ_POOL
+from proximity import Proximity
+from spatial import SpatialHash
+from density import DensityField
+from roster import Roster
+from terrain import Terrain
+from projectiles import Projectiles
+from rng import CounterRandom, RS_AIM, RS_FIRE
+from perf import traced
+
+# kinds of troops, index into the per-kind constants below
+INFANTRY = 0
+CAVALRY = 1
+CANNON = 2
+# poses, index into costumes of a troop
+READY = 0
+FIRING = 1
+CARRE = 2
+
+SPEED = np.array([I_SPEED, CV_SPEED, C_SPEED])
+RANGE = np.array([I_RANGE, CV_SPEED, C_RANGE])
+SIGHT = np.array([I_SIGHT, CV_SIGHT, C_SIGHT])
+FIRE_ANGLE = np.array([I_FIRE_ANGLE, CV_FIRE_ANGLE, C_FIRE_ANGLE])
+AIM = np.array([I_AIM, CV_AIM, C_AIM])
+DELAY = np.array([I_DELAY, CV_DELAY, C_DELAY])
+LOAD = np.array([I_LOAD, CV_LOAD, C_LOAD])
+END_FIRE = np.array([I_END_FIRE, CV_END_FIRE, C_END_FIRE])
+HAS_FIRING = np.array([True, False, True])  # whether kind has firing pose
+
+# name: (dtype, shape of one row, default value)
+COLUMNS = {
+    "coords": (float, (2,), 0),
+    "prevCoords": (float, (2,), np.nan),
+    "drawCoords": (float, (2,), 0),
+    "velocity": (float, (2,), 0),
+    "targetxy": (float, (2,), -1),
+    "angle": (float, (), 0),
+    "oldAngle": (float, (), 0),
+    "panicAngle": (float, (), 0),
+    "shiftr": (float, (), 0),
+    "shiftt": (float, (), 0),
+    "radius": (float, (), 0),
+    "size": (int, (), 0),
+    "maxSize": (int, (), 0),
+    "chargeStart": (float, (), 0),
+    "target": (int, (), -1),
+    "panicTime": (int, (), -1),
+    "aimedOn": (int, (), -1),
+    "firedOn": (int, (), -1),
+    "team": (np.int8, (), 0),
+    "kind": (np.int8, (), 0),
+    "pose": (np.int8, (), READY),
+    "alive": (bool, (), True),
+    "enlisted": (bool, (), False),
+    "moving": (bool, (), False),
+    "attackMove": (bool, (), True),
+    "bayonets": (bool, (), False),
+    "defense": (bool, (), False),
+    "flagCoords": (float, (2,), 0),
+    "flagSelect": (int, (), 0),
+    "flagAttack": (bool, (), True),
+    "flagAngle": (float, (), 0),
+    "flagChange": (bool, (), False),
+}
+
+
+class BattleState():
+    """Contiguous arrays holding the state of every troop in the battle
+
+    Each troop owns one row, given by its idx. Troops of one unit take a
+    contiguous block of rows, so units are views onto index ranges. Rows
+    are never reused until reset, dead troops are marked by alive.
+
+    Attributes
+    ----------
+    count : int, >= 0
+        number of rows in use
+    capacity : int, >= 0
+        number of rows allocated
+    tick : int, >= 0
+        number of ticks simulated
+    time : float, >= 0
+        milliseconds of battle simulated, TICK_RATE ticks per second
+    troops : list of Infantry, Cavalry, Cannon
+        troop objects by row, used for per-troop events like getHit
+    teams : dict of str: int
+        team name to team number stored in team column
+    losses : int numpy.ndarray [teams]
+        men each team lost to hits and flight, by team number
+    terrain : Terrain
+        terrain of the level, slows troops and covers them from fire
+    rng : CounterRandom
+        random numbers of the battle, keyed by row and tick
+    roster : Roster
+        units in play by team, marks rows of units enlisted as they change
+    near : Proximity
+        troops in play sorted into cells once per tick after moving
+    fights : SpatialHash
+        troops in combat sorted into cells once per tick, for AI support
+    charged : bool numpy.ndarray [count]
+        whether each row is targeted by live Cavalry, marked once per tick
+        for AI carre
+    density : DensityField
+        size of each team by place, rasterized with near, used for morale
+    shots : Projectiles
+        pool of projectiles in flight, moved after troops fire
+    events : Events or None
+        scripted events of the level, set by loadLevel, None = no events
+    coords, velocity, targetxy, flagCoords : float numpy.ndarray [N, 2]
+        per-troop vectors, see Infantry for meaning
+    prevCoords, drawCoords : float numpy.ndarray [N, 2]
+        coords before the last tick, nan for new troops, and coords to
+        draw at between the last two ticks
+    angle, oldAngle, panicAngle, shiftr, shiftt, radius, size, maxSize,
+    chargeStart,
+    target, panicTime, aimedOn, firedOn, team, kind, pose, alive, enlisted,
+    moving, attackMove, bayonets, defense, flagSelect, flagAttack,
+    flagAngle, flagChange : numpy.ndarray [N]
+        per-troop values, target is row of target or -1 for no target
+
+    Methods
+    -------
+    reset
+        remove all troops
+    add
+        give troop a row, return row number
+    wound
+        take hits off sizes of troops, count losses of their teams
+    rows
+        slice of rows taken by list of troops
+    advance
+        start a tick, keep coords for drawing between ticks
+    interpolate
+        set coords to draw at a fraction of the way through the last tick
+    enlist
+        mark or unmark troops of a unit added to or removed from roster
+    liveRows
+        rows of troops that are alive and in play
+    setFlag
+        copy Flag variables of a unit into its rows
+    measure
+        sort troops in play into cells, rasterize size
+    strength
+        size of allies and enemies within radius of a troop
+    measureFights
+        sort troops in combat into cells
+    allyInCombat
+        first ally within radius of a troop that has a target
+    measureCharges
+        mark rows targeted by live Cavalry
+    sweep
+        troops of other teams touched by balls moving along segments
+    follow
+        move troops to flags of their units
+    aim
+        set targets, turn toward targets
+    update
+        move troops, count down timers, fire at targets
+    panic
+        run panicking troops away in their panic direction
+    fire
+        count down aim and reload timers, fire when aim time runs out
+    volley
+        resolve fire of Infantry and Cavalry at once
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, capacity=64, seed=None):
+        # remove all troops, seed random numbers, None = new random seed
+        self.rng = CounterRandom(seed)
+        self.count = 0
+        self.capacity = 0
+        self.tick = 0
+        self.time = 0
+        self.troops = []
+        self.teams = {}
+        self.losses = np.zeros(0, dtype=int)
+        self.terrain = Terrain((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.roster = Roster()
+        self.roster.listen(self.enlist)
+        self.near = Proximity(SIGHT.max(), SH_CELL)
+        self.fights = SpatialHash(SH_CELL)
+        self.charged = np.zeros(0, dtype=bool)
+        self.density = DensityField(DF_CELL)
+        self.shots = Projectiles(PJ_POOL)
+        self.events = None
+        for name, (dtype, shape, default) in COLUMNS.items():
+            setattr(self, name, np.full((0,) + shape, default, dtype=dtype))
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        # allocate at least capacity rows, keeping current rows
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        for name, (dtype, shape, default) in COLUMNS.items():
+            column = np.full((capacity,) + shape, default, dtype=dtype)
+            column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def add(self, troop, kind, team):
+        # give troop a row, return row number
+        self.grow(self.count + 1)
+        idx = self.count
+        self.count += 1
+        self.troops.append(troop)
+        self.kind[idx] = kind
+        self.team[idx] = self.teams.setdefault(team, len(self.teams))
+        if len(self.losses) < len(self.teams):
+            self.losses = np.append(self.losses, 0)
+        return idx
+
+    def wound(self, rows, hits):
+        # take hits off sizes of troops, count men lost by their teams
+        rows, inverse = np.unique(rows, return_inverse=True)
+        hits = np.bincount(inverse.ravel(), weights=np.broadcast_to(
+            hits, inverse.shape).ravel()).astype(self.size.dtype)
+        lost = np.clip(hits, 0, np.maximum(self.size[rows], 0))
+        self.size[rows] -= hits
+        np.add.at(self.losses, self.team[rows], lost)
+
+    def rows(self, troops):
+        # slice of rows taken by list of troops
+        if len(troops) == 0:
+            return slice(self.count, self.count)
+        return slice(troops[0].idx, troops[-1].idx + 1)
+
+    def advance(self):
+        # start a tick, keep coords for drawing between ticks
+        n = self.count
+        self.prevCoords[:n] = self.coords[:n]
+        self.tick += 1
+        self.time = self.tick * 1000 / TICK_RATE
+
+    def interpolate(self, alpha):
+        # set coords to draw at a fraction of the way through the last tick
+        n = self.count
+        prev, coords = self.prevCoords[:n], self.coords[:n]
+        drawn = prev + alpha * (coords - prev)
+        self.drawCoords[:n] = np.where(np.isnan(prev), coords, drawn)
+
+    def enlist(self, unit, present):
+        # mark troops of units in play, other troops are left out of passes
+        self.enlisted[unit.rows] = present
+
+    def liveRows(self):
+        # rows of troops that are alive and in play
+        n = self.count
+        return np.flatnonzero(self.alive[:n] & self.enlisted[:n])
+
+    def setFlag(self, rows, coords, select, attackMove, angle, change):
+        # copy Flag variables of a unit into its rows
+        self.flagCoords[rows] = coords
+        self.flagSelect[rows] = select
+        self.flagAttack[rows] = attackMove
+        self.flagAngle[rows] = angle
+        self.flagChange[rows] = change
+
+    def measure(self):
+        # sort troops in play into cells, rasterize size
+        i = self.liveRows()
+        self.near.build(self.coords, i, self.team[i], self.count)
+        self.density.build(self.coords[i], self.size[i], self.team[i])
+
+    def strength(self, idx, radius):
+        # size of allies and enemies within radius of a troop
+        coords = self.coords[idx]
+        sizes = {team: self.density.strength(coords, team, radius)
+                 for team in self.teams.values()}
+        ally = sizes.pop(self.team[idx])
+        return ally, sum(sizes.values())
+
+    def measureFights(self):
+        # sort troops in combat into cells, where they were measured
+        i = np.flatnonzero(self.near.teams >= 0)
+        i = i[self.alive[i] & self.enlisted[i] & (self.target[i] >= 0)
+              & (self.kind[i] != CANNON)]
+        self.fights.build(self.near.coords[i], i, self.near.teams[i])
+
+    def allyInCombat(self, idx, radius):
+        # first ally within radius of a troop that has a target, or None
+        if idx >= self.near.count or self.near.teams[idx] < 0:
+            return None
+        coords = self.near.coords[idx:idx + 1]
+        reach = math.ceil(radius / self.fights.cell)
+        _, rows = self.fights.near(coords, self.near.teams[idx], reach)
+        dist = np.hypot(*(self.near.coords[rows] - coords).T)
+        rows = rows[dist < radius]
+        if len(rows) == 0:
+            return None
+        return self.troops[rows.min()]
+
+    def measureCharges(self):
+        # mark rows targeted by live Cavalry, for AI carre
+        n = self.count
+        i = np.flatnonzero(self.alive[:n] & (self.kind[:n] == CAVALRY)
+                           & (self.target[:n] >= 0))
+        self.charged = np.zeros(n, dtype=bool)
+        self.charged[self.target[i]] = True
+
+    def sweep(self, start, end, radius, team):
+        """troops of other teams touched by balls moving along segments
+
+        Looks only at troops in cells of the measured grid around the
+        segments, so it stays cheap however many troops are in play.
+
+        Parameters
+        ----------
+        start, end : float numpy.ndarray [M, 2]
+            coords of balls at start and end of the tick
+        radius : float numpy.ndarray [M], >= 0
+            radius of each ball
+        team : int numpy.ndarray [M]
+            team number of each ball, its troops are never touched
+
+        Returns
+        -------
+        query : int numpy.ndarray
+            index of ball of each touch
+        rows : int numpy.ndarray
+            row of troop touched, in the order each ball reaches them
+        """
+        grid = self.near.grid
+        middle = (start + end) / 2
+        path = end - start
+        length = np.hypot(*path.T)
+        reach = (length / 2 + radius).max(initial=0)
+        reach += self.radius[:self.count].max(initial=0)
+        reach = int(np.ceil(reach / grid.cell))
+        query, rows = [np.zeros(0, dtype=int)], [np.zeros(0, dtype=int)]
+        for other in grid.teams:
+            balls = np.flatnonzero(team != other)
+            found, near = grid.near(middle[balls], other, reach)
+            query.append(balls[found])
+            rows.append(near)
+        query, rows = np.concatenate(query), np.concatenate(rows)
+        # closest point of segment to each troop, as fraction of segment
+        path, start = path[query], start[query]
+        along = np.einsum("ij,ij->i", self.coords[rows] - start, path)
+        along = np.clip(along / np.maximum(length[query] ** 2, 1e-12), 0, 1)
+        closest = start + along[:, None] * path
+        dist = np.hypot(*(self.coords[rows] - closest).T)
+        touch = dist <= radius[query] + self.radius[rows]
+        query, rows, along = query[touch], rows[touch], along[touch]
+        order = np.lexsort((along, query))
+        return query[order], rows[order]
+
+    def relatCoords(self, i):
+        # coords of troops relative to their unit center
+        angle = self.shiftt[i] - self.angle[i]
+        return self.shiftr[i, None] * np.column_stack((np.cos(angle),
+                                                       np.sin(angle)))
+
+    def distance(self, i, coords):
+        # straight line distance troops to coords, 0 if negative coords
+        dist = np.hypot(*(self.coords[i] - coords).T)
+        return np.where(coords[:, 0] == -1, 0, dist)
+
+    def lookAt(self, i, coords):
+        # point troops at coordinates
+        dist = coords - self.coords[i]
+        turn = (dist[:, 0] != 0) | (dist[:, 1] != 0)
+        self.angle[i[turn]] = np.arctan2(-dist[turn, 1], dist[turn, 0])
+
+    def setSpeed(self, i, speed):
+        # set vertical, horizontal speed
+        self.velocity[i, 0] = speed * np.cos(self.angle[i])
+        self.velocity[i, 1] = -speed * np.sin(self.angle[i])
+
+    def stop(self, i):
+        # stop movement
+        self.velocity[i] = 0
+        self.moving[i] = False
+        self.attackMove[i] = True
+        self.targetxy[i] = -1
+
+    def allowShoot(self, i):
+        # whether troops will currently aim at targets
+        return ~self.moving[i] | self.attackMove[i]
+
+    def range(self, i):
+        # distance in pixels within which troops attack their target
+        kind = self.kind[i]
+        bayonets = (kind == INFANTRY) & self.bayonets[i]
+        return np.where(bayonets, I_SPEED, RANGE[kind])
+
+    def moveSpeed(self, i):
+        # marching speed, charging Cavalry accelerate with time
+        speed = SPEED[self.kind[i]]
+        charge = (self.kind[i] == CAVALRY) & (self.chargeStart[i] != 0)
+        chargeTime = (self.time - self.chargeStart[i]) // 100
+        return np.where(charge, chargeTime * CV_ACCEL, speed)
+
+    def move(self, i):
+        # point at targetxy, move to targetxy, slowed by terrain
+        self.lookAt(i, self.targetxy[i])
+        dist = self.distance(i, self.targetxy[i])
+        speed = self.moveSpeed(i) * self.terrain.cost(self.coords[i])
+        self.setSpeed(i, np.minimum(speed, dist))
+
+    def follow(self):
+        # move troops to flags of their units
+        i = self.liveRows()
+        moving = self.moving[i]
+        fCoords = self.flagCoords[i]
+        fSelect = self.flagSelect[i]
+        toTarget = self.distance(i, self.targetxy[i])
+        toFlag = self.distance(i, fCoords + self.relatCoords(i))
+        placed = np.where(moving, toTarget, toFlag) > SPEED[self.kind[i]]
+        placed &= fSelect == 0
+        change = i[self.flagChange[i]]
+        self.attackMove[change] = self.flagAttack[change]
+        go = placed & ((self.target[i] < 0) | ~self.attackMove[i])
+        # start marching, flip formation when turning around
+        start = i[go & ~moving]
+        self.moving[start] = True
+        self.angle[start] = self.flagAngle[start]
+        angleDiff = np.abs(self.oldAngle[start] - self.angle[start])
+        flip = (0.5 * math.pi < angleDiff) & (angleDiff < 1.5 * math.pi)
+        self.shiftr[start[flip]] *= -1
+        self.targetxy[start] = (self.flagCoords[start]
+                                + self.relatCoords(start))
+        self.move(i[go])
+        # arrived at flag
+        halt = i[~go & moving]
+        self.angle[halt] = self.flagAngle[halt]
+        self.oldAngle[halt] = self.angle[halt]
+        self.stop(halt)
+        # flag is being dragged
+        hold = i[(fSelect > 0) & self.moving[i]]
+        self.lookAt(hold, self.flagCoords[hold])
+        self.stop(hold)
+
+    @traced("findTarget")
+    def findTarget(self, i):
+        # select first visible enemy closer than current target
+        allow = self.allowShoot(i)
+        self.target[i[~allow]] = -1
+        i = i[allow]
+        target = self.target[i]
+        has = target >= 0
+        toTarget = np.full(len(i), np.inf)
+        toTarget[has] = self.near.between(i[has], target[has])
+        # pairs of searching troops with enemies within their sight
+        k, dst, dist = self.near.near(i, SIGHT[self.kind[i]])
+        seen = (self.size[dst] > 0) & (self.panicTime[dst] <= 0)
+        seen &= self.alive[dst] & self.enlisted[dst]
+        allow = seen & (dist < toTarget[k])
+        # first match has the lowest row
+        first = np.full(len(i), self.count)
+        np.minimum.at(first, k[allow], dst[allow])
+        found = first < self.count
+        pick = i[found]
+        self.target[pick] = first[found]
+        stop = pick[self.moving[pick]]
+        self.oldAngle[stop] = self.angle[stop]
+        self.stop(stop)
+
+    def aim(self):
+        # set targets, turn toward targets
+        if self.near.count != self.count:
+            # troops were added since distances were last measured
+            self.measure()
+        i = self.liveRows()
+        self.findTarget(i)
+        i = i[self.target[i] >= 0]
+        target = self.target[i]
+        kind = self.kind[i]
+        tCoords = self.coords[target]
+        self.lookAt(i, tCoords)
+        toTarget = self.near.between(i, target)
+        dead = (self.size[target] == 0) | (self.panicTime[target] > 0)
+        dead |= ~self.alive[target] | ~self.enlisted[target]
+        dead |= self.team[target] == self.team[i]
+        drop = (toTarget > SIGHT[kind]) | dead | ~self.allowShoot(i)
+        angleDiff = np.abs(self.oldAngle[i] - self.angle[i])
+        turn = ~drop & (angleDiff > FIRE_ANGLE[kind])
+        close = ~drop & ~turn & (toTarget > self.range(i))
+        reach = ~drop & ~turn & ~close
+        self.target[i[drop]] = -1
+        self.stop(i[drop])
+        self.oldAngle[i[turn]] = self.angle[i[turn]]
+        self.stop(i[turn])
+        # advance on target, Cavalry start charge from out of range
+        charge = close & (kind == CAVALRY) & (toTarget > CV_RANGE)
+        charge = i[charge][self.chargeStart[i[charge]] == 0]
+        self.chargeStart[charge] = self.time
+        self.attackMove[i[close]] = True
+        self.targetxy[i[close]] = tCoords[close]
+        self.move(i[close])
+        # charging Cavalry reached target
+        hit = i[reach & (kind == CAVALRY)]
+        hit = hit[self.chargeStart[hit] != 0]
+        [self.troops[j].hitBayonets() for j in hit]
+        self.chargeStart[hit] = 0
+        self.stop(i[reach])
+
+    def update(self):
+        # move troops, count down timers, fire at targets
+        self.panic()
+        i = self.liveRows()
+        panicking = self.panicTime[i] > 0
+        ready = (self.panicTime[i] == -1) & (self.size[i] > 0)
+        step = i[panicking | ready]
+        self.coords[step] += self.velocity[step]
+        self.measure()
+        self.fire(step)
+        self.shots.update(self)
+        fled = i[panicking]
+        self.panicTime[fled] -= 1
+        gone = fled[self.panicTime[fled] == 0]
+        self.wound(gone, self.size[gone])
+        self.alive[i[self.size[i] <= 0]] = False
+
+    def panic(self):
+        # run panicking troops away in their panic direction
+        i = self.liveRows()
+        i = i[self.panicTime[i] > 0]
+        self.target[i] = -1
+        self.angle[i] = self.panicAngle[i]
+        cost = self.terrain.cost(self.coords[i])
+        self.setSpeed(i, SPEED[self.kind[i]] * cost)
+
+    def fire(self, i):
+        # count down aim and reload timers, fire when aim time runs out
+        target = self.target[i]
+        has = target >= 0
+        toTarget = np.full(len(i), np.inf)
+        toTarget[has] = self.near.between(i[has], target[has])
+        outrange = toTarget > self.range(i)
+        self.aimedOn[i[outrange | ~self.allowShoot(i)]] = -1
+        start = (self.aimedOn[i] == -1) & has & (self.firedOn[i] == -1)
+        start = i[start]
+        delay = DELAY[self.kind[start]]
+        self.aimedOn[start] = (AIM[self.kind[start]]
+                               + self.rng.randint(RS_AIM, start, self.tick, 0,
+                                                  -delay, delay + 1))
+        aiming = i[self.aimedOn[i] > 0]
+        self.aimedOn[aiming] -= 1
+        shoot = i[self.aimedOn[i] == 0]
+        kind = self.kind[shoot]
+        pose = shoot[HAS_FIRING[kind] & (self.pose[shoot] != CARRE)]
+        self.pose[pose] = FIRING
+        self.firedOn[shoot] = LOAD[kind]
+        self.aimedOn[shoot] = -1
+        loading = i[self.firedOn[i] > -1]
+        self.firedOn[loading] -= 1
+        kind = self.kind[i]
+        done = i[(self.firedOn[i] + END_FIRE[kind] == LOAD[kind])
+                 & (self.pose[i] == FIRING)]
+        self.pose[done] = READY
+        ready = (self.target[shoot] >= 0) & (self.size[shoot] > 0)
+        self.volley(shoot[ready & (self.kind[shoot] != CANNON)])
+        # Cannons hit or panicked by the volley don't fire
+        for j in shoot[self.kind[shoot] == CANNON]:
+            troop = self.troops[j]
+            if troop.target is not None and troop.size > 0:
+                troop.fire()
+
+    @traced("volley")
+    def volley(self, i):
+        # resolve fire of Infantry and Cavalry at once, then each troop that
+        # lost men tests morale once
+        if len(i) == 0:
+            return
+        target = self.target[i]
+        infantry = self.kind[i] == INFANTRY
+        dist = self.near.between(i, target)
+        with np.errstate(divide="ignore"):
+            chance = np.where(infantry, I_CHANCE * I_RANGE / dist,
+                              CV_BAY_CHANCE)
+        chance[infantry & (dist < I_SPEED)] = I_BAY_CHANCE
+        chance *= self.terrain.cover(self.coords[target])
+        hits = self.rng.binomial(RS_FIRE, i, self.tick, target, self.size[i],
+                                 np.minimum(chance / 100, 1))
+        self.wound(target, hits)
+        # morale is tested against the lowest row that hit, worse if any
+        # Infantry hitting used bayonets
+        hit = hits > 0
+        target, i = target[hit], i[hit]
+        source = np.full(self.count, self.count)
+        np.minimum.at(source, target, i)
+        bayonet = np.zeros(self.count, dtype=bool)
+        np.logical_or.at(bayonet, target, infantry[hit] & self.bayonets[i])
+        for j in np.unique(target).tolist():
+            self.troops[j].testMorale(bool(bayonet[j]), int(source[j]))
+
+
+class Column():
+    """Troop attribute kept in the troop's row of a BattleState column
+
+    Parameters
+    ----------
+    name : str
+        name of BattleState column
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+    def __get__(self, troop, owner):
+        if troop is None:
+            return self
+        return getattr(state, self.name)[troop.idx]
+
+    def __set__(self, troop, value):
+        getattr(state, self.name)[troop.idx] = value
+
+
+class TargetColumn(Column):
+    """Troop target kept as row number, read and set as troop object"""
+
+    def __get__(self, troop, owner):
+        if troop is None:
+            return self
+        target = state.target[troop.idx]
+        if target < 0:
+            return None
+        return state.troops[target]
+
+    def __set__(self, troop, value):
+        state.target[troop.idx] = -1 if value is None else value.idx
+
+
+# state of the current battle, reset when a battle starts
+state = BattleState()
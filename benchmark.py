@@ -0,0 +1,233 @@
+import argparse
+import json
+import math
+import os
+import platform
+import time
+from multiprocessing import get_context
+# benchmarks are headless unless MUSKETCRAFT_HEADLESS=0, must be set before
+# settings makes the screen
+os.environ.setdefault("MUSKETCRAFT_HEADLESS", "1")
+import numpy as np  # noqa: E402
+from settings import SCREEN, HEADLESS, SCREEN_WIDTH, SCREEN_HEIGHT  # noqa
+from settings import BM_SIZES, BM_TICKS, BM_WARMUP  # noqa: E402
+from settings import BM_BUDGET, BM_MEMORY, BM_POLL  # noqa: E402
+from game_functions import simulate, draw  # noqa: E402
+from battlestate import state  # noqa: E402
+from company import Company  # noqa: E402
+from squadron import Squadron  # noqa: E402
+from battery import Battery  # noqa: E402
+from perf import phases, PHASES  # noqa: E402
+
+# share of troops of each kind in a synthetic army, troops per unit, men
+# per unit, same units as Borodino
+MIX = ((Company, .7, 4, 500), (Squadron, .2, 4, 120), (Battery, .1, 1, 12))
+
+
+def syntheticBattle(troops, screen, flags):
+    """ two armies of about troops troops facing each other across the map
+
+    Parameters
+    ----------
+    troops : int, > 0
+        number of troops of both armies together
+    screen : pygame.Surface
+        Surface on which sprites are drawn
+    flags : list of Flag
+        Flags of created units are appended
+
+    Returns
+    -------
+    list of Battery, Company, Squadron
+        units of both armies, all controlled by AI, added to roster
+    """
+    units = []
+    for team, left, angle in (("blue", 0, 0), ("green", .5, math.pi)):
+        kinds = []
+        for kind, share, size, strength in MIX:
+            count = max(1, round(troops / 2 * share / size))
+            kinds += [(kind, strength)] * count
+        # spread units over a grid filling the team's half of the field
+        columns = math.ceil(math.sqrt(len(kinds) / 2))
+        rows = math.ceil(len(kinds) / columns)
+        xs = left + .1 + .3 * (np.arange(columns) + .5) / columns
+        ys = .1 + .8 * (np.arange(rows) + .5) / rows
+        for n, (kind, strength) in enumerate(kinds):
+            x = xs[n % columns] * SCREEN_WIDTH
+            y = ys[n // columns] * SCREEN_HEIGHT
+            if kind is Battery:
+                unit = kind(screen, angle, x, y, 1, team, flags, strength,
+                            False)
+            else:
+                unit = kind(screen, angle, x, y, 2, 2, team, flags,
+                            strength, False)
+            units.append(unit)
+    [state.roster.add(unit) for unit in units]
+    return units
+
+
+def bench(troops, ticks=BM_TICKS, warmup=BM_WARMUP, seed=0):
+    """ time each phase of ticks of a synthetic battle
+
+    Parameters
+    ----------
+    troops : int, > 0
+        number of troops of both armies together
+    ticks : int, > 0
+        number of ticks timed
+    warmup : int, >= 0
+        number of ticks run before timing starts
+    seed : int
+        seed of random numbers of the battle
+
+    Returns
+    -------
+    dict
+        troops and units created, ticks timed, seconds, ticks per second,
+        troop ticks per second, seconds of each phase in total and per tick
+    """
+    state.reset(seed=seed)
+    flags = []
+    start = time.perf_counter()
+    units = syntheticBattle(troops, SCREEN, flags)
+    setup = time.perf_counter() - start
+    count = state.count
+    for tick in range(warmup):
+        simulate(units, flags)
+    phases.reset()
+    phases.enabled = True
+    start = time.perf_counter()
+    for tick in range(ticks):
+        simulate(units, flags)
+        if not HEADLESS:
+            draw(SCREEN, units)
+    seconds = time.perf_counter() - start
+    phases.enabled = False
+    return {
+        "troops": count,
+        "units": len(units),
+        "ticks": ticks,
+        "setup": setup,
+        "seconds": seconds,
+        "ticksPerSec": ticks / seconds,
+        "troopsPerSec": count * ticks / seconds,
+        "phases": {name: {"total": phases.total[name],
+                          "perTick": phases.total[name] / ticks}
+                   for name in PHASES if name in phases.total},
+    }
+
+
+def residentMemory(pid):
+    # megabytes of memory a process holds, 0 where the system doesn't tell
+    try:
+        with open("/proc/%d/status" % pid) as file:
+            for line in file:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0
+
+
+def benchJob(queue, *args):
+    # run bench, send its result to the process that started it
+    queue.put(bench(*args))
+
+
+def guardedBench(troops, ticks=BM_TICKS, warmup=BM_WARMUP, seed=0,
+                 budget=BM_BUDGET, memory=BM_MEMORY):
+    """ bench in a process of its own, skipped when too slow or too large
+
+    The process is killed as soon as it runs longer or holds more memory
+    than allowed, so one battle too large for the machine doesn't end the
+    whole benchmark.
+
+    Parameters
+    ----------
+    troops, ticks, warmup, seed
+        see bench
+    budget : float, > 0
+        seconds the battle may take, setup and warmup included
+    memory : float, > 0
+        megabytes of memory the battle may hold
+
+    Returns
+    -------
+    dict
+        result of bench, or troops and the reason it was skipped
+    """
+    # fresh interpreter, worker doesn't inherit the pygame display
+    context = get_context("spawn")
+    queue = context.SimpleQueue()
+    worker = context.Process(target=benchJob,
+                             args=(queue, troops, ticks, warmup, seed))
+    start = time.perf_counter()
+    worker.start()
+    reason = None
+    while reason is None and queue.empty():
+        if not worker.is_alive():
+            if queue.empty():
+                reason = "exited with code %s" % worker.exitcode
+        elif time.perf_counter() - start > budget:
+            reason = "over %g seconds" % budget
+        elif residentMemory(worker.pid) > memory:
+            reason = "over %g MB" % memory
+        else:
+            time.sleep(BM_POLL)
+    if reason is None:
+        result = queue.get()
+    else:
+        result = {"troops": troops, "skipped": reason}
+    # SIGKILL, pygame turns SIGTERM into a quit event
+    worker.kill()
+    worker.join()
+    return result
+
+
+def main(argv=None):
+    """ benchmark battles of growing size, print table, save json """
+    parser = argparse.ArgumentParser(
+        description="Time phases of synthetic battles of growing size.")
+    parser.add_argument("--sizes", default=",".join(map(str, BM_SIZES)),
+                        help="comma separated numbers of troops")
+    parser.add_argument("--ticks", type=int, default=BM_TICKS,
+                        help="ticks timed per battle")
+    parser.add_argument("--warmup", type=int, default=BM_WARMUP,
+                        help="ticks run before timing")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of random numbers of every battle")
+    parser.add_argument("--budget", type=float, default=BM_BUDGET,
+                        help="seconds a battle may take before it is "
+                             "skipped")
+    parser.add_argument("--memory", type=float, default=BM_MEMORY,
+                        help="megabytes of memory a battle may hold before "
+                             "it is skipped")
+    parser.add_argument("--out", default="benchmark.json",
+                        help="json file results are written to")
+    args = parser.parse_args(argv)
+    results = []
+    names = [name for name in PHASES if not HEADLESS
+             or name not in ("orders", "blitme", "present")]
+    print(("%8s %6s %9s %11s" + " %9s" * len(names))
+          % (("troops", "units", "ticks/s", "troops/s") + tuple(names)))
+    for troops in map(int, args.sizes.split(",")):
+        result = guardedBench(troops, args.ticks, args.warmup, args.seed,
+                              args.budget, args.memory)
+        results.append(result)
+        if "skipped" in result:
+            print("%8d skipped, %s" % (troops, result["skipped"]))
+            continue
+        print(("%8d %6d %9.1f %11.0f" + " %9.2e" * len(names))
+              % ((result["troops"], result["units"], result["ticksPerSec"],
+                  result["troopsPerSec"])
+                 + tuple(result["phases"].get(name, {}).get("perTick", 0)
+                         for name in names)))
+    with open(args.out, "w") as file:
+        json.dump({"python": platform.python_version(),
+                   "machine": platform.machine(), "headless": HEADLESS,
+                   "seed": args.seed, "results": results}, file, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
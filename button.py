@@ -1,5 +1,15 @@
 import pygame.font
 from settings import FB_SIZE, FB_COLOR, FB_TXT_SIZE, FB_TXT_COLOR
+from render import backdrop
+
+fonts = {}  # fonts by name and size, shared by every Button
+
+
+def font(name, size):
+    # font of a name and size, loaded once
+    if (name, size) not in fonts:
+        fonts[name, size] = pygame.font.SysFont(name, size)
+    return fonts[name, size]
 
 
 class Button:
@@ -33,7 +43,7 @@ class Button:
         self.rect = pygame.Rect(0, 0, *FB_SIZE)
         self.color = FB_COLOR
         self.txtC = FB_TXT_COLOR
-        self.font = pygame.font.SysFont('arial', FB_TXT_SIZE)
+        self.font = font('arial', FB_TXT_SIZE)
         self.msgImage = self.font.render(text, True, self.txtC, self.color)
         self.msgImageRect = self.msgImage.get_rect()
 
@@ -47,5 +57,5 @@ class Button:
 
     def blitme(self):
         # draw button to screen
-        self.screen.fill(self.color, self.rect)
-        self.screen.blit(self.msgImage, self.msgImageRect)
+        backdrop.mark(self.screen.fill(self.color, self.rect))
+        backdrop.mark(self.screen.blit(self.msgImage, self.msgImageRect))
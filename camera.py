@@ -0,0 +1,140 @@
+import numpy as np
+from settings import SCREEN_WIDTH, SCREEN_HEIGHT, CM_ZOOMS, CM_MARGIN
+from assets import assets
+
+
+class Camera():
+    """View of the battlefield on the screen, scrolled and zoomed by player
+
+    The battlefield may be larger than the screen. Battlefield coords are
+    mapped to screen coords by the origin, the battlefield coords at the
+    top left corner of the screen, and the zoom. Before each frame, rows of
+    troops outside the view are culled in one vectorized test, so only
+    troops on screen are rotated and blitted. Each zoom level draws with
+    its own sprite sets, baked at that scale, see Assets.zoomed.
+
+    Attributes
+    ----------
+    size : float numpy.ndarray [2]
+        width, height of screen in pixels
+    world : float numpy.ndarray [2]
+        width, height of battlefield in pixels
+    level : int
+        index into CM_ZOOMS of current zoom
+    origin : float numpy.ndarray [2]
+        battlefield coords at top left corner of screen
+    margin : float, >= 0
+        distance outside the view at which sprites are still drawn
+    moved : bool
+        whether the view changed since the last frame
+    shown : bool numpy.ndarray [N]
+        whether each BattleState row is on screen, as of the last cull
+    places : float numpy.ndarray [N, 2]
+        screen coords of each BattleState row, as of the last cull
+
+    Properties
+    ----------
+    zoom : float, > 0
+        screen pixels per battlefield pixel
+
+    Methods
+    -------
+    frame
+        show a battlefield of a size, centered when smaller than the view
+    pan
+        scroll the view by screen pixels
+    zoomAt
+        zoom in or out, keeping the point under a screen position in place
+    clamp
+        keep the view on the battlefield
+    toScreen
+        screen coords of battlefield coords
+    toWorld
+        battlefield coords of screen coords
+    inside
+        whether each of coords is in view
+    cull
+        find the rows on screen and where they are drawn
+    shows
+        whether any of rows is on screen
+    sprite
+        image of a sprite set at current zoom
+    """
+
+    def __init__(self, size=(SCREEN_WIDTH, SCREEN_HEIGHT), margin=CM_MARGIN):
+        self.size = np.array(size, dtype=float)
+        self.margin = margin
+        self.shown = np.zeros(0, dtype=bool)
+        self.places = np.zeros((0, 2))
+        self.frame(size)
+
+    @property
+    def zoom(self):
+        # screen pixels per battlefield pixel
+        return CM_ZOOMS[self.level]
+
+    def frame(self, world):
+        # show a battlefield of size world, at zoom 1 from its corner
+        self.world = np.array(world, dtype=float)
+        self.level = CM_ZOOMS.index(1)
+        self.origin = np.zeros(2)
+        self.clamp()
+        self.moved = True
+
+    def pan(self, dx, dy):
+        # scroll the view by screen pixels
+        if dx == 0 and dy == 0:
+            return
+        old = self.origin
+        self.origin = self.origin + np.array([dx, dy]) / self.zoom
+        self.clamp()
+        self.moved = self.moved or not np.array_equal(old, self.origin)
+
+    def zoomAt(self, pos, steps):
+        # zoom in steps levels, out if negative, pos stays over same point
+        level = min(max(self.level + steps, 0), len(CM_ZOOMS) - 1)
+        if level == self.level:
+            return
+        point = self.toWorld(pos)
+        self.level = level
+        self.origin = point - np.asarray(pos) / self.zoom
+        self.clamp()
+        self.moved = True
+
+    def clamp(self):
+        # keep view on battlefield, centered on it when larger
+        view = self.size / self.zoom
+        self.origin = np.where(view >= self.world, (self.world - view) / 2,
+                               np.clip(self.origin, 0, self.world - view))
+
+    def toScreen(self, coords):
+        # screen coords of battlefield coords
+        return (np.asarray(coords) - self.origin) * self.zoom
+
+    def toWorld(self, pos):
+        # battlefield coords of screen coords
+        return np.asarray(pos) / self.zoom + self.origin
+
+    def inside(self, coords):
+        # whether each of coords is in view, margin included
+        low = self.origin - self.margin
+        high = self.origin + self.size / self.zoom + self.margin
+        return ((coords >= low) & (coords <= high)).all(axis=-1)
+
+    def cull(self, coords):
+        # find the rows on screen and where they are drawn, coords by row
+        self.shown = self.inside(coords)
+        self.places = self.toScreen(coords)
+        return int(self.shown.sum())
+
+    def shows(self, rows):
+        # whether any of rows is on screen, as of the last cull
+        return bool(self.shown[rows].any())
+
+    def sprite(self, image):
+        # image of a sprite set at current zoom
+        return assets.zoomed(image, self.zoom)
+
+
+# view of the battle on the screen
+camera = Camera()
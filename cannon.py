@@ -1,13 +1,17 @@
-from settings import C_SPEED, C_RANGE, C_AIM, C_LOAD, C_SIGHT, C_MORALE_MIN
-from settings import C_END_FIRE, C_DELAY, C_ACCURACY, C_MORALE, C_FIRE_ANGLE
+from settings import C_RANGE, C_SIGHT, C_MORALE_MIN
+from settings import C_ACCURACY, C_MORALE
 from settings import C_PANIC_TIME, C_MEN_PER, C_MED_SHELLED, C_AMP_SHELLED
 import pygame
 import math
 from pygame.sprite import Sprite
-from pygame import time
-import random
 import numpy as np
-from cannonball import Cannonball
+from battlestate import state, Column, TargetColumn, CANNON
+from projectiles import ROUND_SHOT
+from spritecache import rotations
+from render import backdrop
+from camera import camera
+from rng import RS_MORALE, RS_PANIC, RS_SHOT
+from perf import traced
 
 
 class Cannon(Sprite):
@@ -19,20 +23,24 @@ class Cannon(Sprite):
 
     Attributes
     ----------
+    idx : int, >= 0
+        row of Cannon in BattleState, which holds the numeric attributes
     screen : pygame.Surface
         Surface on which Cannon is drawn
     ready : pygame.image
         image of Cannon when not shooting
     firing : pygame.image
         image of Cannon when shooting
-    ball : pygame.image
-        image of Cannonball
-    costume : pygame.image
-        current image used by Cannon
+    ball : int
+        sprite of round shot in the projectile pool
+    costumes : tuple of pygame.image
+        images of Cannon by pose
     angle : float
         angle in radians of Cannon to x-axis
     rect : pygame.rect.Rect
         rectangle of Cannon Surface
+    radius : float, > 0
+        half the longest side of Cannon image, bounds hit by Cannonballs
     shiftr : float, > 0
         distance Cannon keeps from center of Battery when in formation
     shiftt : float
@@ -53,9 +61,13 @@ class Cannon(Sprite):
         time in milliseconds when Cannon fired, 0 = no time saved
     panicAngle : float
         angle in radians in which Cannon moves when panicking
+    alive : bool
+        whether Cannon is still part of its Battery
 
     Properties
     ----------
+    costume : pygame.image
+        current image used by Cannon
     relatCoords : float 1-D numpy.ndarray [2]
         coords of Cannon relative to Battery center
     image : pygame.Surface
@@ -63,71 +75,67 @@ class Cannon(Sprite):
 
     Methods
     -------
-    form
-        move Cannon into formation for moving to flag/firing
-    setTarget
-        set targetxy based on targeted coords, shift from center of Battery
-    move
-        point at targetxy, move to targetxy
-    distance
-        measure straight line distance Cannon to coords, 0 if negative coords
-    lookAt
-        point at coordinates
-    setSpeed
-        set vertical, horizontal speed
-    stop
-        stop movement
-    aim
-        set target, point at target
-    update
-        move Cannon based on speed, fire at target if possible
-    panic
-        move Cannon in randomly determined direction while panicking
     startPanic
         set direction Cannon moves away in when panicking
     fire
-        fire when target isn't None, reload after firing
+        fire round shot, called by BattleState when aim time runs out
+    testMorale
+        panic by chance after losses, called by BattleState after volleys
+    getHit
+        reduce size by number of hits, check for panic
+    setRect
+        move rect to current coords without drawing
     blitme
         draw Cannon on screen
 
     """
 
+    coords = Column("coords")
+    velocity = Column("velocity")
+    targetxy = Column("targetxy")
+    angle = Column("angle")
+    oldAngle = Column("oldAngle")
+    panicAngle = Column("panicAngle")
+    shiftr = Column("shiftr")
+    shiftt = Column("shiftt")
+    size = Column("size")
+    maxSize = Column("maxSize")
+    target = TargetColumn("target")
+    panicTime = Column("panicTime")
+    aimedOn = Column("aimedOn")
+    firedOn = Column("firedOn")
+    alive = Column("alive")
+    moving = Column("moving")
+    attackMove = Column("attackMove")
+    defense = Column("defense")
+    radius = Column("radius")
+
     def __init__(self, screen, angle, shiftx, shifty, size, file1, file2,
                  file3, team, coords, defense):
         super().__init__()
+        self.idx = state.add(self, CANNON, team)
         self.screen = screen
+        self.radius = max(file1.get_size()) / 2
         self.ready = file1
         self.firing = file2
-        self.ball = file3
-        self.costume = self.ready
+        self.ball = state.shots.register(file3)
+        self.costumes = (self.ready, self.firing)
         self.angle = angle
         self.oldAngle = angle
-        self.rect = self.image.get_rect()
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume, angle))
         self.shiftr = math.hypot(shiftx, shifty)
         self.shiftt = math.atan2(shifty, shiftx)
         self.rect.center = coords + self.relatCoords
-        self.coords = np.array(self.rect.center, dtype=float)
-        self.velocity = np.array([0, 0], dtype=float)
-        self.moving = False
-        self.attackMove = True
-        self.targetxy = np.array([-1, -1], dtype=float)
-        self.target = None
-        self.aimedOn = -1
-        self.firedOn = -1
-        self.panicAngle = 0
-        self.panicTime = -1
-        self.shot = None
+        self.coords = self.rect.center
         self.size = size * C_MEN_PER
         self.maxSize = self.size
         self.team = team
         self.defense = defense
 
-    def unitInit(self, units):
-        # set allies and enemies
-        self.enemies = [unt for grp in units
-                        for unt in grp.troops if grp.team != self.team]
-        self.allies = [unt for grp in units
-                       for unt in grp.troops if grp.team == self.team]
+    @property
+    def costume(self):
+        # current image used by Cannon, chosen by pose
+        return self.costumes[state.pose[self.idx]]
 
     @property
     def relatCoords(self):
@@ -139,8 +147,7 @@ class Cannon(Sprite):
     @property
     def image(self):
         # image rotated to face current Cannon direction
-        degrees = self.angle * 180 / math.pi
-        return pygame.transform.rotate(self.costume, degrees)
+        return rotations.rotate(self.costume, self.angle)
 
     @property
     def allowShoot(self):
@@ -148,14 +155,10 @@ class Cannon(Sprite):
         return not self.moving or self.attackMove
 
     @property
+    @traced("morale")
     def morale(self):
         # update chance to flee
-        allyDist = self.distanceMany([grp.coords for grp in self.allies])
-        allySize = sum([grp.size for grp, d in zip(self.allies, allyDist)
-                        if d < C_SIGHT])
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        enemySize = sum([grp.size for grp, d in zip(self.enemies, enemyDist)
-                         if d < C_SIGHT])
+        allySize, enemySize = state.strength(self.idx, C_SIGHT)
         deathMorale = C_MORALE_MIN * (1 - (self.size - 1) / self.maxSize)
         if allySize > 0:
             return C_MORALE + deathMorale * enemySize / allySize
@@ -177,169 +180,49 @@ class Cannon(Sprite):
             return []
         return np.linalg.norm(self.coords[None, :] - np.array(coords), axis=1)
 
-    def follow(self, fCoords, fSelect, attackMove, angle, change):
-        # move Infantry to flag
-        altFCoords = fCoords + self.relatCoords
-        if not self.moving:
-            flagPlaced = (fSelect == 0 and self.distance(altFCoords) > C_SPEED)
-        else:
-            flagPlaced = (fSelect == 0 and self.distance(self.targetxy) > C_SPEED)
-        if change:
-            self.attackMove = attackMove
-        if flagPlaced and (self.target is None or not self.attackMove):
-            if not self.moving:
-                self.moving = True
-                self.angle = angle
-                angleDiff = abs(self.oldAngle - self.angle)
-                if 0.5 * math.pi < angleDiff < 1.5 * math.pi:
-                    self.shiftr *= -1
-                self.targetxy = fCoords + self.relatCoords
-            self.move()
-        elif self.moving:
-            self.angle = angle
-            self.oldAngle = self.angle
-            self.stop()
-        if fSelect > 0 and self.moving:
-            self.lookAt(fCoords)
-            self.stop()
-
-    def setTarget(self, coords):
-        # set targetxy based on targetxy coords, shift from center of Battery
-        self.targetxy = coords + self.relatCoords
-
-    def move(self):
-        # point at targetxy, move to targetxy
-        self.lookAt(self.targetxy)
-        self.setSpeed(min(C_SPEED, self.distance(self.targetxy)))
-
-    def distance(self, coords):
-        # measure straight line distance Cannon to coords, 0 if no target
-        if coords[0] == -1:
-            return 0
-        return np.linalg.norm(self.coords - coords)
-
-    def lookAt(self, target):
-        # point at coordinates
-        distance = target - self.coords
-        if distance[0] != 0 or distance[1] != 0:
-            self.angle = math.atan2(-distance[1], distance[0])
-
-    def setSpeed(self, speed):
-        # set vertical, horizontal speed
-        self.velocity = np.array([speed * math.cos(self.angle),
-                                  -speed * math.sin(self.angle)])
-
-    def stop(self):
-        # stop movement
-        self.setSpeed(0)
-        self.moving = False
-        self.attackMove = True
-        self.targetxy = np.array([-1, -1])
-
-    def findTarget(self):
-        # select target
-        if not self.allowShoot:
-            self.target = None
-            return
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        for target, d in zip(self.enemies, enemyDist):
-            seen = d <= C_SIGHT
-            panic = target.panicTime > 0
-            allow = seen and target.size > 0 and self.allowShoot and not panic
-            closer = self.target is None
-            closer = closer or d < self.distance(self.target.coords)
-            if allow and closer:
-                self.target = target
-                if self.moving:
-                    self.oldAngle = self.angle
-                    self.stop()
-                return
-
-    def aim(self):
-        # turn toward selected target
-        self.findTarget()
-        if self.target is None:
-            return
-        self.lookAt(self.target.coords)
-        toTarget = self.distance(self.target.coords)
-        dead = self.target.size == 0 or self.target not in self.enemies
-        dead = dead or self.target.panicTime > 0
-        if toTarget > C_SIGHT or dead or not self.allowShoot:
-            self.target = None
-            self.stop()
-        elif abs(self.oldAngle - self.angle) > C_FIRE_ANGLE:
-            self.oldAngle = self.angle
-            self.stop()
-        elif toTarget > self.range:
-            self.attackMove = True
-            self.targetxy = self.target.coords
-            self.move()
-        else:
-            self.stop()
-
-    def update(self):
-        # move Cannon based on speed, fire at target if possible
-        self.coords += self.velocity
-        self.fire()
-        if self.shot is not None:
-            self.shot.update(self)
-
-    def panic(self):
-        # move Cannon in randomly determined direction while panicking
-        self.target = None
-        self.angle = self.panicAngle
-        self.setSpeed(C_SPEED)
-        self.update()
-        self.panicTime -= 1
-        if self.panicTime == 0:
-            self.size = 0
-
     def startPanic(self):
         # set direction Cannon moves away in when panicking
         self.target = None
-        self.panicAngle = self.angle + math.pi * random.uniform(.75, 1.25)
+        turn = state.rng.uniform(RS_PANIC, self.idx, state.tick, 0, .75, 1.25)
+        self.panicAngle = self.angle + math.pi * turn
         self.panicTime = C_PANIC_TIME
 
     def fire(self):
-        # fire when target isn't None, reload after firing
-        outrange = self.target is None
-        outrange = outrange or self.distance(self.target.coords) > self.range
-        if outrange or not self.allowShoot:
-            self.aimedOn = -1
-        if self.aimedOn == -1 and self.target is not None and self.firedOn == -1:
-            self.aimedOn = C_AIM + random.randint(-C_DELAY, C_DELAY)
-        if self.aimedOn > 0:
-            self.aimedOn -= 1
-        if self.aimedOn == 0:
-            self.costume = self.firing
-            self.firedOn = C_LOAD
-            self.aimedOn = -1
-            angle = self.angle + random.uniform(-C_ACCURACY, C_ACCURACY)
-            self.shot = Cannonball(self.screen, angle, self.ball,
-                                   np.copy(self.coords), self.enemies,
-                                   math.ceil(self.size / C_MEN_PER))
-        if self.firedOn > -1:
-            self.firedOn -= 1
-        if self.firedOn + C_END_FIRE == C_LOAD:
-            self.costume = self.ready
-
-    def getHit(self, hits, bayonet=False):
-        # reduce size by number of hits
-        self.size -= hits
-        morale = self.morale
-        if (random.randint(0, 99) < morale or bayonet) and self.panicTime == -1:
+        # fire round shot, called by BattleState when aim time runs out
+        angle = self.angle + state.rng.uniform(RS_SHOT, self.idx, state.tick,
+                                               0, -C_ACCURACY, C_ACCURACY)
+        state.shots.fire(ROUND_SHOT, self.idx, state.team[self.idx],
+                         self.coords, angle, math.ceil(self.size / C_MEN_PER),
+                         self.ball)
+
+    def testMorale(self, bayonet=False, source=-1):
+        # panic by chance after losses from row source, always at bayonets
+        panic = state.rng.chance(RS_MORALE, self.idx, state.tick, source,
+                                 self.morale)
+        if (panic or bayonet) and self.panicTime == -1:
             self.startPanic()
 
-    def getShelled(self, hits, angle):
+    def getHit(self, hits, bayonet=False, source=-1):
+        # reduce size by number of hits from row source
+        state.wound(self.idx, hits)
+        self.testMorale(bayonet, source)
+
+    def getShelled(self, hits, angle, source=-1):
         # reduce size based on hits, angle
         angleDiff = abs(self.angle - angle)
         loss = (C_MED_SHELLED - math.cos(angleDiff * 2) * C_AMP_SHELLED) // 1
-        self.getHit(loss, False)
+        self.getHit(loss, False, source)
 
-    def blitme(self):
-        # draw Cannon on screen
-        self.rect = self.image.get_rect()
+    def setRect(self):
+        # move rect to current coords without drawing or rotating
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume,
+                                                         self.angle))
         self.rect.center = self.coords
-        self.screen.blit(self.image, self.rect)
-        if self.shot is not None:
-            self.shot.blitme()
+
+    def blitme(self):
+        # draw Cannon on screen, skipped when culled by camera
+        if not camera.shown[self.idx]:
+            return
+        image = rotations.rotate(camera.sprite(self.costume), self.angle)
+        rect = image.get_rect(center=camera.places[self.idx])
+        backdrop.mark(self.screen.blit(image, rect))
@@ -1,10 +1,11 @@
 from settings import I_SPEED, I_GAPX, I_GAPY
-import pygame
 import math
 from pygame.sprite import Sprite
 from pygame import time
 import random
 import numpy as np
+from spritecache import rotations
+from render import backdrop
 
 
 class Cannoneer(Sprite):
@@ -70,6 +71,8 @@ class Cannoneer(Sprite):
         move Cannoneer in randomly determined direction while panicking
     startPanic
         set direction Cannoneer moves away in when panicking
+    setRect
+        move rect to current coords without drawing
     blitme
         draw Cannoneer on screen
 
@@ -101,8 +104,7 @@ class Cannoneer(Sprite):
     @property
     def image(self):
         # image rotated to face current Infantry direction
-        degrees = self.angle * 180 / math.pi
-        return pygame.transform.rotate(self.costume, degrees)
+        return rotations.rotate(self.costume, self.angle)
 
     def form(self, angle, oldAngle, coords):
         # move Infantry into formation for moving to flag/firing
@@ -166,8 +168,12 @@ class Cannoneer(Sprite):
         # set direction Infantry moves away in when panicking
         self.panicAngle = self.angle + math.pi * random.uniform(.75, 1.25)
 
-    def blitme(self):
-        # draw Infantry on screen
+    def setRect(self):
+        # move rect to current coords without drawing
         self.rect = self.image.get_rect()
         self.rect.center = self.coords
-        self.screen.blit(self.image, self.rect)
+
+    def blitme(self):
+        # draw Infantry on screen
+        self.setRect()
+        backdrop.mark(self.screen.blit(self.image, self.rect))
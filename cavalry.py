@@ -1,13 +1,16 @@
-from settings import CV_SPEED, CV_AIM, CV_LOAD, CV_END_FIRE, CV_DELAY
-from settings import CV_BAY_CHANCE, CV_RANGE, CV_SIGHT, CV_MORALE
+from settings import CV_SPEED, CV_SIGHT, CV_MORALE
 from settings import CV_MORALE_MIN, CV_FIRE_ANGLE, CV_PANIC_TIME, CV_PANIC_BAY
-from settings import CV_MED_SHELLED, CV_AMP_SHELLED, CV_ANTI_CAV, CV_ACCEL
+from settings import CV_MED_SHELLED, CV_AMP_SHELLED, CV_ANTI_CAV
 import pygame
 import math
 from pygame.sprite import Sprite
-from pygame import time
-import random
 import numpy as np
+from battlestate import state, Column, TargetColumn, CAVALRY
+from spritecache import rotations
+from render import backdrop
+from camera import camera
+from rng import RS_BAYONET, RS_MORALE, RS_PANIC
+from perf import traced
 
 
 class Cavalry(Sprite):
@@ -19,6 +22,8 @@ class Cavalry(Sprite):
 
     Attributes
     ----------
+    idx : int, >= 0
+        row of Cavalry in BattleState, which holds the numeric attributes
     screen : pygame.Surface
         Surface on which Cavalry is drawn
     ready : pygame.image
@@ -31,6 +36,8 @@ class Cavalry(Sprite):
         angle in radians of Cavalry to x-axis
     rect : pygame.rect.Rect
         rectangle of Cavalry Surface
+    radius : float, > 0
+        half the longest side of Cavalry image, bounds hit by Cannonballs
     shiftr : float, > 0
         distance Cavalry keeps from center of Squadron when in formation
     shiftt : float
@@ -51,6 +58,11 @@ class Cavalry(Sprite):
         time in milliseconds when Cavalry fired, 0 = no time saved
     panicAngle : float
         angle in radians in which Cavalry moves when panicking
+    chargeStart : int
+        battle time in milliseconds when Cavalry started charging, 0 = no
+        charge
+    alive : bool
+        whether Cavalry is still part of its Squadron
 
     Properties
     ----------
@@ -61,73 +73,65 @@ class Cavalry(Sprite):
 
     Methods
     -------
-    form
-        move Cavalry into formation for moving to flag/firing
-    setTarget
-        set targetxy based on targeted coords, shift from center of Squadron
-    move
-        point at targetxy, move to targetxy
-    distance
-        measure straight line distance Cavalry to coords, 0 if negative coords
-    lookAt
-        point at coordinates
-    setSpeed
-        set vertical, horizontal speed
-    stop
-        stop movement
-    aim
-        set target, point at target
-    update
-        move Cavalry based on speed, fire at target if possible
-    panic
-        move Cavalry in randomly determined direction while panicking
+    hitBayonets
+        take losses from defended enemies at end of charge
     startPanic
         set direction Cavalry moves away in when panicking
-    fire
-        fire when target isn't None, reload after firing
+    testMorale
+        panic by chance after losses, called by BattleState after volleys
+    getHit
+        reduce size by number of hits, check for panic
+    setRect
+        move rect to current coords without drawing
     blitme
         draw Cavalry on screen
 
     """
 
+    coords = Column("coords")
+    velocity = Column("velocity")
+    targetxy = Column("targetxy")
+    angle = Column("angle")
+    oldAngle = Column("oldAngle")
+    panicAngle = Column("panicAngle")
+    shiftr = Column("shiftr")
+    shiftt = Column("shiftt")
+    size = Column("size")
+    maxSize = Column("maxSize")
+    chargeStart = Column("chargeStart")
+    target = TargetColumn("target")
+    panicTime = Column("panicTime")
+    aimedOn = Column("aimedOn")
+    firedOn = Column("firedOn")
+    alive = Column("alive")
+    moving = Column("moving")
+    attackMove = Column("attackMove")
+    defense = Column("defense")
+    radius = Column("radius")
+
     def __init__(self, screen, angle, shiftx, shifty, size, team,
                  file1, coords, play, defense):
         super().__init__()
+        self.idx = state.add(self, CAVALRY, team)
         self.screen = screen
+        self.radius = max(file1.get_size()) / 2
         self.ready = file1
         # self.slashing = file2
         self.costume = self.ready
         self.angle = angle
         self.oldAngle = angle
-        self.rect = self.image.get_rect()
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume, angle))
         self.shiftr = math.hypot(shiftx, shifty)
         self.shiftt = math.atan2(shifty, shiftx)
         self.rect.center = coords + self.relatCoords
-        self.coords = np.array(self.rect.center, dtype=float)
-        self.velocity = np.array([0, 0], dtype=float)
-        self.moving = False
-        self.attackMove = True
-        self.chargeStart = 0
+        self.coords = self.rect.center
         # self.formed = False
-        self.targetxy = np.array([-1, -1], dtype=float)
-        self.target = None
-        self.aimedOn = -1
-        self.firedOn = -1
-        self.panicAngle = 0
-        self.panicTime = -1
         self.maxSize = size
         self.size = size
         self.team = team
         self.play = play
         self.defense = defense
 
-    def unitInit(self, units):
-        # set allies and enemies
-        self.enemies = [unt for grp in units
-                        for unt in grp.troops if grp.team != self.team]
-        self.allies = [unt for grp in units
-                       for unt in grp.troops if grp.team == self.team]
-
     @property
     def relatCoords(self):
         # coords of Infantry relative to Company center
@@ -138,8 +142,7 @@ class Cavalry(Sprite):
     @property
     def image(self):
         # image rotated to face current Infantry direction
-        degrees = self.angle * 180 / math.pi
-        return pygame.transform.rotate(self.costume, degrees)
+        return rotations.rotate(self.costume, self.angle)
 
     @property
     def allowShoot(self):
@@ -147,14 +150,10 @@ class Cavalry(Sprite):
         return not self.moving or self.attackMove
 
     @property
+    @traced("morale")
     def morale(self):
         # update chance to flee
-        allyDist = self.distanceMany([grp.coords for grp in self.allies])
-        allySize = sum([grp.size for grp, d in zip(self.allies, allyDist)
-                        if d < CV_SIGHT])
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        enemySize = sum([grp.size for grp, d in zip(self.enemies, enemyDist)
-                         if d < CV_SIGHT])
+        allySize, enemySize = state.strength(self.idx, CV_SIGHT)
         deathMorale = CV_MORALE_MIN * (1 - (self.size - 1) / self.maxSize)
         if allySize > 0:
             return CV_MORALE + deathMorale * enemySize / allySize
@@ -176,115 +175,6 @@ class Cavalry(Sprite):
             return []
         return np.linalg.norm(self.coords[None, :] - np.array(coords), axis=1)
 
-    def follow(self, fCoords, fSelect, attackMove, angle, change):
-        # move Infantry to flag
-        altFCoords = fCoords + self.relatCoords
-        if not self.moving:
-            flagPlaced = (fSelect == 0 and self.distance(altFCoords) > CV_SPEED)
-        else:
-            flagPlaced = (fSelect == 0 and self.distance(self.targetxy) > CV_SPEED)
-        if change:
-            self.attackMove = attackMove
-        if flagPlaced and (self.target is None or not self.attackMove):
-            if not self.moving:
-                self.moving = True
-                self.angle = angle
-                angleDiff = abs(self.oldAngle - self.angle)
-                if 0.5 * math.pi < angleDiff < 1.5 * math.pi:
-                    self.shiftr *= -1
-                self.targetxy = fCoords + self.relatCoords
-            self.move()
-        elif self.moving:
-            self.angle = angle
-            self.oldAngle = self.angle
-            self.stop()
-        if fSelect > 0 and self.moving:
-            self.lookAt(fCoords)
-            self.stop()
-
-    def setTarget(self, coords):
-        # set targetxy based on targetxy coords, shift from center of Company
-        self.targetxy = coords + self.relatCoords
-
-    def move(self):
-        # point at targetxy, move to targetxy
-        self.lookAt(self.targetxy)
-        if self.chargeStart == 0:
-            speed = CV_SPEED
-        else:
-            speed = (time.get_ticks() - self.chargeStart) // 100 * CV_ACCEL
-        self.setSpeed(min(speed, self.distance(self.targetxy)))
-
-    def distance(self, coords):
-        # measure straight line distance Infantry to coords, 0 if no target
-        if coords[0] == -1:
-            return 0
-        return np.linalg.norm(self.coords - coords)
-
-    def lookAt(self, target):
-        # point at coordinates
-        distance = target - self.coords
-        if distance[0] != 0 or distance[1] != 0:
-            self.angle = math.atan2(-distance[1], distance[0])
-
-    def setSpeed(self, speed):
-        # set vertical, horizontal speed
-        self.velocity = np.array([speed * math.cos(self.angle),
-                                  -speed * math.sin(self.angle)])
-
-    def stop(self):
-        # stop movement
-        self.setSpeed(0)
-        self.moving = False
-        self.attackMove = True
-        self.targetxy = np.array([-1, -1])
-
-    def findTarget(self):
-        # select target
-        if not self.allowShoot:
-            self.target = None
-            return
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        for target, d in zip(self.enemies, enemyDist):
-            seen = d <= CV_SIGHT
-            panic = target.panicTime > 0
-            allow = seen and target.size > 0 and self.allowShoot and not panic
-            closer = self.target is None
-            closer = closer or d < self.distance(self.target.coords)
-            if allow and closer:
-                self.target = target
-                if self.moving:
-                    self.oldAngle = self.angle
-                    self.stop()
-                return
-
-    def aim(self):
-        # turn toward selected target
-        self.findTarget()
-        if self.target is None:
-            return
-        self.lookAt(self.target.coords)
-        toTarget = self.distance(self.target.coords)
-        dead = self.target.size == 0 or self.target not in self.enemies
-        dead = dead or self.target.panicTime > 0
-        if toTarget > CV_SIGHT or dead or not self.allowShoot:
-            self.target = None
-            self.stop()
-        elif abs(self.oldAngle - self.angle) > CV_FIRE_ANGLE:
-            self.oldAngle = self.angle
-            self.stop()
-        elif toTarget > self.range:
-            if toTarget > CV_RANGE and self.chargeStart == 0:
-                self.chargeStart = time.get_ticks()
-            self.attackMove = True
-            self.targetxy = self.target.coords
-            self.move()
-        else:
-            if self.chargeStart != 0:
-                self.hitBayonets()
-                self.chargeStart = 0
-            self.stop()
-
     def hitBayonets(self):
         # take losses from defended enemies
         angleDiff = (self.target.angle - self.angle) % (math.pi * 2)
@@ -292,68 +182,47 @@ class Cavalry(Sprite):
         carre = hasattr(self.target, 'formation')
         carre = carre and self.target.formation == "Carre"
         if -CV_FIRE_ANGLE < angleDiff < CV_FIRE_ANGLE or carre:
-            hits = np.random.binomial(self.size, CV_ANTI_CAV / 100)
-            self.getHit(hits)
-
-    def update(self):
-        # move Infantry based on speed, fire at target if possible
-        self.coords += self.velocity
-        self.fire()
-
-    def panic(self):
-        # move Infantry in randomly determined direction while panicking
-        self.target = None
-        self.angle = self.panicAngle
-        self.setSpeed(CV_SPEED)
-        self.update()
-        self.panicTime -= 1
-        if self.panicTime == 0:
-            self.size = 0
+            hits = state.rng.binomial(RS_BAYONET, self.idx, state.tick,
+                                      self.target.idx, self.size,
+                                      CV_ANTI_CAV / 100)
+            self.getHit(hits, False, self.target.idx)
 
     def startPanic(self):
         # set direction Infantry moves away in when panicking
         self.target = None
-        self.panicAngle = self.angle + math.pi * random.uniform(.75, 1.25)
+        turn = state.rng.uniform(RS_PANIC, self.idx, state.tick, 0, .75, 1.25)
+        self.panicAngle = self.angle + math.pi * turn
         self.panicTime = CV_PANIC_TIME
 
-    def fire(self):
-        # fire when target isn't None, reload after firing
-        outrange = self.target is None
-        outrange = outrange or self.distance(self.target.coords) > self.range
-        if outrange or not self.allowShoot:
-            self.aimedOn = -1
-        if self.aimedOn == -1 and self.target is not None and self.firedOn == -1:
-            self.aimedOn = CV_AIM + random.randint(-CV_DELAY, CV_DELAY)
-        if self.aimedOn > 0:
-            self.aimedOn -= 1
-        if self.aimedOn == 0:
-            # self.costume = self.slashing
-            self.firedOn = CV_LOAD
-            self.aimedOn = -1
-            chance = CV_BAY_CHANCE
-            hits = np.random.binomial(self.size, min(chance / 100, 1))
-            self.target.getHit(hits)
-        if self.firedOn > -1:
-            self.firedOn -= 1
-        # if self.firedOn + CV_END_FIRE == CV_LOAD:
-            # self.costume = self.ready
-
-    def getHit(self, hits, bayonet=False):
-        # reduce size by number of hits
-        self.size -= hits
+    def testMorale(self, bayonet=False, source=-1):
+        # panic by chance after losses from row source
         morale = self.morale * CV_PANIC_BAY ** bayonet
-        if random.randint(0, 99) < morale and self.panicTime == -1:
+        panic = state.rng.chance(RS_MORALE, self.idx, state.tick, source,
+                                 morale)
+        if panic and self.panicTime == -1:
             self.startPanic()
-        # print(self.size)
 
-    def getShelled(self, hits, angle):
+    def getHit(self, hits, bayonet=False, source=-1):
+        # reduce size by number of hits from row source
+        state.wound(self.idx, hits)
+        self.testMorale(bayonet, source)
+
+    def getShelled(self, hits, angle, source=-1):
         # reduce size based on hits, angle
         angleDiff = abs(self.angle - angle)
         mult = (CV_MED_SHELLED - math.cos(angleDiff * 2) * CV_AMP_SHELLED) // 1
-        self.getHit(hits * mult)
+        self.getHit(hits * mult, False, source)
 
-    def blitme(self):
-        # draw Infantry on screen
-        self.rect = self.image.get_rect()
+    def setRect(self):
+        # move rect to current coords without drawing or rotating
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume,
+                                                         self.angle))
         self.rect.center = self.coords
-        self.screen.blit(self.image, self.rect)
+
+    def blitme(self):
+        # draw Cavalry on screen, skipped when culled by camera
+        if not camera.shown[self.idx]:
+            return
+        image = rotations.rotate(camera.sprite(self.costume), self.angle)
+        rect = image.get_rect(center=camera.places[self.idx])
+        backdrop.mark(self.screen.blit(image, rect))
@@ -0,0 +1,328 @@
+import gzip
+import pickle
+import numpy as np
+from battlestate import state, COLUMNS
+from projectiles import SHOT_COLUMNS
+from settings import RP_KEYFRAME, TICK_RATE
+
+# orders a player can give a Company from its buttons
+ORDERS = ("toggleBayonets", "formCarre", "formLine")
+
+
+def uid(unit):
+    """ id of a unit that is the same in every run of a battle
+
+    Parameters
+    ----------
+    unit : Battery, Company, Squadron
+        unit to identify
+
+    Returns
+    -------
+    int
+        first BattleState row of unit, rows are handed out in creation order
+    """
+    return unit.rows.start
+
+
+def flagValues(unit):
+    """ Flag variables of a unit as plain values, see Flag """
+    flag = unit.flag
+    return (float(flag.coords[0]), float(flag.coords[1]), int(flag.select),
+            bool(flag.attackMove), float(flag.angle), bool(flag.change))
+
+
+class CommandLog():
+    """Orders given during a battle, kept to play the battle back
+
+    The level and seed fix everything the simulation does on its own, so
+    only orders from outside of it are kept: flags moved by the player,
+    buttons pressed, hotkey spawns and clears. Commands are tuples starting
+    with the tick they were given at. Full state keyframes are taken every
+    period ticks so a replay can start from near any tick.
+
+    Attributes
+    ----------
+    mode : str or None
+        "record", "play" or None for off
+    level : str
+        name of level the battle was loaded from
+    seed : int
+        seed of random numbers of the battle
+    period : int, > 0
+        ticks between keyframes
+    commands : list of tuple
+        tick, kind and arguments of each command, kinds are "flag" (uid,
+        flag values), "order" (uid, name), "ai" (uid, x, y, attackMove),
+        "spawn" (key, color, x, y) and "clear"
+    keyframes : dict of int: dict
+        tick to state of the battle at the end of the tick, only taken
+        when the log is saved to a file
+    flags : dict of int: tuple
+        uid to flag values last recorded or to play back at (tick, uid)
+    file : str or None
+        path the log is saved to, None = not saved
+
+    Methods
+    -------
+    record
+        start recording a battle
+    play
+        start playing back flag commands
+    stop
+        stop recording or playing
+    register
+        remember flag of unit put in play, roster listener
+    flag
+        record or play back flag variables of a unit
+    order
+        record an order given to a unit
+    ai
+        record a move order given to a unit by AI
+    spawn
+        record a unit spawned by hotkey
+    clear
+        record all units removed by hotkey
+    keyframe
+        keep state of the battle every period ticks, if log is saved
+    save
+        write log to file
+    """
+
+    def __init__(self):
+        self.stop()
+
+    def record(self, level, seed, units, file=None, period=RP_KEYFRAME):
+        # start recording a battle of units loaded from level
+        self.mode = "record"
+        self.level = level
+        self.seed = seed
+        self.period = period
+        self.commands = []
+        self.keyframes = {}
+        self.flags = {}
+        self.file = file
+        [self.register(unit, True) for unit in units]
+        state.roster.listen(self.register)
+        self.keyframe(units)
+
+    def play(self, commands):
+        # start playing back flag commands
+        self.mode = "play"
+        self.flags = {(command[0], command[2]): command[3:]
+                      for command in commands if command[1] == "flag"}
+
+    def stop(self):
+        # stop recording or playing
+        self.mode = None
+        self.level = None
+        self.seed = None
+        self.period = RP_KEYFRAME
+        self.commands = []
+        self.keyframes = {}
+        self.flags = {}
+        self.file = None
+
+    def register(self, unit, present):
+        # remember flag of unit put in play, changes are recorded from here
+        if self.mode == "record" and present and unit.play:
+            self.flags.setdefault(uid(unit), flagValues(unit))
+
+    def flag(self, unit):
+        # record flag variables changed by player, or set them in play back
+        if self.mode == "record" and unit.play:
+            values = flagValues(unit)
+            if values != self.flags.get(uid(unit)):
+                self.flags[uid(unit)] = values
+                self.commands.append((state.tick, "flag", uid(unit))
+                                     + values)
+        elif self.mode == "play":
+            values = self.flags.get((state.tick, uid(unit)))
+            if values is None:
+                return
+            x, y, select, attackMove, angle, change = values
+            unit.flag.coords = np.array([x, y])
+            unit.flag.select = select
+            unit.flag.attackMove = attackMove
+            unit.flag.angle = angle
+            unit.flag.change = change
+
+    def order(self, unit, name):
+        # record an order given to a unit, name of unit method
+        if self.mode == "record":
+            self.commands.append((state.tick, "order", uid(unit), name))
+
+    def ai(self, unit, coords, attackMove):
+        # record a move order given to a unit by AI, replays rerun the AI
+        if self.mode == "record":
+            self.commands.append((state.tick, "ai", uid(unit),
+                                  float(coords[0]), float(coords[1]),
+                                  bool(attackMove)))
+
+    def spawn(self, key, color, pos):
+        # record a unit spawned by hotkey
+        if self.mode == "record":
+            self.commands.append((state.tick, "spawn", key, color, *pos))
+
+    def clear(self):
+        # record all units removed by hotkey
+        if self.mode == "record":
+            self.commands.append((state.tick, "clear"))
+
+    def keyframe(self, units):
+        # keep state of the battle every period ticks, if log is saved
+        if self.mode == "record" and self.file is not None \
+                and state.tick % self.period == 0:
+            self.keyframes[state.tick] = snapshot(units)
+
+    def save(self):
+        # write log to file, if there is one
+        if self.mode != "record" or self.file is None:
+            return
+        data = {"level": self.level, "seed": self.seed,
+                "period": self.period, "end": state.tick,
+                "commands": self.commands, "keyframes": self.keyframes}
+        with gzip.open(self.file, "wb") as file:
+            pickle.dump(data, file, pickle.HIGHEST_PROTOCOL)
+
+
+def followed(coords):
+    """ row of troop whose coords a Flag was sent to, -1 if none
+
+    AIcommand sends a Flag to the coords of a troop, which keep following
+    that troop as it moves, so a restored Flag has to follow it as well.
+
+    Parameters
+    ----------
+    coords : numpy.ndarray [2]
+        coords of Flag
+
+    Returns
+    -------
+    int
+        row of BattleState coords viewed by coords, -1 if not a view
+    """
+    if not isinstance(coords, np.ndarray) or coords.base is not state.coords:
+        return -1
+    offset = coords.ctypes.data - state.coords.ctypes.data
+    return offset // state.coords.strides[0]
+
+
+def snapshot(units):
+    """ state of the battle at the end of the current tick
+
+    Parameters
+    ----------
+    units : list of Battery, Company, Squadron
+        units in play, in the order they are processed
+
+    Returns
+    -------
+    dict
+        BattleState rows, units and roster by uid, flags, formations,
+        losses of each team, projectile pool, events run and measurements of
+        the tick
+    """
+    n = state.count
+    shots = state.shots
+    return {
+        "tick": state.tick,
+        "count": n,
+        "columns": {name: getattr(state, name)[:n].copy()
+                    for name in COLUMNS},
+        "units": [uid(unit) for unit in units],
+        "roster": {team: [uid(unit) for unit in members]
+                   for team, members in state.roster.teams.items()},
+        "flags": {uid(unit): (np.copy(unit.flag.coords),
+                              np.copy(unit.flag.oldCoords),
+                              followed(unit.flag.coords))
+                  + flagValues(unit)[2:] for unit in units},
+        "formations": {uid(unit): unit.formation for unit in units
+                       if hasattr(unit, "formation")},
+        "troopFormations": {troop.idx: troop.formation
+                            for troop in state.troops
+                            if hasattr(troop, "formation")},
+        "losses": state.losses.copy(),
+        "events": (list(state.events.fired)
+                   if state.events is not None else []),
+        "shots": ({name: getattr(shots, name).copy()
+                   for name in SHOT_COLUMNS},
+                  [set(hit) for hit in shots.hit]),
+        "near": (state.near.count, state.near.coords, state.near.teams),
+        "density": (state.density.origin.copy(),
+                    dict(state.density.rasters)),
+    }
+
+
+def restore(frame, made):
+    """ put the battle back in the state of a snapshot
+
+    The units of the snapshot must have been created in the same order as
+    in the recorded battle, so their troops hold the same rows, and the
+    events it ran must have been run again.
+
+    Parameters
+    ----------
+    frame : dict
+        state returned by snapshot
+    made : dict of int: Battery, Company, Squadron
+        uid to every unit created so far
+
+    Returns
+    -------
+    list of Battery, Company, Squadron
+        units in play, in the order they are processed
+    """
+    n = frame["count"]
+    if state.count != n:
+        raise ValueError("replay created %d troops, keyframe has %d"
+                         % (state.count, n))
+    state.tick = frame["tick"]
+    state.time = state.tick * 1000 / TICK_RATE
+    for name, column in frame["columns"].items():
+        getattr(state, name)[:n] = column
+    state.losses = frame["losses"].copy()
+    if state.events is not None:
+        state.events.fired = list(frame["events"])
+        state.events.rescan()
+    units = [made[key] for key in frame["units"]]
+    state.roster.teams = {team: {made[key]: None for key in members}
+                          for team, members in frame["roster"].items()}
+    for key, (coords, oldCoords, row, select, attackMove, angle,
+              change) in frame["flags"].items():
+        flag = made[key].flag
+        flag.coords, flag.oldCoords = coords.copy(), oldCoords.copy()
+        if row >= 0:
+            flag.coords = state.coords[row]
+        flag.select, flag.attackMove = select, attackMove
+        flag.angle, flag.change = angle, change
+        flag.rect.center = flag.coords
+    for key, formation in frame["formations"].items():
+        made[key].formation = formation
+    for row, formation in frame["troopFormations"].items():
+        state.troops[row].formation = formation
+    shots = state.shots
+    columns, hits = frame["shots"]
+    shots.release(np.flatnonzero(shots.active))
+    shots.grow(len(hits))
+    for name, column in columns.items():
+        getattr(shots, name)[:len(hits)] = column
+    shots.hit[:len(hits)] = [set(hit) for hit in hits]
+    for unit in made.values():
+        unit.troops = [state.troops[row]
+                       for row in range(unit.rows.start, unit.rows.stop)
+                       if state.alive[row]]
+    [troop.setRect() for troop in state.troops]
+    count, coords, teams = frame["near"]
+    rows = np.flatnonzero(teams >= 0)
+    state.near.build(coords, rows, teams[rows], count)
+    origin, rasters = frame["density"]
+    state.density.origin = origin.copy()
+    state.density.rasters = dict(rasters)
+    state.density.spectra = {}
+    state.density.fields = {}
+    return units
+
+
+# orders of the battle being played
+commands = CommandLog()
@@ -2,14 +2,17 @@
 import math
 from infantry import Infantry
 from settings import I_SPEED, I_RANGE, I_SIGHT, I_GAPY, FB_SIZE, I_GAPX
-from settings import I_FIRE_ANGLE
-from settings import blueImages, greenImages
+from settings import I_FIRE_ANGLE, HEADLESS
+from assets import assets
 from flag import Flag
 from pygame import time
 import pygame
 import random
 import numpy as np
 from button import Button
+from battlestate import state
+from commandlog import commands
+from camera import camera
 
 "click on any Infantry - bring up orders: bayonets, carre, etc."
 
@@ -57,10 +60,8 @@ class Company():
         formation of Company
     defense : bool
         whether unit will ignore AI move orders
-    allies : list of Battery, Company, Squadron
-        list of all units with same team value
-    enemies : list of Battery, Company, Squadron
-        list of all units with different team value
+    rows : slice
+        rows of BattleState holding the troops of Company
 
     Properties
     ----------
@@ -77,8 +78,6 @@ class Company():
 
     Methods
     -------
-    unitInit
-        set allies and enemies
     setSpeed
         set speed to min of default, distance to coords
     distanceMany
@@ -86,21 +85,23 @@ class Company():
     stop
         stop Company, Infantry
     update
-        move Company, update Infantry, panic if necessary
+        drop troops that died or fled, after BattleState update
     follow
-        move Company and Infantry to flag
+        drag flag, pass flag variables to rows of Infantry
     lookAt
         set rotation to angle from current center to new point
     findTarget
         select enemy as target
-    aim
-        turn toward selected target
     getHit
         kill own Infantry when shot
     getShelled
         kill own Infantry hit by cannonball
     orders
         give orders other than move for Company
+    command
+        carry out order given by player, recorded for replays
+    toggleBayonets
+        Company fixes or unfixes bayonets
     formCarre
         Company forms a carre
     formLine
@@ -111,6 +112,8 @@ class Company():
         move to visible allies in combat
     AIcarre
         form carre when idle and charged by cavalry
+    setRect
+        move rects of troops to current coords without drawing
     blitme
         print elements of Company
     __str__
@@ -121,9 +124,9 @@ class Company():
                  strength, play=True, defense=False):
         super().__init__()
         if team == "green":
-            fil1, fil2, fil3, fileFlag = greenImages
+            fil1, fil2, fil3, fileFlag = assets.get("greenCompany")
         elif team == "blue":
-            fil1, fil2, fil3, fileFlag = blueImages
+            fil1, fil2, fil3, fileFlag = assets.get("blueCompany")
         coords = np.array([x, y], dtype=float)
         self.troops = []
         # self.maxSize = sizex * sizey
@@ -140,6 +143,7 @@ class Company():
             self.troops.append(Infantry(screen, angle, shiftx,
                                         shifty, strength, team, fil1, fil2,
                                         fil3, coords, play, defense))
+        self.rows = state.rows(self.troops)
         self.flag = Flag(screen, (x, y), angle, fileFlag, play)
         flags.append(self.flag)
         # 0,1=click,release to show buttons, 2,3=click,release to select
@@ -151,16 +155,9 @@ class Company():
         self.play = play
         self.team = team
         self.formation = "Line"
-        self.oldUnits = []
         # used to id object for testing, not meant to be seen/used
         self.id = fil1
 
-    def unitInit(self, units):
-        # set allies and enemies
-        if units != self.oldUnits:
-            self.oldUnits = units.copy()
-            [unit.unitInit(units) for unit in self.troops]
-
     @property
     def size(self):
         # number of Infantry currently contained in Company
@@ -173,28 +170,27 @@ class Company():
 
     @property
     def health(self):
-        return sum(inf.size for inf in self.troops)
+        sizes = state.size[self.rows]
+        return sizes[state.alive[self.rows]].sum()
+
+    @property
+    def coords(self):
+        # center of troops still in Company
+        coords = state.coords[self.rows]
+        return coords[state.alive[self.rows]].mean(axis=0)
 
     def update(self):
-        # move Company, update Infantry, panic if necessary
-        [unit.panic() for unit in self.troops if unit.panicTime > 0]
-        for unit in self.troops:
-            if unit.size <= 0:
-                self.troops.remove(unit)
-            elif unit.panicTime == -1:
-                unit.update()
+        # drop troops that died or fled, after BattleState update
+        self.troops = [troop for troop in self.troops if troop.alive]
 
     def follow(self, flags):
         # move Company and Infantry to flag
-        if self.play:
+        if self.play and not HEADLESS:
             self.flag.checkDrag(flags)
-        [unit.follow(*self.flagVars) for unit in self.troops]
+        commands.flag(self)
+        state.setFlag(self.rows, *self.flagVars)
         self.flag.change = False
 
-    def aim(self):
-        # turn toward selected target
-        [troop.aim() for troop in self.troops]
-
     def orders(self):
         # give orders other than move for Company
         if not self.play or self.size == 0:
@@ -203,8 +199,9 @@ class Company():
             self.showOrders = 0
         mouse = pygame.mouse.get_pos()
         click = pygame.mouse.get_pressed()[0]
-        touch = any([inf.rect.collidepoint(mouse) for inf in self.troops])
-        coords = self.troops[0].coords
+        point = camera.toWorld(mouse)
+        touch = any([inf.rect.collidepoint(point) for inf in self.troops])
+        coords = tuple(camera.toScreen(self.troops[0].coords))
         buttonCoords = (coords[0], coords[1] + FB_SIZE[1])
         if click and self.showOrders == 0 and touch:
             self.showOrders = 1
@@ -220,15 +217,24 @@ class Company():
         if self.showOrders == 2 and click:
             self.showOrders = 3
             if self.bayonetButton.rect.collidepoint(mouse):
-                for troop in self.troops:
-                    troop.bayonets = not troop.bayonets
+                self.command("toggleBayonets")
             if self.carreButton.rect.collidepoint(mouse):
-                self.formCarre()
+                self.command("formCarre")
             if self.lineButton.rect.collidepoint(mouse):
-                self.formLine()
+                self.command("formLine")
         if self.showOrders == 3 and not click:
             self.showOrders = 0
 
+    def command(self, name):
+        # carry out order name given by player, recorded for replays
+        commands.order(self, name)
+        getattr(self, name)()
+
+    def toggleBayonets(self):
+        # Company fixes or unfixes bayonets
+        for troop in self.troops:
+            troop.bayonets = not troop.bayonets
+
     def formCarre(self):
         # Company forms a carre
         self.formation = "Carre"
@@ -241,6 +247,7 @@ class Company():
 
     def AIcommand(self, coords, attackMove=False):
         # orders company to move to coords
+        commands.ai(self, coords, attackMove)
         self.flag.coords = coords
         self.flag.attackMove = attackMove
 
@@ -249,28 +256,31 @@ class Company():
         if self.play or self.size == 0:
             return
         unit = self.troops[0]
-        allyDist = unit.distanceMany([grp.coords for grp in unit.allies])
-        for ally, d in zip(unit.allies, allyDist):
-            cannon = hasattr(ally, 'shot')
-            canSee = d < I_SIGHT
-            if unit.idle and ally.target is not None and canSee and not cannon:
-                self.AIcommand(ally.target.coords, True)
-                break
+        if not unit.idle:
+            return
+        ally = state.allyInCombat(unit.idx, I_SIGHT)
+        if ally is not None:
+            self.AIcommand(ally.target.coords, True)
 
     def AIcarre(self):
         [troop.AIcarre() for troop in self.troops]
 
+    def setRect(self):
+        # move rects of troops to current coords without drawing
+        [troop.setRect() for troop in self.troops]
+
     def blitme(self):
         # print elements of Company
         if self.showOrders > 1:
             self.bayonetButton.blitme()
             self.carreButton.blitme()
             self.lineButton.blitme()
-            coords = self.troops[0].coords
+            coords = camera.toScreen(self.troops[0].coords)
             healthCoords = (coords[0], coords[1] - FB_SIZE[1])
             self.healthDisp.draw(healthCoords, str(self.health))
             self.healthDisp.blitme()
-        [infantry.blitme() for infantry in self.troops]
+        if camera.shows(self.rows):
+            [infantry.blitme() for infantry in self.troops]
         self.flag.blitme()
 
     def __str__(self):
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+class DensityField():
+    """Size of each team rasterized onto a grid, summed over sight disks
+
+    Built once per tick. Each troop adds its size to the cell it stands
+    in, then the grid of a team is summed over a disk of a given radius
+    around every cell. Finding the strength of a team near a troop is then
+    a single lookup. Disks are filtered lazily, the first time a team and
+    radius are asked for in a tick.
+
+    Attributes
+    ----------
+    cell : float, > 0
+        width and height of a cell in pixels, smaller is closer to exact
+    origin : float 1-D numpy.ndarray [2]
+        coords of corner of cell 0, 0
+    rasters : dict of int: float numpy.ndarray
+        team number to size summed in each cell
+    spectra : dict of (int, tuple): complex numpy.ndarray
+        cached Fourier transforms of rasters by team and padded shape
+    fields : dict of (int, float): tuple of (int, float numpy.ndarray)
+        team number and radius to padding in cells and disk sums
+
+    Methods
+    -------
+    build
+        rasterize size of each team
+    kernel
+        cells within radius of center cell
+    field
+        disk sums of a team, filtered on first use
+    strength
+        total size of team within radius of coords
+    """
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.origin = np.zeros(2)
+        self.rasters = {}
+        self.spectra = {}
+        self.fields = {}
+
+    def build(self, coords, sizes, teams):
+        # rasterize size of each team
+        self.rasters = {}
+        self.spectra = {}
+        self.fields = {}
+        if len(coords) == 0:
+            return
+        self.origin = coords.min(axis=0)
+        cells = np.floor((coords - self.origin) / self.cell).astype(int)
+        shape = tuple(cells.max(axis=0) + 1)
+        flat = np.ravel_multi_index(cells.T, shape)
+        for team in np.unique(teams):
+            mine = teams == team
+            raster = np.bincount(flat[mine], weights=sizes[mine],
+                                 minlength=shape[0] * shape[1])
+            self.rasters[team] = raster.reshape(shape)
+
+    def kernel(self, radius):
+        # cells within radius of center cell, radius in cells returned
+        reach = int(np.ceil(radius / self.cell))
+        offset = np.arange(-reach, reach + 1) * self.cell
+        disk = np.hypot(offset[:, None], offset[None, :]) < radius
+        return reach, disk.astype(float)
+
+    def field(self, team, radius):
+        # disk sums of a team, filtered on first use
+        key = (team, radius)
+        if key not in self.fields:
+            raster = self.rasters[team]
+            reach, disk = self.kernel(radius)
+            shape = tuple(np.array(raster.shape) + 2 * reach)
+            if (team, shape) not in self.spectra:
+                self.spectra[team, shape] = np.fft.rfft2(raster, shape)
+            spectrum = self.spectra[team, shape] * np.fft.rfft2(disk, shape)
+            # full convolution, cell i of raster lands on cell i + reach
+            summed = np.rint(np.fft.irfft2(spectrum, shape))
+            self.fields[key] = (reach, summed)
+        return self.fields[key]
+
+    def strength(self, coords, team, radius):
+        # total size of team within radius of coords
+        if team not in self.rasters:
+            return 0
+        reach, summed = self.field(team, radius)
+        cell = np.floor((coords - self.origin) / self.cell).astype(int)
+        cell += reach
+        if (cell < 0).any() or (cell >= summed.shape).any():
+            return 0
+        return summed[cell[0], cell[1]]
@@ -1,54 +1,307 @@
+import heapq
 import numpy as np
+from settings import EV_CELL
+from battlestate import state
+from perf import traced
 
 
-class SpawnEvent():
-    """ When enough units of target team are in range, spawn units
+class Event():
+    """Units sent into battle when a condition is met
 
     Attributes
     ----------
     coords : float 1-D numpy.ndarray [2], >=0
-        coords of center of SpawnEvent
+        coords spawned units are sent to
+    spawn : list of Company, Battery, Squadron or callable
+        units that will be spawned, or function creating them when the
+        event runs
+    winner : str or None
+        team that wins the battle when the event runs, None = battle goes on
+    number : int, >= 0
+        order the event was added to Events in
+    triggered : bool
+        whether this event has spawned units
+
+    Methods
+    -------
+    run
+        put spawned units in play, send them to coords
+    """
+
+    def __init__(self, x, y, spawn):
+        self.coords = np.array([x, y])
+        self.spawn = spawn
+        self.winner = None
+        self.number = 0
+        self.triggered = False
+
+    def run(self, units):
+        # put spawned units in play, send them to coords
+        if callable(self.spawn):
+            self.spawn = self.spawn()
+        for unit in self.spawn:
+            unit.AIcommand(self.coords, True)
+            state.roster.add(unit)
+        self.triggered = True
+        units.extend(self.spawn)
+
+
+class SpawnEvent(Event):
+    """ When enough units of target team are in range, spawn units
+
+    Parents
+    -------
+    Event
+
+    Attributes
+    ----------
     target : str
         team designation units must have to be detected
     count : int, >= 0
         number of unit formations to trigger event
-    spawn : list of Company, Battery, Squadron
-        units that will be spawned
     radius : int, >= 0
         radius within which Spawn Event checks for units
-    triggered : bool
-        whether this event has spawned units
-
-    Methods
-    -------
-    distanceMany
-        measure straight line distance SpawnEvent to list of coords
-    check
-        check for units, spawn units
+    inside : dict of Company, Battery, Squadron: None
+        units of target team in the zone, as of the last check
     """
 
     def __init__(self, x, y, target, count, radius, spawn):
-        self.coords = np.array([x, y])
+        super().__init__(x, y, spawn)
         self.target = target
         self.count = count
-        self.spawn = spawn
         self.radius = radius
-        self.triggered = False
+        self.inside = {}
+
+
+class TimedEvent(Event):
+    """ At a tick of the battle, spawn units
+
+    Parents
+    -------
+    Event
 
-    def distanceMany(self, coords):
-        # measure straight line distance SpawnEvent to list of coords
-        if len(coords) == 0:
+    Attributes
+    ----------
+    tick : int, >= 0
+        BattleState tick at which units are spawned
+    """
+
+    def __init__(self, tick, x, y, spawn):
+        super().__init__(x, y, spawn)
+        self.tick = tick
+
+
+class CasualtyEvent(Event):
+    """ When a team has lost enough men, spawn units
+
+    Parents
+    -------
+    Event
+
+    Attributes
+    ----------
+    team : str
+        team whose losses are counted
+    losses : int, >= 0
+        men team must have lost to hits and flight
+    """
+
+    def __init__(self, team, losses, x, y, spawn):
+        super().__init__(x, y, spawn)
+        self.team = team
+        self.losses = losses
+
+
+class Events():
+    """Scripted events of a battle, checked once per frame
+
+    Events waiting for a tick sit in a heap ordered by tick, events
+    waiting for losses in one heap per team ordered by losses, so a check
+    only looks at events that are due. Zones of SpawnEvents are indexed by
+    the grid cells of EV_CELL pixels whose centers they cover. A unit is
+    only looked up again when its center moves into another cell, then it
+    leaves the zones of its old cell and enters those of its new one.
+    Events run are kept with their tick, so a replay starting from a
+    keyframe can run them again in the order they first ran.
+
+    Attributes
+    ----------
+    events : list of Event
+        every event added, by number
+    fired : list of tuple
+        tick and number of each event run, in the order they ran
+    winner : str or None
+        team that won the battle by an event, None = battle goes on
+    timed : list of tuple
+        heap of tick, order added, TimedEvent
+    casualties : dict of str: list of tuple
+        team name to heap of losses, order added, CasualtyEvent
+    zones : dict of int: list of SpawnEvent
+        cell key to zones covering the cell
+    cells : dict of Company, Battery, Squadron: int
+        unit in play to key of cell of its center at the last check
+    members : list of Company, Battery, Squadron or None
+        units in play in the order of cells, None = changed since last check
+    fresh : list of SpawnEvent
+        zones added since the last check
+
+    Methods
+    -------
+    add
+        schedule an event
+    enlist
+        follow units put in and taken out of play, roster listener
+    key
+        key of the cell of each of coords
+    centers
+        centers of units, from BattleState columns
+    move
+        update zones of units whose cell changed
+    fire
+        run an event, appending spawned units to units in play
+    rescan
+        look up the cells of all units again at the next check
+    check
+        run events that are due, appending spawned units to units in play
+    """
+
+    def __init__(self):
+        self.events = []
+        self.fired = []
+        self.winner = None
+        self.timed = []
+        self.casualties = {}
+        self.zones = {}
+        self.cells = {}
+        self.members = None
+        self.fresh = []
+        state.roster.listen(self.enlist)
+        for members in state.roster.teams.values():
+            for unit in members:
+                self.enlist(unit, True)
+
+    def add(self, event):
+        # schedule an event
+        event.number = len(self.events)
+        self.events.append(event)
+        if isinstance(event, TimedEvent):
+            heapq.heappush(self.timed, (event.tick, event.number, event))
+        elif isinstance(event, CasualtyEvent):
+            heapq.heappush(self.casualties.setdefault(event.team, []),
+                           (event.losses, event.number, event))
+        else:
+            # every cell whose center is within radius of the zone
+            low = np.floor((event.coords - event.radius) / EV_CELL)
+            high = np.floor((event.coords + event.radius) / EV_CELL)
+            cx, cy = np.meshgrid(np.arange(low[0], high[0] + 1),
+                                 np.arange(low[1], high[1] + 1))
+            centers = (np.column_stack((cx.ravel(), cy.ravel())) + .5)
+            inside = np.hypot(*(centers * EV_CELL - event.coords).T)
+            keys = set(self.key(centers[inside <= event.radius] * EV_CELL))
+            for key in keys:
+                self.zones.setdefault(key, []).append(event)
+            # units already standing in the zone
+            for unit, key in self.cells.items():
+                if key in keys and unit.team == event.target:
+                    event.inside[unit] = None
+            self.fresh.append(event)
+
+    def enlist(self, unit, present):
+        # follow units put in and taken out of play, roster listener
+        self.members = None
+        if not present:
+            # a unit is only inside zones of the cell it was last seen in
+            for zone in self.zones.get(self.cells.pop(unit, None), ()):
+                zone.inside.pop(unit, None)
+
+    def key(self, coords):
+        # key of the cell of each of coords
+        cells = np.floor(np.asarray(coords) / EV_CELL).astype(np.int64)
+        return ((cells[:, 0] << 32) + cells[:, 1]).tolist()
+
+    def centers(self, units):
+        # centers of units, mean coords of alive troops, nan when all died
+        n = state.count
+        alive = state.alive[:n]
+        weighted = np.zeros((n + 1, 3))
+        weighted[1:, :2] = state.coords[:n] * alive[:, None]
+        weighted[1:, 2] = alive
+        weighted = weighted.cumsum(axis=0)
+        start = np.array([unit.rows.start for unit in units], dtype=int)
+        stop = np.array([unit.rows.stop for unit in units], dtype=int)
+        total = weighted[stop] - weighted[start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return total[:, :2] / total[:, 2:]
+
+    def move(self):
+        # update zones of units whose cell changed, return zones entered
+        if self.members is None:
+            self.members = [unit for members in state.roster.teams.values()
+                            for unit in members]
+        if not self.members:
             return []
-        return np.linalg.norm(self.coords[None, :] - np.array(coords), axis=1)
+        centers = self.centers(self.members)
+        keys = self.key(np.nan_to_num(centers, nan=-1e9))
+        entered = []
+        for unit, key in zip(self.members, keys):
+            old = self.cells.get(unit)
+            if old == key:
+                continue
+            self.cells[unit] = key
+            for zone in self.zones.get(old, ()):
+                zone.inside.pop(unit, None)
+            for zone in self.zones.get(key, ()):
+                if unit.team == zone.target:
+                    zone.inside[unit] = None
+                    entered.append(zone)
+        return entered
+
+    def fire(self, number, units):
+        # run an event, appending spawned units to units in play
+        event = self.events[number]
+        event.run(units)
+        self.fired.append((state.tick, number))
+        if event.winner is not None and self.winner is None:
+            self.winner = event.winner
+
+    def rescan(self):
+        # look up the cells of all units again at the next check
+        self.cells = {}
+        self.members = None
+        for key in list(self.zones):
+            self.zones[key] = [zone for zone in self.zones[key]
+                               if not zone.triggered]
+            for zone in self.zones[key]:
+                zone.inside = {}
+            if not self.zones[key]:
+                del self.zones[key]
 
+    @traced("events")
     def check(self, units):
-        # check for units, spawn units
-        detect = [un for un in units if un.team == self.target]
-        detDist = self.distanceMany([un.coords for un in detect])
-        number = sum([1 for d in detDist if d < self.radius])
-        if number >= self.count:
-            for unit in self.spawn:
-                unit.AIcommand(self.coords, True)
-                self.triggered = True
-            return units + self.spawn
-        return units
+        # run events that are due, appending spawned units to units in play
+        due = []
+        while self.timed and self.timed[0][0] <= state.tick:
+            due.append(heapq.heappop(self.timed)[2])
+        for team, heap in self.casualties.items():
+            if team not in state.teams:
+                continue
+            lost = state.losses[state.teams[team]]
+            while heap and heap[0][0] <= lost:
+                due.append(heapq.heappop(heap)[2])
+        if self.zones:
+            zones, self.fresh = self.fresh + self.move(), []
+            for zone in zones:
+                if not zone.triggered and len(zone.inside) >= zone.count:
+                    due.append(zone)
+        # zones entered twice and events a replay ran before its keyframe
+        # are only run once
+        for event in due:
+            if not event.triggered:
+                self.fire(event.number, units)
+        # forget zones that spawned their units
+        if any(isinstance(event, SpawnEvent) for event in due):
+            for key in list(self.zones):
+                self.zones[key] = [zone for zone in self.zones[key]
+                                   if not zone.triggered]
+                if not self.zones[key]:
+                    del self.zones[key]
@@ -3,6 +3,8 @@ from button import Button
 from settings import FB_SIZE, SCALE
 import numpy as np
 import math
+from render import backdrop
+from camera import camera
 
 
 class Flag:
@@ -15,9 +17,9 @@ class Flag:
     image : str
         path to image of Flag - sqrt of SCALE is used for flag
     rect : pygame.rect.Rect
-        rectangle of Flag Surface
+        rectangle of Flag Surface on screen
     coords : float 1-D numpy.ndarray [2], >=0
-        coords of center of Flag
+        battlefield coords of center of Flag
     oldCoords : float 1-D numpy.ndarray [2], >=0
         coords Flag will return to if move is cancelled
     angle : float
@@ -69,6 +71,7 @@ class Flag:
         cancel = pygame.mouse.get_pressed()[2]
         if not idle and self.select == 0:
             return
+        self.rect.center = tuple(camera.toScreen(self.coords))
         if cancel and self.select != 0:
             self.select = 0
             self.coords = self.oldCoords
@@ -105,7 +108,7 @@ class Flag:
                 self.oldCoords = self.coords
                 self.change = True
         if self.select == 1:
-            self.coords = np.asarray(mouse)
+            self.coords = camera.toWorld(mouse)
 
     def lookAt(self):
         # point at coordinates
@@ -113,10 +116,10 @@ class Flag:
         self.angle = math.atan2(-distance[1], distance[0])
 
     def blitme(self):
-        # draw flag, buttons
-        self.rect.center = self.coords
-        if self.draggable:
-            self.screen.blit(self.image, self.rect)
+        # draw flag when on screen, buttons
+        self.rect.center = tuple(camera.toScreen(self.coords))
+        if self.draggable and self.screen.get_rect().colliderect(self.rect):
+            backdrop.mark(self.screen.blit(self.image, self.rect))
         if self.select > 1:
             self.moveButton.blitme()
             self.attackButton.blitme()
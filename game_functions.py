@@ -1,64 +1,110 @@
 import sys
 import pygame
-from settings import BG_COLOR, FLECHE_COLOR, ROAD_COLOR, RIVER_COLOR
 from company import Company
 from squadron import Squadron
 from battery import Battery
-from settings import town
-import cProfile
-import math
+from settings import HEADLESS, CM_PAN
+from render import backdrop
+from camera import camera
+from battlestate import state
+from commandlog import commands
+from perf import phases, tracer, traced
+from profiler import profiler
+from hud import hud
 
 
-def check_events(color, events, units, screen, flags, cprof):
+@traced("check_events")
+def check_events(color, units, screen, flags):
     """ watch keyboard/mouse for events
 
-    When close window button is pressed, exit the game. Other functionality
-    may come later.
+    When close window button is pressed, exit the game. The mouse wheel
+    zooms the camera, arrow keys and dragging with the middle mouse button
+    scroll it. Other functionality may come later.
     """
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            commands.save()
+            tracer.stop()
             sys.exit()
         if event.type == pygame.KEYDOWN:
             if event.unicode == "q":
                 color = "blue"
             if event.unicode == "e":
                 color = "green"
-            if event.unicode == "z":
-                if color == "blue":
-                    units.append(Company(screen, 0, *pygame.mouse.get_pos(),
-                                         2, 2, color, flags, 500))
-                if color == "green":
-                    units.append(Company(screen, 0, *pygame.mouse.get_pos(),
-                                         2, 2, color, flags, 500,
-                                         False))
-            if event.unicode == "x":
-                if color == "blue":
-                    units.append(Battery(screen, 0, *pygame.mouse.get_pos(),
-                                         3, color, flags, 12))
-                if color == "green":
-                    units.append(Battery(screen, 0, *pygame.mouse.get_pos(),
-                                         3, color, flags, 12, False))
-            if event.unicode == "c":
-                if color == "blue":
-                    units.append(Squadron(screen, 0, *pygame.mouse.get_pos(),
-                                          2, 2, color, flags, 120))
-                if color == "green":
-                    units.append(Squadron(screen, 0, *pygame.mouse.get_pos(),
-                                          2, 2, color, flags, 120, False))
+            if event.unicode in ("z", "x", "c"):
+                pos = tuple(camera.toWorld(pygame.mouse.get_pos()).tolist())
+                commands.spawn(event.unicode, color, pos)
+                spawn(units, screen, flags, event.unicode, color, pos)
             if event.unicode == "f":
+                commands.clear()
+                state.roster.clear()
                 units = []
                 flags = []
             if event.unicode == "g":
-                cprof.print_stats('tottime')
-    for event in events:
-        units = event.check(units)
-        if event.triggered:
-            events.remove(event)
+                profiler.report()
+            if event.unicode == "p":
+                profiler.toggle()
+            if event.unicode == "k":
+                profiler.capture()
+            if event.unicode == "h":
+                hud.toggle()
+            if event.unicode == "t":
+                tracer.toggle()
+        if event.type == pygame.MOUSEWHEEL:
+            camera.zoomAt(pygame.mouse.get_pos(), event.y)
+        if event.type == pygame.MOUSEMOTION and event.buttons[1]:
+            camera.pan(-event.rel[0], -event.rel[1])
+    if not HEADLESS:
+        keys = pygame.key.get_pressed()
+        camera.pan(CM_PAN * (keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]),
+                   CM_PAN * (keys[pygame.K_DOWN] - keys[pygame.K_UP]))
     return color, units
 
 
+def spawn(units, screen, flags, key, color, pos):
+    """ put a new unit chosen by hotkey in play
+
+    Parameters
+    ----------
+    units : list of Company, Squadron, Battery
+        all unit formations, new unit is appended
+    screen : pygame.Surface
+        Surface on which sprites are drawn
+    flags : list of Flag
+        all Flag objects, Flag of new unit is appended
+    key : str
+        hotkey pressed, z = Company, x = Battery, c = Squadron
+    color : str
+        team of new unit, blue units are controlled by player
+    pos : tuple of int
+        coords of new unit
+    """
+    play = color == "blue"
+    if key == "z":
+        unit = Company(screen, 0, *pos, 2, 2, color, flags, 500, play)
+    if key == "x":
+        unit = Battery(screen, 0, *pos, 3, color, flags, 12, play)
+    if key == "c":
+        unit = Squadron(screen, 0, *pos, 2, 2, color, flags, 120, play)
+    enlist(units, unit)
+
+
+def enlist(units, unit):
+    """ put a new unit in play
+
+    Parameters
+    ----------
+    units : list of Company, Squadron, Battery
+        all unit formations, unit is appended
+    unit : Company, Squadron, Battery
+        unit added to units and to team roster
+    """
+    units.append(unit)
+    state.roster.add(unit)
+
+
 def update(screen, units, flags):
-    """ run the methods of Companies
+    """ run one tick of the battle and draw it
 
     Parameters
     ----------
@@ -72,52 +118,98 @@ def update(screen, units, flags):
     Modifies
     --------
     screen
-        clear screen to default color
+        draw units after the tick, skipped when HEADLESS
     units
         update position, velocity, target, direction, alive units in formations
     """
-    # redraw screen
-    screen.fill(BG_COLOR)
-    pygame.draw.arc(screen, FLECHE_COLOR, pygame.Rect(770, 550, 40, 30),
-                    math.pi / 4, math.pi * 3 / 2, 5)
-    pygame.draw.arc(screen, FLECHE_COLOR, pygame.Rect(790, 500, 40, 30),
-                    math.pi / 4, math.pi * 3 / 2, 5)
-    pygame.draw.arc(screen, FLECHE_COLOR, pygame.Rect(810, 450, 40, 30),
-                    math.pi / 4, math.pi * 3 / 2, 5)
-    pygame.draw.arc(screen, FLECHE_COLOR, pygame.Rect(520, 400, 40, 30),
-                    math.pi / 2, math.pi * 3 / 2, 5)
-    pygame.draw.arc(screen, FLECHE_COLOR, pygame.Rect(840, 220, 80, 80),
-                    math.pi / 4, math.pi * 3 / 2, 5)
-    pygame.draw.line(screen, RIVER_COLOR, (0, 500), (900, 150), 5)
-    pygame.draw.line(screen, RIVER_COLOR, (900, 150), (1000, 0), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (450, 250), (800, 110), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (450, 250), (450, 800), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (620, 390), (840, 740), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (860, 740), (940, 520), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (940, 520), (700, 150), 5)
-    pygame.draw.line(screen, ROAD_COLOR, (800, 120), (1040, 220), 5)
-    townRect = town.get_rect()
-    screen.blit(town, pygame.Rect(760, 80, *townRect.size))
-    screen.blit(town, pygame.Rect(1000, 180, *townRect.size))
-    screen.blit(town, pygame.Rect(900, 480, *townRect.size))
-    screen.blit(town, pygame.Rect(800, 700, *townRect.size))
-    screen.blit(town, pygame.Rect(580, 350, *townRect.size))
-    screen.blit(town, pygame.Rect(420, 400, *townRect.size))
+    simulate(units, flags)
+    if not HEADLESS:
+        draw(screen, units)
+
+
+@traced("tick")
+def simulate(units, flags):
+    """ run the methods of Companies for one tick
+
+    Parameters
+    ----------
+    units : list of Company, Squadron, Battery
+        all unit formations
+    flags : Flag list
+        all Flag objects
+
+    Modifies
+    --------
+    units
+        update position, velocity, target, direction, alive units in formations
+    """
+    state.advance()
     # remove dead units
-    [units.remove(company) for company in units if company.size == 0]
-    [company.unitInit(units) for company in units]
+    with phases.time("remove"):
+        for company in [company for company in units if company.size == 0]:
+            units.remove(company)
+            state.roster.remove(company)
+    # scripted events of the level, spawned units are appended to units
+    with phases.time("events"):
+        if state.events is not None:
+            state.events.check(units)
     # targeting
-    [company.aim() for company in units]
+    with phases.time("aim"):
+        state.aim()
     # process logic for moving
-    [company.follow(flags) for company in units]
-    # give orders
-    [company.orders() for company in units]
+    with phases.time("follow"):
+        [company.follow(flags) for company in units]
+        state.follow()
     # move companies
-    [company.update() for company in units]
-    # update images
-    [company.blitme() for company in units]
+    with phases.time("update"):
+        state.update()
+        [company.update() for company in units]
+        [company.setRect() for company in units]
     # run AI
-    [company.AIsupport() for company in units]
-    [company.AIcarre() for company in units if hasattr(company, "AIcarre")]
-    # draw screen
-    pygame.display.flip()
+    with phases.time("AIsupport"):
+        state.measureFights()
+        [company.AIsupport() for company in units]
+    with phases.time("AIcarre"):
+        state.measureCharges()
+        [company.AIcarre() for company in units
+         if hasattr(company, "AIcarre")]
+    # keep state for replays, count down profiler capture
+    commands.keyframe(units)
+    profiler.tick()
+
+
+def draw(screen, units, alpha=1):
+    """ give orders, draw units between the last two ticks
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+        Surface on which sprites are drawn
+    units : list of Company, Squadron, Battery
+        all unit formations
+    alpha : float, 0 - 1
+        fraction of the last tick troops are drawn at
+
+    Modifies
+    --------
+    screen
+        restore terrain under last frame's sprites, draw units on screen
+    """
+    # give orders
+    with phases.time("orders"):
+        [company.orders() for company in units]
+    # clear areas drawn over last frame, update images
+    with phases.time("blitme"):
+        if camera.moved:
+            backdrop.invalidate()
+            camera.moved = False
+        backdrop.restore(screen)
+        state.interpolate(alpha)
+        camera.cull(state.drawCoords[:state.count])
+        [company.blitme() for company in units]
+        [backdrop.mark(rect) for rect in state.shots.draw(screen, alpha)]
+    # draw performance overlay over everything else
+    hud.draw(screen, units)
+    # draw areas that changed
+    with phases.time("present"):
+        backdrop.present()
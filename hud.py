@@ -0,0 +1,138 @@
+import gc
+import time
+from collections import deque
+import pygame
+from settings import HUD_HISTORY, HUD_TXT_SIZE, HUD_TXT_COLOR, HUD_BG_COLOR
+from settings import HUD_GRAPH_COLOR, HUD_SLOW_COLOR, FRAME_CAP
+from battlestate import state
+from perf import phases, PHASES
+from spritecache import rotations
+from render import backdrop
+from camera import camera
+
+
+class Hud():
+    """Overlay of performance numbers drawn over the battle
+
+    While shown, phases of the game loop are timed and the times of each
+    frame are drawn next to frame and tick rates, counts of things in play,
+    troops drawn after culling and the zoom, the rotation cache hit rate
+    and the allocation rate, over a graph of recent frame times. Frames
+    slower than the frame budget are drawn in HUD_SLOW_COLOR.
+
+    Attributes
+    ----------
+    enabled : bool
+        whether HUD is drawn
+    font : pygame.font.Font or None
+        font of text, made on first draw
+    frames : collections.deque of float
+        milliseconds of recent frames
+    last : float or None
+        perf_counter at last draw
+    lastTick : int
+        BattleState tick at last draw
+    tickRate : float
+        ticks simulated per second, smoothed
+    collections : int
+        garbage collections run so far
+    allocated : int
+        estimated allocations of tracked objects at last draw
+    allocRate : float
+        allocations per second, smoothed
+
+    Methods
+    -------
+    toggle
+        show or hide HUD
+    collected
+        count garbage collections, gc callback
+    allocations
+        estimated allocations of tracked objects so far
+    draw
+        draw HUD over the battle
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.font = None
+        self.frames = deque(maxlen=HUD_HISTORY)
+        self.last = None
+        self.lastTick = 0
+        self.tickRate = 0
+        self.collections = 0
+        self.allocated = 0
+        self.allocRate = 0
+        gc.callbacks.append(self.collected)
+
+    def toggle(self):
+        # show or hide HUD, phases are only timed while it is shown
+        self.enabled = not self.enabled
+        phases.enabled = self.enabled
+        phases.reset()
+        self.frames.clear()
+        self.last = None
+
+    def collected(self, phase, info):
+        # count garbage collections, each one empties the youngest generation
+        if phase == "stop":
+            self.collections += 1
+
+    def allocations(self):
+        # estimated allocations of tracked objects so far
+        return self.collections * gc.get_threshold()[0] + gc.get_count()[0]
+
+    def draw(self, screen, units):
+        # draw HUD over the battle
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        allocated = self.allocations()
+        if self.last is not None:
+            seconds = now - self.last
+            self.frames.append(1000 * seconds)
+            ticks = (state.tick - self.lastTick) / seconds
+            allocs = (allocated - self.allocated) / seconds
+            self.tickRate += .1 * (ticks - self.tickRate)
+            self.allocRate += .1 * (allocs - self.allocRate)
+        self.last = now
+        self.lastTick = state.tick
+        self.allocated = allocated
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", HUD_TXT_SIZE)
+        frame = self.frames[-1] if self.frames else 0
+        lines = ["frame %.1f ms  %.0f fps" % (frame, 1000 / max(frame, 1)),
+                 "ticks %.0f /s" % self.tickRate]
+        lines += ["%-10s %6.2f ms" % (name, 1000 * phases.total[name])
+                  for name in PHASES if name in phases.total]
+        lines += ["troops %d  units %d  flags %d  shots %d"
+                  % (len(state.liveRows()), len(units),
+                     len({unit.flag for unit in units}),
+                     state.shots.flying),
+                  "drawn %d  zoom %g" % (camera.shown.sum(), camera.zoom),
+                  "rotate cache %.1f %%" % (100 * rotations.hitRate),
+                  "allocs %.0f /s" % self.allocRate]
+        phases.reset()
+        images = [self.font.render(line, True, HUD_TXT_COLOR)
+                  for line in lines]
+        height = self.font.get_linesize()
+        width = max(image.get_width() for image in images)
+        graph = pygame.Rect(4, 4 + height * len(images), max(width, 240), 60)
+        box = pygame.Rect(0, 0, graph.width + 8, graph.bottom + 4)
+        backdrop.mark(screen.fill(HUD_BG_COLOR, box))
+        for n, image in enumerate(images):
+            screen.blit(image, (4, 4 + height * n))
+        # rolling frame time graph, full height = twice the frame budget
+        budget = 1000 / FRAME_CAP
+        for n, ms in enumerate(list(self.frames)[-graph.width:]):
+            bar = min(graph.height, round(graph.height * ms / (2 * budget)))
+            color = HUD_SLOW_COLOR if ms > budget else HUD_GRAPH_COLOR
+            pygame.draw.line(screen, color, (graph.left + n, graph.bottom),
+                             (graph.left + n, graph.bottom - bar))
+        middle = graph.bottom - graph.height // 2
+        pygame.draw.line(screen, HUD_TXT_COLOR, (graph.left, middle),
+                         (graph.right, middle))
+
+
+# performance overlay, toggled by hotkey
+hud = Hud()
@@ -1,13 +1,17 @@
-from settings import I_SPEED, I_RANGE, I_AIM, I_LOAD, I_CHANCE
-from settings import I_END_FIRE, I_DELAY, I_BAY_CHANCE, I_SIGHT, I_MORALE
-from settings import I_MORALE_MIN, I_PANIC_BAY, I_PANIC_TIME, I_FIRE_ANGLE
+from settings import I_SPEED, I_RANGE, I_SIGHT, I_MORALE
+from settings import I_MORALE_MIN, I_PANIC_BAY, I_PANIC_TIME
 from settings import I_MED_SHELLED, I_AMP_SHELLED
 import pygame
 import math
 from pygame.sprite import Sprite
-from pygame import time
-import random
 import numpy as np
+from battlestate import state, Column, TargetColumn
+from battlestate import INFANTRY, READY, CARRE
+from spritecache import rotations
+from render import backdrop
+from camera import camera
+from rng import RS_MORALE, RS_PANIC
+from perf import traced
 "decouple cavalry charge from time"
 "Cannon targetting acting weird"
 "AI charges bayonets vs. cannons, high morale"
@@ -54,20 +58,24 @@ class Infantry(Sprite):
 
     Attributes
     ----------
+    idx : int, >= 0
+        row of Infantry in BattleState, which holds the numeric attributes
     screen : pygame.Surface
         Surface on which Infantry is drawn
     line : pygame.image
         image of Infantry when in line formation
     carre : pygame.image
         image of Infantry when in carre formation
-    costume : pygame.image
-        current image used by Infantry
+    costumes : tuple of pygame.image
+        images of Infantry by pose
     angle : float
         angle in radians of Infantry to x-axis
     oldAngle : float
         angle in radians of Infantry to x-axis saved from last move
     rect : pygame.rect.Rect
         rectangle of Infantry Surface
+    radius : float, > 0
+        half the longest side of Infantry image, bounds hit by Cannonballs
     shiftr : float, > 0
         distance Infantry keeps from center of Company when in formation
     shiftt : float
@@ -104,12 +112,10 @@ class Infantry(Sprite):
         starting number of troops in Infantry
     size : int, >= 0
         number of troops in Infantry - attack, health
+    alive : bool
+        whether Infantry is still part of its Company
     team : str
         team Infantry is on for friend-foe detection
-    allies : list of Cannon, Infantry, Cavalry
-        list of all units with same team value, including self
-    enemies : list of Cannon, Infantry, Cavalry
-        list of all units with different team value
     play : bool
         whether Infantry can be given orders by player
     defense : bool
@@ -117,6 +123,8 @@ class Infantry(Sprite):
 
     Properties
     ----------
+    costume : pygame.image
+        current image used by Infantry
     relatCoords : float 1-D numpy.ndarray [2]
         coords of Infantry relative to Company center
     image : pygame.Surface
@@ -128,70 +136,65 @@ class Infantry(Sprite):
 
     Methods
     -------
-    unitInit
-        set allies and enemies
     distanceMany
         measure straight line distance from Infantry to list of coords
     formCarre
         move Infantry into carre formation
     formLine
         move Infantry into line formation
-    form
-        move Infantry into formation for moving to flag/firing
-    setTarget
-        set targetxy based on targeted coords, shift from center of Company
-    move
-        point at targetxy, move to targetxy
     distance
         measure straight line distance Infantry to coords, 0 if negative coords
-    lookAt
-        point at coordinates
-    setSpeed
-        set vertical, horizontal speed
-    stop
-        stop movement
-    aim
-        set target, point at target
-    update
-        move Infantry based on speed, fire at target if possible
-    panic
-        move Infantry in randomly determined direction while panicking
     startPanic
         set direction Infantry moves away in when panicking
-    fire
-        fire when target isn't None, reload after firing
+    testMorale
+        panic by chance after losses, called by BattleState after volleys
     getHit
         reduce size by number of hits, check for panic
+    setRect
+        move rect to current coords without drawing
     blitme
         draw Infantry on screen
 
     """
 
+    coords = Column("coords")
+    velocity = Column("velocity")
+    targetxy = Column("targetxy")
+    angle = Column("angle")
+    oldAngle = Column("oldAngle")
+    panicAngle = Column("panicAngle")
+    shiftr = Column("shiftr")
+    shiftt = Column("shiftt")
+    size = Column("size")
+    maxSize = Column("maxSize")
+    target = TargetColumn("target")
+    panicTime = Column("panicTime")
+    aimedOn = Column("aimedOn")
+    firedOn = Column("firedOn")
+    alive = Column("alive")
+    moving = Column("moving")
+    attackMove = Column("attackMove")
+    bayonets = Column("bayonets")
+    defense = Column("defense")
+    radius = Column("radius")
+
     def __init__(self, screen, angle, shiftx, shifty, size,
                  team, file1, file2, file3, coords, play, defense):
         super().__init__()
+        self.idx = state.add(self, INFANTRY, team)
         self.screen = screen
+        self.radius = max(file1.get_size()) / 2
         self.line = file1
         self.firing = file2
         self.carre = file3
-        self.costume = self.line
+        self.costumes = (self.line, self.firing, self.carre)
         self.angle = angle
         self.oldAngle = angle
-        self.rect = self.image.get_rect()
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume, angle))
         self.shiftr = math.hypot(shiftx, shifty)
         self.shiftt = math.atan2(shifty, shiftx)
         self.rect.center = coords + self.relatCoords
-        self.coords = np.array(self.rect.center, dtype=float)
-        self.velocity = np.array([0, 0], dtype=float)
-        self.moving = False
-        self.attackMove = True
-        self.bayonets = False
-        self.targetxy = np.array([-1, -1], dtype=float)
-        self.target = None
-        self.aimedOn = -1
-        self.firedOn = -1
-        self.panicAngle = 0
-        self.panicTime = -1
+        self.coords = self.rect.center
         self.formation = "Line"
         self.maxSize = size
         self.size = size
@@ -199,12 +202,10 @@ class Infantry(Sprite):
         self.play = play
         self.defense = defense
 
-    def unitInit(self, units):
-        # set allies and enemies
-        self.enemies = [unt for grp in units
-                        for unt in grp.troops if grp.team != self.team]
-        self.allies = [unt for grp in units
-                       for unt in grp.troops if grp.team == self.team]
+    @property
+    def costume(self):
+        # current image used by Infantry, chosen by pose
+        return self.costumes[state.pose[self.idx]]
 
     @property
     def relatCoords(self):
@@ -216,8 +217,7 @@ class Infantry(Sprite):
     @property
     def image(self):
         # image rotated to face current Infantry direction
-        degrees = self.angle * 180 / math.pi
-        return pygame.transform.rotate(self.costume, degrees)
+        return rotations.rotate(self.costume, self.angle)
 
     @property
     def allowShoot(self):
@@ -225,14 +225,10 @@ class Infantry(Sprite):
         return not self.moving or self.attackMove
 
     @property
+    @traced("morale")
     def morale(self):
         # update chance to flee
-        allyDist = self.distanceMany([grp.coords for grp in self.allies])
-        allySize = sum([grp.size for grp, d in zip(self.allies, allyDist)
-                        if d < I_SIGHT])
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        enemySize = sum([grp.size for grp, d in zip(self.enemies, enemyDist)
-                         if d < I_SIGHT])
+        allySize, enemySize = state.strength(self.idx, I_SIGHT)
         deathMorale = I_MORALE_MIN * (1 - (self.size - 1) / self.maxSize)
         if allySize > 0:
             return I_MORALE + deathMorale * enemySize / allySize
@@ -259,47 +255,12 @@ class Infantry(Sprite):
     def formCarre(self):
         # move Infantry into carre formation
         self.formation = "Carre"
-        self.costume = self.carre
+        state.pose[self.idx] = CARRE
 
     def formLine(self):
         # move Infantry into line formation
         self.formation = "Line"
-        self.costume = self.line
-
-    def follow(self, fCoords, fSelect, attackMove, angle, change):
-        # move Infantry to flag
-        altFCoords = fCoords + self.relatCoords
-        if not self.moving:
-            flagPlaced = (fSelect == 0 and self.distance(altFCoords) > I_SPEED)
-        else:
-            flagPlaced = (fSelect == 0 and self.distance(self.targetxy) > I_SPEED)
-        if change:
-            self.attackMove = attackMove
-        if flagPlaced and (self.target is None or not self.attackMove):
-            if not self.moving:
-                self.moving = True
-                self.angle = angle
-                angleDiff = abs(self.oldAngle - self.angle)
-                if 0.5 * math.pi < angleDiff < 1.5 * math.pi:
-                    self.shiftr *= -1
-                self.targetxy = fCoords + self.relatCoords
-            self.move()
-        elif self.moving:
-            self.angle = angle
-            self.oldAngle = self.angle
-            self.stop()
-        if fSelect > 0 and self.moving:
-            self.lookAt(fCoords)
-            self.stop()
-
-    def setTarget(self, coords):
-        # set targetxy based on targetxy coords, shift from center of Company
-        self.targetxy = coords + self.relatCoords
-
-    def move(self):
-        # point at targetxy, move to targetxy
-        self.lookAt(self.targetxy)
-        self.setSpeed(min(I_SPEED, self.distance(self.targetxy)))
+        state.pose[self.idx] = READY
 
     def distance(self, coords):
         # measure straight line distance Infantry to coords, 0 if no target
@@ -307,143 +268,51 @@ class Infantry(Sprite):
             return 0
         return np.linalg.norm(self.coords - coords)
 
-    def lookAt(self, target):
-        # point at coordinates
-        distance = target - self.coords
-        if distance[0] != 0 or distance[1] != 0:
-            self.angle = math.atan2(-distance[1], distance[0])
-
-    def setSpeed(self, speed):
-        # set vertical, horizontal speed
-        self.velocity = np.array([speed * math.cos(self.angle),
-                                  -speed * math.sin(self.angle)])
-
-    def stop(self):
-        # stop movement
-        self.setSpeed(0)
-        self.moving = False
-        self.attackMove = True
-        self.targetxy = np.array([-1, -1])
-
-    def findTarget(self):
-        # select target
-        if not self.allowShoot:
-            self.target = None
-            return
-        enemyDist = self.distanceMany([grp.coords for grp in self.enemies])
-        for target, d in zip(self.enemies, enemyDist):
-            seen = d <= I_SIGHT
-            panic = target.panicTime > 0
-            allow = seen and target.size > 0 and self.allowShoot and not panic
-            closer = self.target is None
-            closer = closer or d < self.distance(self.target.coords)
-            if allow and closer:
-                self.target = target
-                if self.moving:
-                    self.oldAngle = self.angle
-                    self.stop()
-                return
-
-    def aim(self):
-        # turn toward selected target
-        self.findTarget()
-        if self.target is None:
-            return
-        self.lookAt(self.target.coords)
-        toTarget = self.distance(self.target.coords)
-        dead = self.target.size == 0 or self.target not in self.enemies
-        dead = dead or self.target.panicTime > 0
-        if toTarget > I_SIGHT or dead or not self.allowShoot:
-            self.target = None
-            self.stop()
-        elif abs(self.oldAngle - self.angle) > I_FIRE_ANGLE:
-            self.oldAngle = self.angle
-            self.stop()
-        elif toTarget > self.range:
-            self.attackMove = True
-            self.targetxy = self.target.coords
-            self.move()
-        else:
-            self.stop()
-
-    def update(self):
-        # move Infantry based on speed, fire at target if possible
-        self.coords += self.velocity
-        self.fire()
-
-    def panic(self):
-        # move Infantry in randomly determined direction while panicking
-        self.target = None
-        self.angle = self.panicAngle
-        self.setSpeed(I_SPEED)
-        self.update()
-        self.panicTime -= 1
-        if self.panicTime == 0:
-            self.size = 0
-
     def startPanic(self):
         # set direction Infantry moves away in when panicking
         self.target = None
-        self.panicAngle = self.angle + math.pi * random.uniform(.75, 1.25)
+        turn = state.rng.uniform(RS_PANIC, self.idx, state.tick, 0, .75, 1.25)
+        self.panicAngle = self.angle + math.pi * turn
         self.panicTime = I_PANIC_TIME
 
-    def fire(self):
-        # fire when target isn't None, reload after firing
-        outrange = self.target is None
-        outrange = outrange or self.distance(self.target.coords) > self.range
-        if not self.allowShoot or outrange:
-            self.aimedOn = -1
-        if self.aimedOn == -1 and self.target is not None and self.firedOn == -1:
-            self.aimedOn = I_AIM + random.randint(-I_DELAY, I_DELAY)
-        if self.aimedOn > 0:
-            self.aimedOn -= 1
-        if self.aimedOn == 0:
-            dist = self.distance(self.target.coords)
-            if self.costume != self.carre:
-                self.costume = self.firing
-            self.firedOn = I_LOAD
-            self.aimedOn = -1
-            chance = I_CHANCE * I_RANGE / dist
-            # * max(1, self.target.size // 3)
-            if dist < I_SPEED:
-                # self.costume = self.bayonet
-                chance = I_BAY_CHANCE
-            hits = np.random.binomial(self.size, min(chance / 100, 1))
-            # if random.randint(0, 99) < chance:
-            self.target.getHit(hits, self.bayonets)
-        if self.firedOn > -1:
-            self.firedOn -= 1
-        if self.firedOn + I_END_FIRE == I_LOAD:
-            if self.costume != self.carre:
-                self.costume = self.line
-
-    def getHit(self, hits, bayonet=False):
-        # reduce size by number of hits
-        self.size -= hits
+    def testMorale(self, bayonet=False, source=-1):
+        # panic by chance after losses from row source
         morale = self.morale * I_PANIC_BAY ** bayonet
-        if random.randint(0, 99) < morale and self.panicTime == -1:
+        panic = state.rng.chance(RS_MORALE, self.idx, state.tick, source,
+                                 morale)
+        if panic and self.panicTime == -1:
             self.startPanic()
-        # print(self.size)
 
-    def getShelled(self, hits, angle):
+    def getHit(self, hits, bayonet=False, source=-1):
+        # reduce size by number of hits from row source
+        state.wound(self.idx, hits)
+        self.testMorale(bayonet, source)
+
+    def getShelled(self, hits, angle, source=-1):
         # reduce size based on hits, angle
         angleDiff = abs(self.angle - angle)
         mult = (I_MED_SHELLED - math.cos(angleDiff * 2) * I_AMP_SHELLED) // 1
-        self.getHit(hits * mult)
+        self.getHit(hits * mult, False, source)
 
     def AIcarre(self):
         # form carre when idle and charged by cavalry
         if self.play or self.target is not None:
             return
-        for enmy in self.enemies:
-            if hasattr(enmy, "chargeStart") and enmy.target == self:
-                self.formCarre()
-                return
+        if state.charged[self.idx]:
+            self.formCarre()
+            return
         self.formLine()
 
-    def blitme(self):
-        # draw Infantry on screen
-        self.rect = self.image.get_rect()
+    def setRect(self):
+        # move rect to current coords without drawing or rotating
+        self.rect = pygame.Rect((0, 0), rotations.bounds(self.costume,
+                                                         self.angle))
         self.rect.center = self.coords
-        self.screen.blit(self.image, self.rect)
-        pygame.draw.circle(self.screen, pygame.Color("red"), self.targetxy.astype(int), 1)
+
+    def blitme(self):
+        # draw Infantry on screen, skipped when culled by camera
+        if not camera.shown[self.idx]:
+            return
+        image = rotations.rotate(camera.sprite(self.costume), self.angle)
+        rect = image.get_rect(center=camera.places[self.idx])
+        backdrop.mark(self.screen.blit(image, rect))
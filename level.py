@@ -0,0 +1,121 @@
+from functools import partial
+from company import Company
+from battery import Battery
+from squadron import Squadron
+from battlestate import state
+from terrain import loadTerrain
+from event import Events, TimedEvent, CasualtyEvent, SpawnEvent
+from leveldata import loadTable, UNIT, EVENT, MAP
+
+# unit class of each kind of a units section
+KINDS = {"Battery": Battery, "Company": Company, "Squadron": Squadron}
+
+
+def columns(table, *names):
+    # rows of a table as tuples of plain values of the named columns
+    return zip(*(table[name].tolist() for name in names))
+
+
+def loadUnits(screen, flags, file, section):
+    """create the units of a units section
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+        Surface on which sprites are drawn
+    flags : list of Flag
+        Flags of created units are appended
+    file : str
+        path of scenario
+    section : str
+        name of section, "units" or "units <group>"
+
+    Returns
+    -------
+    list of Battery, Company, Squadron
+        units of section in row order, not added to roster yet
+    """
+    units = []
+    for kind, angle, x, y, sizex, sizey, size, team, strength, play, \
+            defend in columns(loadTable(file, UNIT, section), "kind",
+                              "angle", "x", "y", "sizex", "sizey", "size",
+                              "team", "strength", "play", "defend"):
+        if kind == "Battery":
+            units.append(Battery(screen, angle, x, y, size, team, flags,
+                                 strength, play, defend))
+        else:
+            units.append(KINDS[kind](screen, angle, x, y, sizex, sizey,
+                                     team, flags, strength, play, defend))
+    return units
+
+
+def loadEvents(screen, flags, file, section):
+    """schedule the events of an events or victory section
+
+    Units of the group of an event are only read and created when the
+    event runs.
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+        Surface on which spawned sprites are drawn
+    flags : list of Flag
+        Flags of spawned units are appended
+    file : str
+        path of scenario
+    section : str
+        name of section, "events" or "victory"
+    """
+    for kind, tick, team, losses, x, y, radius, count, group, winner in \
+            columns(loadTable(file, EVENT, section), "kind", "tick", "team",
+                    "losses", "x", "y", "radius", "count", "group",
+                    "winner"):
+        spawn = []
+        if group:
+            spawn = partial(loadUnits, screen, flags, file, "units " + group)
+        if kind == "timed":
+            event = TimedEvent(tick, x, y, spawn)
+        elif kind == "losses":
+            event = CasualtyEvent(team, losses, x, y, spawn)
+        else:
+            event = SpawnEvent(x, y, team, count, radius, spawn)
+        event.winner = winner or None
+        state.events.add(event)
+
+
+def loadLevel(screen, flags, name="Borodino"):
+    """create terrain, units and events of a level
+
+    A level is one scenario file, levels/<name>.scenario, whose sections
+    are compiled once per version of the file, see loadTable. The size of
+    the battlefield, terrain, units in play at the start, events and
+    victory conditions are loaded here, units of reinforcement groups when
+    their event runs. Without a map section the battlefield is the size of
+    the screen.
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+        Surface on which sprites are drawn
+    flags : list of Flag
+        Flags of created units are appended
+    name : str
+        level name
+
+    Returns
+    -------
+    list of Battery, Company, Squadron
+        units of level in creation order, not added to roster yet
+    """
+    file = 'levels/' + name + '.scenario'
+    size = loadTable(file, MAP, "map")
+    if len(size["width"]):
+        size = (int(size["width"][0]), int(size["height"][0]))
+    else:
+        size = screen.get_size()
+    state.terrain = loadTerrain(file, size)
+    units = loadUnits(screen, flags, file, "units")
+    state.events = Events()
+    loadEvents(screen, flags, file, "events")
+    loadEvents(screen, flags, file, "victory")
+    return units
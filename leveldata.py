@@ -0,0 +1,160 @@
+import csv
+import glob
+import hashlib
+import os
+import numpy as np
+from settings import LV_CACHE
+
+# column types of scenario sections, columns missing from a section are
+# filled in
+UNIT = {"kind": str, "x": float, "y": float, "angle": float, "sizex": int,
+        "sizey": int, "size": int, "team": str, "strength": int,
+        "play": bool, "defend": bool}
+TERRAIN = {"kind": str, "x1": float, "y1": float, "x2": float, "y2": float,
+           "start": float, "stop": float, "width": float}
+MAP = {"width": int, "height": int}
+EVENT = {"kind": str, "tick": int, "team": str, "losses": int, "x": float,
+         "y": float, "radius": float, "count": int, "group": str,
+         "winner": str}
+
+# sections of scenario files by file hash, tables parsed in this process
+# by file hash and section
+indexed = {}
+parsed = {}
+
+
+def parse(value, kind):
+    """ value of one csv cell, empty cells are 0, False or ""
+
+    Parameters
+    ----------
+    value : str
+        text of cell
+    kind : type
+        float, int, bool or str
+
+    Returns
+    -------
+    float, int, bool or str
+        value of cell, bools are written TRUE or FALSE
+    """
+    value = value.strip()
+    if kind is bool:
+        return value.upper() in ("TRUE", "1")
+    if kind is str:
+        return value
+    if value == "":
+        return kind(0)
+    return kind(float(value)) if kind is int else kind(value)
+
+
+def sections(file):
+    """ hash of a scenario file and where each of its sections is
+
+    A section starts with its name in square brackets on a line of its
+    own, followed by a csv table with a header row. Lines starting with #
+    are comments. Only the section headers are looked at, tables are
+    parsed when they are loaded.
+
+    Parameters
+    ----------
+    file : str
+        path of scenario file
+
+    Returns
+    -------
+    digest : str
+        hash of contents of file
+    index : dict of str: tuple of int
+        section name to start and end in bytes of its table
+    """
+    with open(file, "rb") as scenario:
+        data = scenario.read()
+    digest = hashlib.sha1(data).hexdigest()[:16]
+    if digest in indexed:
+        return digest, indexed[digest]
+    index, name, start, offset = {}, None, 0, 0
+    for line in data.splitlines(keepends=True):
+        text = line.strip()
+        if text.startswith(b"[") and text.endswith(b"]"):
+            if name is not None:
+                index[name] = (start, offset)
+            name, start = text[1:-1].strip().decode(), offset + len(line)
+        offset += len(line)
+    if name is not None:
+        index[name] = (start, offset)
+    indexed[digest] = index
+    return digest, index
+
+
+def readTable(text, columns):
+    """ read a csv table into typed column arrays
+
+    Parameters
+    ----------
+    text : str
+        csv with a header row, lines starting with # are skipped
+    columns : dict of str: type
+        name to type of each column read, float, int, bool or str
+
+    Returns
+    -------
+    dict of str: numpy.ndarray
+        name to values of each column, in row order
+    """
+    lines = [line for line in text.splitlines()
+             if line.strip() and not line.lstrip().startswith("#")]
+    rows = list(csv.DictReader(lines))
+    return {name: np.array([parse(row.get(name) or "", kind)
+                            for row in rows], dtype=kind)
+            for name, kind in columns.items()}
+
+
+def loadTable(file, columns, section):
+    """ column arrays of a section, compiled once per version of the file
+
+    Tables already parsed in this process are reused, otherwise the
+    compiled table LV_CACHE/<file>-<hash>-<section>.npz is loaded, and
+    only when that is missing is the section parsed and compiled.
+    Compiled tables of older versions of the file are deleted. A missing
+    section is an empty table.
+
+    Parameters
+    ----------
+    file : str
+        path of scenario file
+    columns : dict of str: type
+        name to type of each column read, float, int, bool or str
+    section : str
+        name of section
+
+    Returns
+    -------
+    dict of str: numpy.ndarray
+        name to values of each column, in row order
+    """
+    digest, index = sections(file)
+    if (digest, section) in parsed:
+        return parsed[digest, section]
+    name = os.path.splitext(os.path.basename(file))[0]
+    cache = os.path.join(LV_CACHE, "%s-%s-%s.npz"
+                         % (name, digest, section.replace(" ", "_")))
+    try:
+        with np.load(cache) as compiled:
+            table = {column: compiled[column] for column in columns}
+    except (OSError, KeyError, ValueError):
+        start, stop = index.get(section, (0, 0))
+        with open(file, "rb") as scenario:
+            scenario.seek(start)
+            table = readTable(scenario.read(stop - start).decode(), columns)
+        try:
+            os.makedirs(LV_CACHE, exist_ok=True)
+            for old in glob.glob(os.path.join(LV_CACHE, name + "-*.npz")):
+                if digest not in old:
+                    os.remove(old)
+            np.savez(cache, **table)
+        except OSError:
+            # read-only install, parse again next start
+            pass
+    parsed[digest, section] = table
+    return table
@@ -0,0 +1,168 @@
+import argparse
+import json
+import os
+import signal
+import sys
+from multiprocessing import get_context
+# battles are never drawn, must be set before settings makes the screen
+os.environ.setdefault("MUSKETCRAFT_HEADLESS", "1")
+import numpy as np  # noqa: E402
+from settings import SCREEN, MC_TIMEOUT, MC_CHECK  # noqa: E402
+from game_functions import simulate  # noqa: E402
+from battlestate import state  # noqa: E402
+from level import loadLevel  # noqa: E402
+
+
+def strengths():
+    """ size of each team still in play, by team name
+
+    Returns
+    -------
+    dict of str: int
+        team name to number of men in troops alive and in play
+    """
+    rows = state.liveRows()
+    sizes = np.bincount(state.team[rows], weights=state.size[rows],
+                        minlength=len(state.teams))
+    return {name: int(sizes[team]) for name, team in state.teams.items()}
+
+
+def battle(level, seed, timeout=MC_TIMEOUT, check=MC_CHECK):
+    """ run one headless battle until one team is left or time runs out
+
+    A victory condition of the level met ends the battle as well, its
+    winner wins.
+
+    Parameters
+    ----------
+    level : str
+        name of level fought, see loadLevel
+    seed : int
+        seed of random numbers of the battle
+    timeout : int, > 0
+        most ticks simulated
+    check : int, > 0
+        ticks between checks for victory
+
+    Returns
+    -------
+    dict
+        seed, winner (team name or None for a draw or timeout), ticks
+        simulated, men of each team at start and end, casualties of each
+        team
+    """
+    state.reset(seed=seed)
+    flags = []
+    units = loadLevel(SCREEN, flags, level)
+    [state.roster.add(unit) for unit in units]
+    start = strengths()
+    end = start
+    while state.tick < timeout:
+        for step in range(min(check, timeout - state.tick)):
+            simulate(units, flags)
+        end = strengths()
+        if state.events.winner is not None or \
+                sum(size > 0 for size in end.values()) <= 1:
+            break
+    standing = [name for name, size in end.items() if size > 0]
+    winner = standing[0] if len(standing) == 1 else None
+    if state.events.winner is not None:
+        winner = state.events.winner
+    return {"seed": seed, "winner": winner, "ticks": state.tick,
+            "start": start, "end": end,
+            "casualties": {name: int(state.losses[team])
+                           for name, team in state.teams.items()}}
+
+
+def quietWorker():
+    # let a worker die on SIGTERM, settings starts pygame, which turns it
+    # into a quit event
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def fight(job):
+    # run one battle in a worker process, job = level, seed, timeout, check
+    return battle(*job)
+
+
+def summarize(results):
+    """ win rates, casualties and ticks to resolution of many battles
+
+    Parameters
+    ----------
+    results : list of dict
+        battles returned by battle
+
+    Returns
+    -------
+    dict
+        number of runs, win rate of each team and of draws, mean,
+        standard deviation and 5/50/95 percentiles of casualties of each
+        team and of ticks of decided battles
+    """
+    def spread(values):
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return None
+        low, median, high = np.percentile(values, [5, 50, 95])
+        return {"mean": values.mean(), "std": values.std(), "p5": low,
+                "p50": median, "p95": high}
+
+    runs = len(results)
+    teams = sorted({name for result in results for name in result["start"]})
+    winners = [result["winner"] for result in results]
+    return {
+        "runs": runs,
+        "winRate": dict({name: winners.count(name) / runs
+                         for name in teams}, draw=winners.count(None) / runs),
+        "casualties": {name: spread([result["casualties"][name]
+                                     for result in results])
+                       for name in teams},
+        "ticks": spread([result["ticks"] for result in results
+                         if result["winner"] is not None]),
+    }
+
+
+def main(argv=None):
+    """ run many battles of a level in parallel, print and save summary """
+    parser = argparse.ArgumentParser(
+        description="Run headless battles with different seeds and report "
+                    "win rates, casualties and ticks to resolution.")
+    parser.add_argument("--level", default="Borodino",
+                        help="level fought, file levels/<level>.scenario")
+    parser.add_argument("--runs", type=int, default=os.cpu_count(),
+                        help="number of battles")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of first battle, battle i uses seed + i")
+    parser.add_argument("--timeout", type=int, default=MC_TIMEOUT,
+                        help="most ticks of a battle")
+    parser.add_argument("--check", type=int, default=MC_CHECK,
+                        help="ticks between checks for victory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="number of processes")
+    parser.add_argument("--out", help="write results as json to this file")
+    args = parser.parse_args(argv)
+    jobs = [(args.level, args.seed + i, args.timeout, args.check)
+            for i in range(args.runs)]
+    results = []
+    # fresh interpreters, workers don't inherit the pygame display
+    with get_context("spawn").Pool(args.workers, quietWorker) as pool:
+        for result in pool.imap_unordered(fight, jobs):
+            results.append(result)
+            print("seed %d: %s after %d ticks" % (
+                result["seed"], result["winner"] or "no winner",
+                result["ticks"]), file=sys.stderr)
+        pool.close()
+        pool.join()
+    results.sort(key=lambda result: result["seed"])
+    summary = summarize(results)
+    print(json.dumps(summary, indent=2, default=float))
+    if args.out:
+        with open(args.out, "w") as file:
+            json.dump({"summary": summary, "battles": results}, file,
+                      indent=2, default=float)
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,30 @@
 import pygame
-from settings import SCREEN
-from game_functions import check_events, update
-from company import Company
-from battery import Battery
-from squadron import Squadron
-from event import SpawnEvent
-import pandas as pd
+from settings import SCREEN, HEADLESS, TICK_RATE, FRAME_CAP, MAX_LAG
+from settings import RP_FILE
+from game_functions import check_events, simulate, draw
+from timestep import FixedStep
+from battlestate import state
 import math
-import cProfile
+from render import backdrop
+from camera import camera
+from level import loadLevel
+from commandlog import commands
 
 
-def runGame():
+def runGame(ticks=None, seed=None, level="Borodino", replay=RP_FILE):
     """initialize game, loop through gameplay functins until quit
 
+    Parameters
+    ----------
+    ticks : int or None
+        number of ticks simulated before returning, None = no limit
+    seed : int or None
+        seed of random numbers of the battle, None = new random seed
+    level : str
+        name of level played, see loadLevel
+    replay : str or None
+        file the battle is recorded to, None = kept in memory only
+
     Modifies
     --------
     screen
@@ -21,40 +33,35 @@ def runGame():
         create list of formations of units
     """
     # init game, screen, settings
-    cprof = cProfile.Profile()
-    cprof.enable()
     screen = SCREEN
-    pygame.display.set_caption("Musketcraft")
+    if not HEADLESS:
+        pygame.display.set_caption("Musketcraft")
     flags = []
-    infantry = pd.read_csv('levels/BorodinoInfantry.csv')
-    cannon = pd.read_csv('levels/BorodinoCannon.csv')
-    cavalry = pd.read_csv('levels/BorodinoCavalry.csv')
-    units = []
-    for row in cannon.itertuples(False):
-        units.append(Battery(screen, row.angle, row.x, row.y, row.size,
-                             row.team, flags, row.strength,
-                             row.play, row.defend))
-    for row in infantry.itertuples(False):
-        units.append(Company(screen, row.angle, row.x, row.y, row.sizex,
-                             row.sizey, row.team, flags, row.strength,
-                             row.play, row.defend))
-    for row in cavalry.itertuples(False):
-        units.append(Squadron(screen, row.angle, row.x, row.y, row.sizex,
-                              row.sizey, row.team, flags, row.strength,
-                              row.play, row.defend))
-    # spawn = [Company(screen, 0, 100, 100, 3, 5, "green", flags, False, False)]
-    # events = [SpawnEvent(600, 400, "blue", 1, 100, spawn)]
-    events = []
-
-    [company.unitInit(units) for company in units]
+    state.reset(seed=seed)
+    units = loadLevel(screen, flags, level)
+    camera.frame(state.terrain.size)
+    backdrop.invalidate()
+    [state.roster.add(unit) for unit in units]
+    commands.record(level, state.rng.seed, units, replay)
     color = "blue"
     # main loop
-    while True:
-        color, units = check_events(color, events, units, screen, flags, cprof)
-        test = update(screen, units, flags)
-        if(test == "restart"):
-            break
+    clock = FixedStep(TICK_RATE, FRAME_CAP, MAX_LAG)
+    tick = 0
+    while ticks is None or tick < ticks:
+        color, units = check_events(color, units, screen, flags)
+        # headless runs as fast as it can, one tick per loop
+        steps = 1 if HEADLESS else clock.steps()
+        if ticks is not None:
+            steps = min(steps, ticks - tick)
+        for step in range(steps):
+            simulate(units, flags)
+        tick += steps
+        if not HEADLESS:
+            draw(screen, units, clock.alpha)
+    commands.save()
+    return units
 
 
-while True:
-    runGame()
+if __name__ == "__main__":
+    while True:
+        runGame()
@@ -0,0 +1,210 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from settings import TC_FILE, TC_FLUSH
+
+
+class Tracer():
+    """Spans of game loop calls written as Chrome trace events
+
+    Spans are appended to an in-memory buffer as plain tuples. A writer
+    thread turns them into trace events and appends them to the file every
+    TC_FLUSH seconds, so the game loop never formats or writes while it is
+    being traced. The file opens in chrome://tracing or Perfetto.
+
+    Attributes
+    ----------
+    enabled : bool
+        whether spans are recorded
+    buffer : collections.deque of tuple
+        name, start and end in nanoseconds of spans not yet written
+    file : file object or None
+        trace being written
+    writer : threading.Thread or None
+        thread writing buffer to file
+    done : threading.Event
+        set to stop writer
+    first : bool
+        whether no event was written to file yet
+
+    Methods
+    -------
+    start
+        start recording spans into a new trace file
+    stop
+        stop recording, write remaining spans and close file
+    toggle
+        start if stopped, stop if recording
+    add
+        record a span, called by traced calls and timed phases
+    write
+        write buffered spans to file
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.buffer = deque()
+        self.file = None
+        self.writer = None
+        self.done = threading.Event()
+        self.first = True
+
+    def start(self, file=TC_FILE):
+        # start recording spans into a new trace file
+        if self.enabled:
+            return
+        self.file = open(file, "w")
+        self.file.write("[\n")
+        self.first = True
+        self.done.clear()
+        self.writer = threading.Thread(target=self.flush, daemon=True)
+        self.writer.start()
+        self.enabled = True
+
+    def stop(self):
+        # stop recording, write remaining spans and close file
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.done.set()
+        self.writer.join()
+        self.write()
+        self.file.write("\n]\n")
+        self.file.close()
+        self.file = None
+
+    def toggle(self):
+        # start if stopped, stop if recording
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def add(self, name, start, end):
+        # record a span, times from perf_counter_ns
+        self.buffer.append((name, start, end))
+
+    def flush(self):
+        # write buffered spans every TC_FLUSH seconds until done
+        while not self.done.wait(TC_FLUSH):
+            self.write()
+
+    def write(self):
+        # write buffered spans to file
+        pid, tid = os.getpid(), threading.main_thread().ident
+        events = []
+        while self.buffer:
+            name, start, end = self.buffer.popleft()
+            events.append(json.dumps({"name": name, "ph": "X", "pid": pid,
+                                      "tid": tid, "ts": start / 1000,
+                                      "dur": (end - start) / 1000}))
+        if events:
+            self.file.write(("" if self.first else ",\n")
+                            + ",\n".join(events))
+            self.first = False
+
+
+def traced(name):
+    """ record calls of the decorated function as spans named name
+
+    Parameters
+    ----------
+    name : str
+        name of spans in trace
+
+    Returns
+    -------
+    callable
+        decorator, wrapped function only checks a flag when not tracing
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def call(*args, **kwargs):
+            if not tracer.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                tracer.add(name, start, time.perf_counter_ns())
+        return call
+    return decorate
+
+
+class Phases():
+    """Wall time spent in each phase of the game loop
+
+    simulate and draw wrap each of their phases in time, which adds the
+    time the phase took to its total while timing is enabled, and records
+    it as a span while tracing. Otherwise it costs two flag checks.
+
+    Attributes
+    ----------
+    enabled : bool
+        whether phases are timed
+    total : dict of str: float
+        phase name to seconds spent in phase since last reset
+    calls : dict of str: int
+        phase name to times phase ran since last reset
+    last : dict of str: float
+        phase name to seconds the last run of phase took
+    name : str or None
+        phase started by the last call of time
+    running : list of tuple
+        name and perf_counter_ns at start of phases being timed
+
+    Methods
+    -------
+    time
+        time the phase run inside the with block
+    reset
+        forget times measured so far
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.name = None
+        self.running = []
+        self.reset()
+
+    def time(self, name):
+        # time the phase run inside the with block
+        self.name = name
+        return self
+
+    def __enter__(self):
+        if self.enabled or tracer.enabled:
+            self.running.append((self.name, time.perf_counter_ns()))
+        return self
+
+    def __exit__(self, *exc):
+        if not self.running:
+            return False
+        name, start = self.running.pop()
+        end = time.perf_counter_ns()
+        if tracer.enabled:
+            tracer.add(name, start, end)
+        if self.enabled:
+            spent = (end - start) / 1e9
+            self.total[name] = self.total.get(name, 0) + spent
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self.last[name] = spent
+        return False
+
+    def reset(self):
+        # forget times measured so far
+        self.total = {}
+        self.calls = {}
+        self.last = {}
+
+
+# phases of simulate and draw, in the order they run
+PHASES = ("remove", "events", "aim", "follow", "update", "AIsupport",
+          "AIcarre", "orders", "blitme", "present")
+# spans of the game loop, started by hotkey
+tracer = Tracer()
+# time spent in phases of the game loop
+phases = Phases()
@@ -0,0 +1,196 @@
+import cProfile
+import pstats
+import sys
+import threading
+from collections import Counter
+from settings import PF_MODE, PF_INTERVAL, PF_CAPTURE, PF_FILE
+
+
+class Sampler(threading.Thread):
+    """Thread reading the stack of another thread at a fixed interval
+
+    Costs the profiled thread one short wait for the interpreter lock per
+    sample instead of a hook on every call, so long sessions run at close
+    to full speed.
+
+    Attributes
+    ----------
+    target : int
+        id of thread sampled
+    interval : float, > 0
+        seconds between samples
+    stacks : collections.Counter
+        collapsed stack, outermost call first, to number of samples
+    done : threading.Event
+        set to stop sampling
+
+    Methods
+    -------
+    run
+        sample stack of target until done
+    """
+
+    def __init__(self, target, interval):
+        super().__init__(daemon=True)
+        self.target = target
+        self.interval = interval
+        self.stacks = Counter()
+        self.done = threading.Event()
+
+    def run(self):
+        # sample stack of target until done
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append("%s:%s" % (code.co_filename.split("/")[-1],
+                                        code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class Profiler():
+    """Profiler of the game loop, off until started
+
+    "trace" mode runs cProfile, which times every call exactly but slows
+    the call-heavy tick down a lot. "sample" mode reads the main thread's
+    stack every PF_INTERVAL seconds from a Sampler, which barely slows the
+    game down and suits long sessions. Either mode can run until stopped
+    or capture a number of ticks and write them to a file.
+
+    Attributes
+    ----------
+    mode : str
+        "trace" or "sample", mode of last start
+    profile : cProfile.Profile or None
+        deterministic profile of last trace
+    tracing : bool
+        whether profile is enabled
+    sampler : Sampler or None
+        sampler of last sample
+    remaining : int, >= 0
+        ticks left to capture, 0 = not capturing
+    file : str
+        path without extension captures are written to
+
+    Properties
+    ----------
+    running : bool
+        whether profiler is collecting
+
+    Methods
+    -------
+    start
+        start collecting in mode
+    stop
+        stop collecting, results are kept until next start
+    toggle
+        start if stopped, stop if running
+    capture
+        collect for a number of ticks, then write results to file
+    tick
+        count down ticks of a capture, called once per tick
+    write
+        write results to pstats file or collapsed stack file
+    report
+        print most expensive functions
+    """
+
+    def __init__(self):
+        self.mode = PF_MODE
+        self.profile = None
+        self.tracing = False
+        self.sampler = None
+        self.remaining = 0
+        self.file = PF_FILE
+
+    @property
+    def running(self):
+        # whether profiler is collecting
+        if self.mode == "trace":
+            return self.tracing
+        return self.sampler is not None and self.sampler.is_alive()
+
+    def start(self, mode=None):
+        # start collecting in mode, None = mode of last start
+        if self.running:
+            return
+        self.mode = mode or self.mode
+        if self.mode == "trace":
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+            self.tracing = True
+        else:
+            self.sampler = Sampler(threading.get_ident(), PF_INTERVAL)
+            self.sampler.start()
+
+    def stop(self):
+        # stop collecting, results are kept until next start
+        self.remaining = 0
+        if not self.running:
+            return
+        if self.mode == "trace":
+            self.profile.disable()
+            self.tracing = False
+        else:
+            self.sampler.done.set()
+            self.sampler.join()
+
+    def toggle(self, mode=None):
+        # start if stopped, stop if running
+        if self.running:
+            self.stop()
+        else:
+            self.start(mode)
+
+    def capture(self, ticks=PF_CAPTURE, mode=None, file=None):
+        # collect for ticks ticks, then write results to file
+        self.stop()
+        self.start(mode)
+        self.remaining = ticks
+        self.file = file or self.file
+
+    def tick(self):
+        # count down ticks of a capture, write results when it ends
+        if self.remaining == 0:
+            return
+        self.remaining -= 1
+        if self.remaining == 0:
+            self.stop()
+            self.write()
+
+    def write(self, file=None):
+        # write results, file.prof for trace, file.folded for sample
+        file = file or self.file
+        if self.mode == "trace" and self.profile is not None:
+            self.profile.dump_stats(file + ".prof")
+        elif self.sampler is not None:
+            with open(file + ".folded", "w") as out:
+                for stack, count in self.sampler.stacks.most_common():
+                    out.write("%s %d\n" % (stack, count))
+
+    def report(self, limit=30):
+        # print most expensive functions
+        if self.mode == "trace" and self.profile is not None:
+            pstats.Stats(self.profile).sort_stats("tottime").print_stats(
+                limit)
+        elif self.sampler is not None:
+            stacks = self.sampler.stacks
+            total = sum(stacks.values()) or 1
+            inside, own = Counter(), Counter()
+            for stack, count in stacks.items():
+                calls = stack.split(";")
+                own[calls[-1]] += count
+                for call in set(calls):
+                    inside[call] += count
+            print("%d samples" % total)
+            print("%7s %7s  function" % ("own%", "total%"))
+            for call, count in own.most_common(limit):
+                print("%7.1f %7.1f  %s" % (100 * count / total,
+                                            100 * inside[call] / total, call))
+
+
+# profiler of the game, started by hotkey
+profiler = Profiler()
@@ -0,0 +1,175 @@
+import math
+import numpy as np
+from settings import CB_SPEED, CB_MULT, C_RANGE
+from perf import traced
+from camera import camera
+
+# kinds of ammunition, index into the per-kind constants below
+ROUND_SHOT = 0
+
+SPEED = np.array([CB_SPEED])  # pixels flown per tick
+REACH = np.array([C_RANGE * CB_MULT])  # distance flown before falling
+
+# name: (dtype, shape of one slot, default value)
+SHOT_COLUMNS = {
+    "coords": (float, (2,), 0),
+    "velocity": (float, (2,), 0),
+    "angle": (float, (), 0),
+    "travelled": (float, (), 0),
+    "radius": (float, (), 0),
+    "owner": (int, (), -1),
+    "team": (np.int8, (), 0),
+    "power": (int, (), 0),
+    "kind": (np.int8, (), ROUND_SHOT),
+    "sprite": (int, (), 0),
+    "active": (bool, (), False),
+}
+
+
+class Projectiles():
+    """Pool of every projectile flying in the battle
+
+    Projectiles of all kinds and owners share preallocated slots in
+    contiguous arrays. Each tick every flying projectile is moved in one
+    pass, the paths of the tick are swept against the troop grid together,
+    and those in view of the camera are drawn with one batched blit. Slots
+    are freed when a projectile has flown the reach of its kind and are
+    reused by the next shot, the pool only grows when every slot is flying.
+
+    Attributes
+    ----------
+    capacity : int, >= 0
+        number of slots allocated
+    sprites : list of pygame.Surface
+        images of projectiles, registered once by the troops firing them
+    hit : list of set of int
+        rows of troops hit by the projectile in each slot
+    coords, velocity : float numpy.ndarray [N, 2]
+        per-slot vectors, position and movement per tick
+    angle, travelled, radius, owner, team, power, kind, sprite, active :
+    numpy.ndarray [N]
+        per-slot values, owner is row of troop that fired, power is men
+        killed in each troop hit, sprite indexes sprites
+
+    Properties
+    ----------
+    flying : int, >= 0
+        number of projectiles in flight
+
+    Methods
+    -------
+    register
+        keep a projectile image, return its sprite number
+    grow
+        allocate at least capacity slots, keeping current slots
+    fire
+        put a projectile in a free slot
+    release
+        free slots of projectiles that stopped flying
+    update
+        move every projectile, hit troops on their paths
+    draw
+        blit every projectile at once
+    """
+
+    def __init__(self, capacity):
+        self.capacity = 0
+        self.sprites = []
+        self.hit = []
+        for name, (dtype, shape, default) in SHOT_COLUMNS.items():
+            setattr(self, name, np.full((0,) + shape, default, dtype=dtype))
+        self.grow(capacity)
+
+    @property
+    def flying(self):
+        # number of projectiles in flight
+        return int(np.count_nonzero(self.active))
+
+    def register(self, image):
+        # keep a projectile image, return its sprite number
+        for n, sprite in enumerate(self.sprites):
+            if sprite is image:
+                return n
+        self.sprites.append(image)
+        return len(self.sprites) - 1
+
+    def grow(self, capacity):
+        # allocate at least capacity slots, keeping current slots
+        if capacity <= self.capacity:
+            return
+        capacity = max(capacity, self.capacity * 2)
+        for name, (dtype, shape, default) in SHOT_COLUMNS.items():
+            column = np.full((capacity,) + shape, default, dtype=dtype)
+            column[:self.capacity] = getattr(self, name)
+            setattr(self, name, column)
+        self.hit += [set() for slot in range(capacity - self.capacity)]
+        self.capacity = capacity
+
+    def fire(self, kind, owner, team, coords, angle, power, sprite):
+        # put a projectile in the lowest free slot, return slot
+        free = np.flatnonzero(~self.active)
+        if len(free) == 0:
+            self.grow(self.capacity + 1)
+            free = np.flatnonzero(~self.active)
+        slot = free[0]
+        speed = SPEED[kind]
+        self.coords[slot] = coords
+        self.velocity[slot] = (speed * math.cos(angle),
+                               -speed * math.sin(angle))
+        self.angle[slot] = angle
+        self.travelled[slot] = 0
+        self.radius[slot] = max(self.sprites[sprite].get_size()) / 2
+        self.owner[slot] = owner
+        self.team[slot] = team
+        self.power[slot] = power
+        self.kind[slot] = kind
+        self.sprite[slot] = sprite
+        self.active[slot] = True
+        self.hit[slot].clear()
+        return slot
+
+    def release(self, slots):
+        # free slots of projectiles that stopped flying
+        self.active[slots] = False
+        for slot in slots:
+            self.hit[slot].clear()
+
+    @traced("projectiles")
+    def update(self, state):
+        # move every projectile, hit troops of state on their paths
+        i = np.flatnonzero(self.active)
+        if len(i) == 0:
+            return
+        start = self.coords[i]
+        end = start + self.velocity[i]
+        query, rows = state.sweep(start, end, self.radius[i], self.team[i])
+        # troops are hit shot by shot in order of the rows that fired them
+        order = np.argsort(self.owner[i[query]], kind="stable")
+        for slot, row in zip(i[query[order]].tolist(), rows[order].tolist()):
+            if row in self.hit[slot] or state.size[row] <= 0:
+                continue
+            self.hit[slot].add(row)
+            state.troops[row].getShelled(int(self.power[slot]),
+                                         float(self.angle[slot]),
+                                         int(self.owner[slot]))
+        self.coords[i] = end
+        kind = self.kind[i]
+        self.travelled[i] += SPEED[kind]
+        self.release(i[self.travelled[i] > REACH[kind]])
+
+    def draw(self, screen, alpha=1):
+        # blit every projectile at once, a fraction alpha through the last
+        # tick, return areas drawn over
+        i = np.flatnonzero(self.active)
+        if len(i) == 0:
+            return []
+        coords = self.coords[i] - (1 - alpha) * self.velocity[i]
+        # only projectiles in view of the camera
+        shown = camera.inside(coords)
+        i, coords = i[shown], camera.toScreen(coords[shown])
+        blits = []
+        for sprite, (x, y) in zip(self.sprite[i].tolist(), coords.tolist()):
+            image = camera.sprite(self.sprites[sprite])
+            blits.append((image, image.get_rect(center=(round(x),
+                                                        round(y)))))
+        return screen.blits(blits)
@@ -0,0 +1,130 @@
+import numpy as np
+from spatial import SpatialHash
+
+CHUNK = 1 << 20  # most pairs of query and cell searched at once
+
+
+class Proximity():
+    """Troops in play sorted into cells once per tick, for nearby lookups
+
+    Built once per tick after troops move, then read by everything that
+    asks how far troops are from each other: targeting, distance to target
+    in aim and fire, AI support and cannonball sweeps. Only the grid, coords
+    and teams are kept, so memory stays linear in troops however dense the
+    battle. A lookup measures enemies in the cells within the reach of each
+    querying troop, so Infantry does not search as far as Cannon and
+    targeting never measures allies.
+
+    Attributes
+    ----------
+    reach : float, > 0
+        longest distance looked up, between is inf beyond it
+    grid : SpatialHash
+        troops measured, sorted into cells
+    count : int, >= 0
+        number of BattleState rows when built, 0 = never built
+    coords : float numpy.ndarray [count, 2]
+        coords of each row when built, nan for rows not measured
+    teams : int numpy.ndarray [count]
+        team number of each row when built, -1 for rows not measured
+
+    Methods
+    -------
+    build
+        sort troops into cells, keep their coords and teams
+    near
+        pairs of querying rows with troops of other teams within reach
+    between
+        distances of pairs of rows, inf when farther than reach
+    distance
+        distance between two rows, inf when farther than reach
+    """
+
+    def __init__(self, reach, cell):
+        self.reach = reach
+        self.grid = SpatialHash(cell)
+        self.count = 0
+        self.coords = np.zeros((0, 2))
+        self.teams = np.zeros(0, dtype=int)
+
+    def build(self, coords, rows, teams, count):
+        """sort troops into cells, keep their coords and teams
+
+        Parameters
+        ----------
+        coords : float numpy.ndarray [N, 2]
+            coords column of BattleState
+        rows : int numpy.ndarray
+            rows of troops measured
+        teams : int numpy.ndarray
+            team number of each of rows
+        count : int, >= 0
+            number of BattleState rows
+        """
+        self.count = count
+        self.coords = np.full((count, 2), np.nan)
+        self.coords[rows] = coords[rows]
+        self.teams = np.full(count, -1)
+        self.teams[rows] = teams
+        self.grid.build(coords[rows], rows, teams)
+
+    def near(self, i, reach):
+        """pairs of querying rows with troops of other teams within reach
+
+        Only the cells within the reach of each query are searched, in
+        batches of at most CHUNK cells.
+
+        Parameters
+        ----------
+        i : int numpy.ndarray
+            rows of querying troops, rows not measured find nothing
+        reach : float numpy.ndarray
+            distance within which each of i looks
+
+        Returns
+        -------
+        query : int numpy.ndarray
+            index into i of each pair
+        rows : int numpy.ndarray
+            row of troop found in each pair, by query then cell and row
+        dist : float numpy.ndarray
+            distance between the troops of each pair, <= reach of query
+        """
+        reach = np.broadcast_to(reach, i.shape)
+        team = np.full(len(i), -1)
+        inside = i < self.count
+        team[inside] = self.teams[i[inside]]
+        cells = np.ceil(reach / self.grid.cell).astype(int)
+        query, rows, dist = [np.zeros(0, dtype=int)], \
+            [np.zeros(0, dtype=int)], [np.zeros(0)]
+        for other in self.grid.teams:
+            ask = (team != other) & (team >= 0)
+            # one search per number of cells searched, in batches
+            for n in np.unique(cells[ask]):
+                k = np.flatnonzero(ask & (cells == n))
+                size = max(CHUNK // (2 * n + 1) ** 2, 1)
+                for part in np.array_split(k, -(-len(k) // size)):
+                    coords = self.coords[i[part]]
+                    q, found = self.grid.near(coords, other, n)
+                    d = np.hypot(*(self.coords[found] - coords[q]).T)
+                    keep = d <= reach[part[q]]
+                    query.append(part[q[keep]])
+                    rows.append(found[keep])
+                    dist.append(d[keep])
+        return np.concatenate(query), np.concatenate(rows), \
+            np.concatenate(dist)
+
+    def between(self, src, dst):
+        # distances of pairs of rows, inf when farther than reach or when
+        # either row was not measured
+        dist = np.full(len(src), np.inf)
+        ok = (src < self.count) & (dst < self.count)
+        d = np.hypot(*(self.coords[src[ok]] - self.coords[dst[ok]]).T)
+        with np.errstate(invalid="ignore"):
+            d[~(d <= self.reach)] = np.inf
+        dist[ok] = d
+        return dist
+
+    def distance(self, i, j):
+        # distance between two rows, inf when farther than reach
+        return self.between(np.array([i]), np.array([j]))[0]
@@ -0,0 +1,94 @@
+import pygame
+from settings import BG_COLOR
+from battlestate import state
+from camera import camera
+
+
+class Backdrop():
+    """Static battlefield drawn once, restored only where sprites were
+
+    The terrain is painted into its own Surface on first use. Each frame
+    the areas drawn over in the last frame are copied back from it, sprites
+    mark the areas they draw over, and only old and new areas are sent to
+    the display. When the camera moves the terrain is painted again.
+
+    Attributes
+    ----------
+    paint : callable
+        draws terrain onto the Surface passed to it
+    surface : pygame.Surface or None
+        terrain painted by paint, None = not painted yet
+    drawn : list of pygame.Rect
+        areas drawn over in the last presented frame
+    marked : list of pygame.Rect
+        areas drawn over in the current frame
+    full : bool
+        whether the whole display is sent on next present
+
+    Methods
+    -------
+    mark
+        remember an area drawn over in the current frame
+    restore
+        copy terrain over areas drawn in the last frame
+    present
+        send areas that changed to the display
+    invalidate
+        repaint terrain and send the whole display on next frame
+    """
+
+    def __init__(self, paint):
+        self.paint = paint
+        self.surface = None
+        self.drawn = []
+        self.marked = []
+        self.full = True
+
+    def mark(self, rect):
+        # remember an area drawn over in the current frame, return it
+        self.marked.append(rect)
+        return rect
+
+    def restore(self, screen):
+        # copy terrain over areas drawn in the last frame
+        size = screen.get_size()
+        if self.surface is None or self.surface.get_size() != size:
+            self.surface = pygame.Surface(size)
+            self.paint(self.surface)
+            self.full = True
+        if self.full:
+            screen.blit(self.surface, (0, 0))
+            return
+        [screen.blit(self.surface, rect, rect) for rect in self.drawn]
+
+    def present(self):
+        # send areas that changed to the display
+        if self.full:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.drawn + self.marked)
+        self.full = False
+        self.drawn = self.marked
+        self.marked = []
+
+    def invalidate(self):
+        # repaint terrain and send the whole display on next frame
+        self.surface = None
+        self.full = True
+
+
+def paintTerrain(screen):
+    """ draw terrain of the level being played, as seen by the camera
+
+    Parameters
+    ----------
+    screen : pygame.Surface
+        Surface on which terrain is drawn
+    """
+    screen.fill(BG_COLOR)
+    screen.blit(state.terrain.picture(camera.zoom),
+                tuple(camera.toScreen((0, 0))))
+
+
+# terrain behind every frame of the battle
+backdrop = Backdrop(paintTerrain)
@@ -0,0 +1,147 @@
+import gzip
+import os
+import pickle
+import sys
+# replays are never drawn, must be set before settings makes the screen
+os.environ.setdefault("MUSKETCRAFT_HEADLESS", "1")
+from settings import SCREEN  # noqa: E402
+from game_functions import simulate, spawn  # noqa: E402
+from battlestate import state  # noqa: E402
+from level import loadLevel  # noqa: E402
+from commandlog import commands, restore, uid  # noqa: E402
+
+
+class Replay():
+    """Recorded battle played back headless as fast as it can run
+
+    The battle is rebuilt from its level and seed and the recorded commands
+    are given again at the ticks they were given at, so it runs the same as
+    when it was recorded. Seeking starts from the last keyframe before the
+    tick sought instead of from the start of the battle.
+
+    Attributes
+    ----------
+    level : str
+        name of level the battle was loaded from
+    seed : int
+        seed of random numbers of the battle
+    end : int, >= 0
+        tick the recording ended at
+    commands : list of tuple
+        commands of the battle, see CommandLog
+    given : dict of int: list of tuple
+        tick to orders, spawns and clears given after the tick
+    keyframes : dict of int: dict
+        tick to state of the battle at the end of the tick
+    screen : pygame.Surface
+        Surface units are created on, never drawn on
+    flags : list of Flag
+        Flags of units created
+    units : list of Battery, Company, Squadron
+        units in play, in the order they are processed
+    made : dict of int: Battery, Company, Squadron
+        uid to every unit created so far
+
+    Properties
+    ----------
+    tick : int, >= 0
+        number of ticks played back
+
+    Methods
+    -------
+    start
+        rebuild the battle as it was before its first tick
+    seek
+        play battle back to tick, from last keyframe before it
+    play
+        play battle back for number of ticks
+    give
+        give the commands issued after tick before the next tick
+    """
+
+    def __init__(self, file):
+        with gzip.open(file, "rb") as data:
+            data = pickle.load(data)
+        self.level = data["level"]
+        self.seed = data["seed"]
+        self.end = data["end"]
+        self.commands = data["commands"]
+        self.given = {}
+        for command in self.commands:
+            if command[1] in ("order", "spawn", "clear"):
+                self.given.setdefault(command[0], []).append(command)
+        self.keyframes = data["keyframes"]
+        self.screen = SCREEN
+        self.start()
+
+    @property
+    def tick(self):
+        # number of ticks played back
+        return state.tick
+
+    def start(self):
+        # rebuild the battle as it was before its first tick
+        state.reset(seed=self.seed)
+        self.flags = []
+        self.made = {}
+        state.roster.listen(self.remember)
+        self.units = loadLevel(self.screen, self.flags, self.level)
+        [state.roster.add(unit) for unit in self.units]
+        commands.play(self.commands)
+        self.give(0)
+
+    def remember(self, unit, present):
+        # keep every unit put in play by uid, roster listener
+        self.made.setdefault(uid(unit), unit)
+
+    def seek(self, tick):
+        # play battle back to tick, from last keyframe before it
+        key = max([k for k in self.keyframes if k <= tick], default=0)
+        if not key <= self.tick <= tick:
+            self.start()
+            if key > 0:
+                # create units spawned by hotkey and by events before the
+                # keyframe in the same rows, events of a tick ran before
+                # the spawns given after it
+                spawned = [(command[0], 1, command)
+                           for command in self.commands
+                           if command[1] == "spawn" and 0 < command[0] < key]
+                if state.events is not None:
+                    spawned += [(fired, 0, number) for fired, number
+                                in self.keyframes[key]["events"]]
+                spawned.sort(key=lambda given: given[:2])
+                for at, kind, given in spawned:
+                    if kind == 0:
+                        state.events.fire(given, self.units)
+                    else:
+                        spawn(self.units, self.screen, self.flags,
+                              *given[2:4], given[4:])
+                self.units = restore(self.keyframes[key], self.made)
+                self.give(key)
+        self.play(tick - self.tick)
+
+    def play(self, ticks):
+        # play battle back for number of ticks
+        for step in range(ticks):
+            simulate(self.units, self.flags)
+            self.give(state.tick)
+
+    def give(self, tick):
+        # give the commands issued after tick before the next tick
+        for command in self.given.get(tick, []):
+            if command[1] == "order":
+                getattr(self.made[command[2]], command[3])()
+            if command[1] == "spawn":
+                spawn(self.units, self.screen, self.flags, *command[2:4],
+                      command[4:])
+            if command[1] == "clear":
+                state.roster.clear()
+                self.units = []
+
+
+if __name__ == "__main__":
+    # python replay.py file [tick]: play battle back, print size of teams
+    replay = Replay(sys.argv[1])
+    replay.seek(int(sys.argv[2]) if len(sys.argv) > 2 else replay.end)
+    for team, units in state.roster.teams.items():
+        print(team, sum(unit.health for unit in units))
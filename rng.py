@@ -0,0 +1,149 @@
+import secrets
+import numpy as np
+
+# streams, keep draws for different purposes independent
+RS_AIM = 0  # extra aim time
+RS_FIRE = 1  # hits of a shot or charge
+RS_BAYONET = 2  # losses of Cavalry charging into bayonets
+RS_MORALE = 3  # whether a hit troop panics
+RS_PANIC = 4  # direction a panicking troop runs in
+RS_SHOT = 5  # direction a Cannonball flies in
+
+# Philox4x32-10 constants
+MULT = (np.uint64(0xD2511F53), np.uint64(0xCD9E8D57))
+WEYL = (np.uint32(0x9E3779B9), np.uint32(0xBB67AE85))
+MASK = np.uint64(0xFFFFFFFF)
+
+
+def philox(counter, key):
+    """Philox4x32-10 block cipher, the same for one block or many
+
+    Parameters
+    ----------
+    counter : uint32 numpy.ndarray [..., 4]
+        blocks to encrypt
+    key : uint32 numpy.ndarray [2]
+        key of every block
+
+    Returns
+    -------
+    uint32 numpy.ndarray [..., 4]
+        random bits of each block
+    """
+    c = [counter[..., j].astype(np.uint64) for j in range(4)]
+    k0, k1 = np.uint32(key[0]), np.uint32(key[1])
+    with np.errstate(over="ignore"):
+        for r in range(10):
+            p0 = c[0] * MULT[0]
+            p1 = c[2] * MULT[1]
+            c = [(p1 >> np.uint64(32)) ^ c[1] ^ np.uint64(k0), p1 & MASK,
+                 (p0 >> np.uint64(32)) ^ c[3] ^ np.uint64(k1), p0 & MASK]
+            k0 = k0 + WEYL[0]
+            k1 = k1 + WEYL[1]
+    return np.stack(c, axis=-1).astype(np.uint32)
+
+
+def binomial(n, p, u):
+    """number of successes of n tries with chance p, by inverting the cdf
+
+    Each value only depends on its own n, p, u, so drawing one value or
+    many gives the same bits.
+
+    Parameters
+    ----------
+    n : int numpy.ndarray, >= 0
+        number of tries
+    p : float numpy.ndarray, 0 - 1
+        chance of success of each try
+    u : float numpy.ndarray, 0 - 1
+        uniform random number of each draw
+
+    Returns
+    -------
+    int numpy.ndarray
+        number of successes
+    """
+    n, p, u = np.broadcast_arrays(np.asarray(n, dtype=np.int64),
+                                  np.asarray(p, dtype=float), u)
+    if n.size == 0:
+        return n.copy()
+    # draw the rarer outcome, keeps pmf of no rare outcomes from vanishing
+    flip = p > .5
+    q = np.where(flip, 1 - p, p)[..., None]
+    k = np.arange(max(n.max(), 0) + 1)
+    m = n[..., None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (np.log(np.maximum(m - k[:-1], 1)) - np.log(k[:-1] + 1)
+                 + np.log(q) - np.log1p(-q))
+        first = m * np.log1p(-q)
+        logPmf = first + np.concatenate([np.zeros_like(first),
+                                         np.cumsum(ratio, axis=-1)], axis=-1)
+    pmf = np.where(k <= m, np.exp(np.nan_to_num(logPmf, nan=-np.inf)), 0)
+    cdf = np.cumsum(pmf, axis=-1)
+    draw = np.minimum((cdf < u[..., None]).sum(axis=-1), n)
+    return np.where(flip, n - draw, draw)
+
+
+class CounterRandom():
+    """Random numbers of a battle, keyed by stream, troop, tick and other
+
+    Each draw encrypts its own key (stream, row, tick, other) with the
+    battle seed, so numbers don't depend on what was drawn before, on the
+    order troops are processed in or on whether they are drawn one at a
+    time or as arrays. The same seed gives the same battle in any process.
+
+    Attributes
+    ----------
+    seed : int, >= 0
+        64 bit seed of the battle
+    key : uint32 numpy.ndarray [2]
+        seed split into Philox key
+
+    Methods
+    -------
+    bits
+        32 bit random words of each draw
+    uniform
+        random floats in [low, high)
+    randint
+        random ints in [low, high)
+    chance
+        whether each draw succeeds with percent chance
+    binomial
+        number of successes of n tries with chance p
+    """
+
+    def __init__(self, seed=None):
+        if seed is None:
+            seed = secrets.randbits(64)
+        self.seed = seed
+        self.key = np.array([seed & 0xFFFFFFFF, (seed >> 32) & 0xFFFFFFFF],
+                            dtype=np.uint32)
+
+    def bits(self, stream, rows, tick, other=0):
+        # 32 bit random words of each draw, 4 words per draw
+        rows, tick, other = np.broadcast_arrays(rows, tick, other)
+        counter = np.stack([rows, tick, np.full(rows.shape, stream), other],
+                           axis=-1).astype(np.int64).astype(np.uint32)
+        return philox(counter, self.key)
+
+    def uniform(self, stream, rows, tick, other=0, low=0, high=1):
+        # random floats in [low, high), 53 bits of two words
+        words = self.bits(stream, rows, tick, other).astype(np.uint64)
+        a = words[..., 0] >> np.uint64(5)
+        b = words[..., 1] >> np.uint64(6)
+        u = (a * 67108864. + b) / 9007199254740992.
+        return low + (high - low) * u
+
+    def randint(self, stream, rows, tick, other=0, low=0, high=2):
+        # random ints in [low, high)
+        u = self.uniform(stream, rows, tick, other)
+        return low + np.floor(u * (high - low)).astype(int)
+
+    def chance(self, stream, rows, tick, other, percent):
+        # whether each draw succeeds with percent chance
+        return self.randint(stream, rows, tick, other, 0, 100) < percent
+
+    def binomial(self, stream, rows, tick, other, n, p):
+        # number of successes of n tries with chance p
+        return binomial(n, p, self.uniform(stream, rows, tick, other))
@@ -0,0 +1,68 @@
+class Roster():
+    """Units in play, grouped by team
+
+    Each team keeps its units in a dict used as an ordered set, so adding
+    and removing a unit is O(1) and units stay in the order they joined.
+    Dependents register a listener and are told about each change instead
+    of comparing unit lists every tick.
+
+    Attributes
+    ----------
+    teams : dict of str: dict of Battery, Company, Squadron: None
+        team name to units of team in play
+    listeners : list of callable
+        called with unit, whether unit is in play, on every change
+
+    Methods
+    -------
+    listen
+        call listener on every change
+    add
+        put unit in play
+    remove
+        take unit out of play
+    clear
+        take all units out of play
+    allies
+        units in play on team
+    enemies
+        units in play on other teams
+    """
+
+    def __init__(self):
+        self.teams = {}
+        self.listeners = []
+
+    def listen(self, listener):
+        # call listener with unit, whether in play, on every change
+        self.listeners.append(listener)
+
+    def add(self, unit):
+        # put unit in play
+        units = self.teams.setdefault(unit.team, {})
+        if unit in units:
+            return
+        units[unit] = None
+        [listener(unit, True) for listener in self.listeners]
+
+    def remove(self, unit):
+        # take unit out of play
+        units = self.teams.get(unit.team, {})
+        if unit not in units:
+            return
+        del units[unit]
+        [listener(unit, False) for listener in self.listeners]
+
+    def clear(self):
+        # take all units out of play
+        for units in list(self.teams.values()):
+            [self.remove(unit) for unit in list(units)]
+
+    def allies(self, team):
+        # units in play on team
+        return list(self.teams.get(team, {}))
+
+    def enemies(self, team):
+        # units in play on other teams
+        return [unit for name, units in self.teams.items() if name != team
+                for unit in units]
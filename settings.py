@@ -1,4 +1,5 @@
 import math
+import os
 import pygame
 """Store constants for use in game, not altered by code/user
 """
@@ -57,6 +58,10 @@ CC_GAPY = 80 * SCALE  # vertical distance between Cannoneer and Cannon
 # Cannonball settings
 CB_SPEED = 5 * SCALE * SPEED  # speed of Cannonball
 CB_MULT = 1.2  # extra mult for how far Cannonball travels
+# event settings
+EV_CELL = 30 * SCALE  # width of grid cells trigger zones are indexed by
+# projectile settings
+PJ_POOL = 64  # projectile slots allocated at start, doubled when all fly
 # cavalry settings
 CV_GAPX = 70 * SCALE  # horizontal distance between centers of cavalry
 CV_GAPY = 70 * SCALE  # vertical distance between centers of cavalry
@@ -81,6 +86,63 @@ CV_MAX_SHELLED = 8  # largest number of units Cavalry can lose per cannon
 CV_MIN_SHELLED = 3  # smallest number of units Cavalry can lose per cannon
 CV_MED_SHELLED = (C_MAX_SHELLED + C_MIN_SHELLED) / 2
 CV_AMP_SHELLED = (C_MAX_SHELLED - C_MIN_SHELLED) / 2
+# spatial hash settings
+SH_CELL = I_SIGHT  # width of cells searched for targets, <= every SIGHT
+# density field settings
+DF_CELL = 30 * SCALE  # width of cells summed for morale, smaller = exact
+# rotation cache settings
+RC_STEPS = 360  # directions per full turn that sprites are drawn in
+RC_SIZE = 4096  # largest number of rotated sprites kept
+# clock settings
+TICK_RATE = 500  # simulation ticks per second, 1 tick = 2 milliseconds
+FRAME_CAP = 60  # most frames drawn per second
+MAX_LAG = 100  # most milliseconds of ticks caught up on after slow frames
+# terrain settings
+TR_CELL = 4  # width of cells of terrain raster sampled by troops
+# speed multiplier, hit chance multiplier of troops standing on terrain
+TR_OPEN = (1, 1)
+TR_FLECHE = (.7, .5)
+TR_RIVER = (.4, 1)
+TR_ROAD = (1.2, 1)
+TR_TOWN = (.8, .6)
+# camera settings
+CM_ZOOMS = (.5, .75, 1, 1.5, 2)  # zoom levels the mouse wheel steps through
+CM_PAN = 12  # screen pixels scrolled per frame an arrow key is held
+CM_MARGIN = 90 * SCALE  # half diagonal of largest sprite, culled beyond it
+# asset settings
+AS_CACHE = "images/cache"  # baked sprites, named by source hash and scale
+AS_SHEETS = False  # bake and load pre-rotated sheets of troop costumes
+# level settings
+LV_CACHE = "levels/cache"  # compiled level tables, one .npz per file version
+# replay settings
+RP_KEYFRAME = 1000  # ticks between full state keyframes of a replay
+# file battles are recorded to, set by environment, empty = not saved
+RP_FILE = os.environ.get("MUSKETCRAFT_REPLAY", "") or None
+# Monte Carlo settings
+MC_TIMEOUT = 60000  # most ticks of a battle before it ends without a winner
+MC_CHECK = 100  # ticks between checks whether only one team is left
+# benchmark settings
+BM_SIZES = (32, 128, 512, 2048, 8192, 32768)  # troops of synthetic battles
+BM_TICKS = 100  # ticks timed per battle
+BM_WARMUP = 10  # ticks run before timing, lets troops find targets
+BM_BUDGET = 900  # seconds a battle may take before it is skipped
+BM_MEMORY = 4096  # megabytes a battle may hold before it is skipped
+BM_POLL = .1  # seconds between checks of time and memory of a battle
+# profiler settings
+PF_MODE = "sample"  # "sample" reads stacks at intervals, "trace" every call
+PF_INTERVAL = .005  # seconds between samples of sample mode
+PF_CAPTURE = 1000  # ticks profiled by capture hotkey
+PF_FILE = "profile"  # captures go to profile.prof or profile.folded
+# performance HUD settings
+HUD_HISTORY = 240  # frames shown in frame time graph
+HUD_TXT_SIZE = 20  # text size
+HUD_TXT_COLOR = (230, 230, 230)  # color of text and of frame budget line
+HUD_BG_COLOR = (20, 20, 20)  # color behind HUD
+HUD_GRAPH_COLOR = (90, 200, 90)  # color of frames within frame budget
+HUD_SLOW_COLOR = (220, 60, 60)  # color of frames over frame budget
+# tracer settings
+TC_FILE = "trace.json"  # Chrome trace written while tracing
+TC_FLUSH = .5  # seconds between writes of buffered spans
 # flag button settings
 FB_SIZE = (120, 50)  # size of button
 FB_COLOR = (150, 0, 0)  # color of button
@@ -89,54 +151,18 @@ FB_TXT_SIZE = 48  # text size
 # screen settings
 SCREEN_WIDTH = 1200
 SCREEN_HEIGHT = 800
+# run without a window: skip drawing and mouse input, set by environment
+HEADLESS = os.environ.get("MUSKETCRAFT_HEADLESS", "") not in ("", "0")
+if HEADLESS:
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
 pygame.init()
-SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+if HEADLESS:
+    SCREEN = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+else:
+    SCREEN = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 BG_COLOR = (50, 110, 0)
 FLECHE_COLOR = (165, 42, 42)
 ROAD_COLOR = (130, 35, 35)
 RIVER_COLOR = (50, 50, 250)
 # Menu settings(TEMPORARY)
 M_CENTER = (1060, 60)
-# Images
-
-
-def scaleImage(*paths, scale=1):
-    """convert image file location list into scaled image list
-rdddq
-    Resizes images by SCALE constant multiplier
-    """
-    images = []
-    for path in paths:
-        image = pygame.image.load(path).convert_alpha()
-        size = [int(i * SCALE * scale) for i in image.get_rect().size]
-        images.append(pygame.transform.scale(image, size))
-    return images
-
-
-blueImages = scaleImage('images/blue_battalion.png',
-                        'images/blue_battalion_fire.png',
-                        'images/blue_square.png',
-                        'images/blue_flag.png',)
-greenImages = scaleImage('images/green_battalion.png',
-                         'images/green_battalion_fire.png',
-                         'images/green_square.png',
-                         'images/green_flag.png',)
-blueCannon = scaleImage('images/blue_cannon.png',
-                        'images/blue_cannon_firing.png',
-                        'images/blue_flag.png',
-                        'images/cannonball.png',
-                        # 'images/blue_human.png'
-                        )
-greenCannon = scaleImage('images/green_cannon.png',
-                         'images/green_cannon_firing.png',
-                         'images/green_flag.png',
-                         'images/cannonball.png',
-                         # 'images/green_human.png'
-                         )
-blueCav = scaleImage('images/blue_cavalry.png',
-                     # 'images/blue_cavalry_slash.png',
-                     'images/blue_flag.png',)
-greenCav = scaleImage('images/green_cavalry.png',
-                      # 'images/green_cavalry_slash.png',
-                      'images/green_flag.png',)
-town = scaleImage('images/town.png')[0]
@@ -0,0 +1,88 @@
+import numpy as np
+
+OFFSET = 1 << 20  # shifts cell numbers positive so both fit in one key
+STRIDE = 1 << 21  # keys per column of cells
+
+
+class SpatialHash():
+    """Uniform grid of troop rows, sorted by team and cell
+
+    Rebuilt once per tick. Finding troops near a point only looks at the
+    cells around it instead of at every troop in the battle.
+
+    Attributes
+    ----------
+    cell : float, > 0
+        width and height of a cell in pixels
+    teams : dict of int: tuple of int numpy.ndarray
+        team number to cell keys and rows of its troops, sorted by key
+
+    Methods
+    -------
+    cells
+        cell numbers in x, y directions of coords
+    key
+        pack cell numbers into one key
+    build
+        sort rows into cells by team
+    near
+        pairs of query and rows of one team in nearby cells
+    """
+
+    def __init__(self, cell):
+        self.cell = cell
+        self.teams = {}
+
+    def cells(self, coords):
+        # cell numbers in x, y directions of coords
+        return np.floor(coords / self.cell).astype(np.int64)
+
+    def key(self, cx, cy):
+        # pack cell numbers into one key
+        return (cx + OFFSET) * STRIDE + (cy + OFFSET)
+
+    def build(self, coords, rows, teams):
+        # sort rows into cells by team, rows stay in order within a cell
+        cells = self.cells(coords)
+        keys = self.key(cells[:, 0], cells[:, 1])
+        self.teams = {}
+        for team in np.unique(teams):
+            mine = teams == team
+            order = np.lexsort((rows[mine], keys[mine]))
+            self.teams[team] = (keys[mine][order], rows[mine][order])
+
+    def near(self, coords, team, reach):
+        """pairs of query and rows of one team in nearby cells
+
+        Parameters
+        ----------
+        coords : float numpy.ndarray [M, 2]
+            coords of querying troops
+        team : int
+            team number of troops returned
+        reach : int, >= 0
+            number of cells searched around the cell of each query
+
+        Returns
+        -------
+        query : int numpy.ndarray
+            index into coords of each pair
+        rows : int numpy.ndarray
+            row of troop of team in each pair
+        """
+        if team not in self.teams or len(coords) == 0:
+            return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+        keys, found = self.teams[team]
+        cells = self.cells(coords)
+        # every cell within reach of each query, as (query, offset) pairs
+        dx, dy = np.divmod(np.arange((2 * reach + 1) ** 2), 2 * reach + 1)
+        q = np.repeat(np.arange(len(coords)), len(dx))
+        offset = np.tile(np.arange(len(dx)), len(coords))
+        near = self.key(cells[q, 0] + dx[offset] - reach,
+                        cells[q, 1] + dy[offset] - reach)
+        start = np.searchsorted(keys, near, "left")
+        count = np.searchsorted(keys, near, "right") - start
+        total = count.sum()
+        # position of each pair within the run of rows in its cell
+        step = np.arange(total) - np.repeat(count.cumsum() - count, count)
+        return np.repeat(q, count), found[np.repeat(start, count) + step]
@@ -0,0 +1,104 @@
+import math
+from collections import OrderedDict
+import pygame
+from settings import RC_STEPS, RC_SIZE
+
+
+class RotationCache():
+    """Rotated copies of costumes, shared by all troops
+
+    Angles are rounded to one of steps directions per full turn, so troops
+    facing nearly the same way share one rotated Surface. Least recently
+    used rotations are dropped once size are kept. Rotations preloaded
+    from baked sheets are kept for good.
+
+    Attributes
+    ----------
+    steps : int, > 0
+        number of directions per full turn
+    size : int, > 0
+        largest number of rotated Surfaces kept
+    surfaces : OrderedDict of (pygame.Surface, int): pygame.Surface
+        costume and direction to rotated costume, most recently used last
+    sheets : dict of pygame.Surface: list of pygame.Surface
+        costume to its rotations by direction, preloaded
+    hits : int, >= 0
+        number of rotations found in cache
+    misses : int, >= 0
+        number of rotations made by pygame.transform.rotate
+
+    Properties
+    ----------
+    hitRate : float, 0 - 1
+        share of rotations found in cache
+
+    Methods
+    -------
+    rotate
+        costume rotated to angle, rounded to nearest direction
+    bounds
+        size of costume rotated to angle, without rotating it
+    preload
+        keep every rotation of a costume
+    clear
+        drop all rotations, reset counts
+    """
+
+    def __init__(self, steps, size):
+        self.steps = steps
+        self.size = size
+        self.sheets = {}
+        self.clear()
+
+    @property
+    def hitRate(self):
+        # share of rotations found in cache
+        total = self.hits + self.misses
+        if total == 0:
+            return 0
+        return self.hits / total
+
+    def rotate(self, costume, angle):
+        # costume rotated to angle in radians, rounded to nearest direction
+        step = round(angle * self.steps / (2 * math.pi)) % self.steps
+        sheet = self.sheets.get(costume)
+        if sheet is not None:
+            self.hits += 1
+            return sheet[step]
+        key = (costume, step)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = pygame.transform.rotate(costume, step * 360 / self.steps)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.size:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def bounds(self, costume, angle):
+        # size of costume rotated to angle, without rotating it
+        step = round(angle * self.steps / (2 * math.pi)) % self.steps
+        turn = step * 2 * math.pi / self.steps
+        cos, sin = abs(math.cos(turn)), abs(math.sin(turn))
+        width, height = costume.get_size()
+        # pygame truncates the rotated size
+        return (math.floor(width * cos + height * sin + 1e-6),
+                math.floor(width * sin + height * cos + 1e-6))
+
+    def preload(self, costume, frames):
+        # keep every rotation of a costume, frames by direction
+        if len(frames) == self.steps:
+            self.sheets[costume] = frames
+
+    def clear(self):
+        # drop all rotations, reset counts
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+# rotations of every costume in the game
+rotations = RotationCache(RC_STEPS, RC_SIZE)
@@ -1,13 +1,16 @@
 # import pygame
 import math
 from cavalry import Cavalry
-from settings import CV_GAPX, CV_GAPY, CV_SIGHT, FB_SIZE
-from settings import blueCav, greenCav
+from settings import CV_GAPX, CV_GAPY, CV_SIGHT, FB_SIZE, HEADLESS
+from assets import assets
 from flag import Flag
 import pygame
 import random
 import numpy as np
 from button import Button
+from battlestate import state
+from commandlog import commands
+from camera import camera
 
 
 class Squadron():
@@ -47,13 +50,13 @@ class Squadron():
         team Squadron is on for friend-foe detection
     defense : bool
         whether unit will ignore AI move orders
-    allies : list of Battery, Squadron, Squadron
-        list of all units with same team value
-    enemies : list of Battery, Squadron, Squadron
-        list of all units with different team value
+    rows : slice
+        rows of BattleState holding the troops of Squadron
 
     Properties
     ----------
+    coords : float 1-D numpy.ndarray [2], >=0
+        coords of center of Squadron
     size : int, >= 0
         number of Cavalry currently contained in Squadron
     formed : int, >= 0
@@ -75,8 +78,6 @@ class Squadron():
 
     Methods
     -------
-    unitInit
-        set allies and enemies
     setSpeed
         set speed to min of default, distance to coords
     distance
@@ -86,15 +87,13 @@ class Squadron():
     stop
         stop Squadron, Cavalry
     update
-        move Squadron, update Cavalry, panic if necessary
+        drop troops that died or fled, after BattleState update
     follow
-        move Squadron and Cavalry to flag
+        drag flag, pass flag variables to rows of Cavalry
     lookAt
         set rotation to angle from current center to new point
     findTarget
         select enemy as target
-    aim
-        turn toward selected target
     hitBayonets
         take losses from defended enemies
     getHit
@@ -107,6 +106,8 @@ class Squadron():
         orders company to move to coords
     AIsupport
         move to visible allies in combat
+    setRect
+        move rects of troops to current coords without drawing
     blitme
         print elements of Squadron
     __str__
@@ -117,9 +118,9 @@ class Squadron():
                  strength, play=True, defense=False):
         super().__init__()
         if team == "green":
-            file1, fileFlag = greenCav
+            file1, fileFlag = assets.get("greenSquadron")
         elif team == "blue":
-            file1, fileFlag = blueCav
+            file1, fileFlag = assets.get("blueSquadron")
         coords = np.array([x, y], dtype=float)
         self.troops = []
         # add infantry to company
@@ -135,6 +136,7 @@ class Squadron():
             self.troops.append(Cavalry(screen, angle, shiftx, shifty, strength,
                                        team, file1, coords, play,
                                        defense))
+        self.rows = state.rows(self.troops)
         self.flag = Flag(screen, (x, y), angle, fileFlag, play)
         flags.append(self.flag)
         # 0,1=click,release to show buttons, 2,3=click,release to select
@@ -144,16 +146,9 @@ class Squadron():
         # self.bayonets = False
         self.play = play
         self.team = team
-        self.oldUnits = []
         # used to id object for testing, not meant to be seen/used
         self.id = file1
 
-    def unitInit(self, units):
-        # set allies and enemies
-        if units != self.oldUnits:
-            self.oldUnits = units
-            [unit.unitInit(units) for unit in self.troops]
-
     @property
     def size(self):
         # number of Cavalry currently contained in Squadron
@@ -166,28 +161,27 @@ class Squadron():
 
     @property
     def health(self):
-        return sum(inf.size for inf in self.troops)
+        sizes = state.size[self.rows]
+        return sizes[state.alive[self.rows]].sum()
+
+    @property
+    def coords(self):
+        # center of troops still in Squadron
+        coords = state.coords[self.rows]
+        return coords[state.alive[self.rows]].mean(axis=0)
 
     def update(self):
-        # move Squadron, update Cavalry, panic if necessary
-        [unit.panic() for unit in self.troops if unit.panicTime > 0]
-        for unit in self.troops:
-            if unit.size <= 0:
-                self.troops.remove(unit)
-            elif unit.panicTime == -1:
-                unit.update()
+        # drop troops that died or fled, after BattleState update
+        self.troops = [troop for troop in self.troops if troop.alive]
 
     def follow(self, flags):
         # move Squadron and Cavalry to flag
-        if self.play:
+        if self.play and not HEADLESS:
             self.flag.checkDrag(flags)
-        [unit.follow(*self.flagVars) for unit in self.troops]
+        commands.flag(self)
+        state.setFlag(self.rows, *self.flagVars)
         self.flag.change = False
 
-    def aim(self):
-        # turn toward selected target
-        [troop.aim() for troop in self.troops]
-
     def orders(self):
         # give orders other than move for Squadron
         if not self.play or self.size == 0:
@@ -196,7 +190,8 @@ class Squadron():
             self.showOrders = 0
         mouse = pygame.mouse.get_pos()
         click = pygame.mouse.get_pressed()[0]
-        touch = any([inf.rect.collidepoint(mouse) for inf in self.troops])
+        point = camera.toWorld(mouse)
+        touch = any([inf.rect.collidepoint(point) for inf in self.troops])
         if click and self.showOrders == 0 and touch:
             self.showOrders = 1
         if self.showOrders == 1 and not click:
@@ -211,6 +206,7 @@ class Squadron():
 
     def AIcommand(self, coords, attackMove=False):
         # orders Squadron to move to coords
+        commands.ai(self, coords, attackMove)
         self.flag.coords = coords
         self.flag.attackMove = attackMove
 
@@ -219,21 +215,24 @@ class Squadron():
         if self.play or self.size == 0:
             return
         unit = self.troops[0]
-        allyDist = unit.distanceMany([grp.coords for grp in unit.allies])
-        for ally, d in zip(unit.allies, allyDist):
-            cannon = hasattr(ally, 'shot')
-            canSee = d < CV_SIGHT
-            if unit.idle and ally.target is not None and canSee and not cannon:
-                self.AIcommand(ally.target.coords, True)
-                break
+        if not unit.idle:
+            return
+        ally = state.allyInCombat(unit.idx, CV_SIGHT)
+        if ally is not None:
+            self.AIcommand(ally.target.coords, True)
+
+    def setRect(self):
+        # move rects of troops to current coords without drawing
+        [troop.setRect() for troop in self.troops]
 
     def blitme(self):
         # print elements of Squadron
-        [unit.blitme() for unit in self.troops]
+        if camera.shows(self.rows):
+            [unit.blitme() for unit in self.troops]
         if self.size > 0:
             self.flag.blitme()
         if self.showOrders > 1:
-            coords = self.troops[0].coords
+            coords = camera.toScreen(self.troops[0].coords)
             healthCoords = (coords[0], coords[1] - FB_SIZE[1])
             self.healthDisp.draw(healthCoords, str(self.health))
             self.healthDisp.blitme()
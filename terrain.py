@@ -0,0 +1,155 @@
+import math
+import numpy as np
+import pygame
+from settings import BG_COLOR, FLECHE_COLOR, ROAD_COLOR, RIVER_COLOR
+from settings import TR_CELL, TR_OPEN, TR_FLECHE, TR_RIVER, TR_ROAD, TR_TOWN
+from assets import assets
+from leveldata import loadTable, TERRAIN
+
+# kinds of terrain, index into KINDS is the value stored in the raster
+KINDS = ("open", "fleche", "river", "road", "town")
+COST = np.array([TR_OPEN[0], TR_FLECHE[0], TR_RIVER[0], TR_ROAD[0],
+                 TR_TOWN[0]])
+COVER = np.array([TR_OPEN[1], TR_FLECHE[1], TR_RIVER[1], TR_ROAD[1],
+                  TR_TOWN[1]])
+COLORS = {"fleche": FLECHE_COLOR, "river": RIVER_COLOR, "road": ROAD_COLOR}
+
+
+class Terrain():
+    """Terrain features of a level, drawn once and rasterized for lookups
+
+    Features are compiled when the level loads into a Surface holding the
+    picture of the battlefield and a raster holding the kind of terrain of
+    each cell. Troops sample the raster with vectorized lookups for their
+    marching speed and for how hard they are to hit.
+
+    Attributes
+    ----------
+    features : list of tuple
+        kind, x1, y1, x2, y2, start, stop, width of each feature. Fleches
+        are arcs in box x1, y1, x2, y2 from start to stop in units of pi,
+        rivers and roads are lines x1, y1 to x2, y2, towns are town images
+        with corner x1, y1
+    size : tuple of int
+        width, height of battlefield in pixels
+    cell : float, > 0
+        width and height of a raster cell in pixels
+    surface : pygame.Surface
+        picture of terrain, background color included
+    pictures : dict of float: pygame.Surface
+        zoom to picture of terrain drawn at that zoom
+    kinds : uint8 numpy.ndarray [W, H]
+        index into KINDS of terrain in each cell
+
+    Methods
+    -------
+    draw
+        draw features onto Surface, scaled by scale
+    picture
+        picture of terrain at a zoom, drawn on first use
+    rasterize
+        kind of terrain in each cell
+    sample
+        kind of terrain at coords, open outside battlefield
+    cost
+        marching speed multiplier at coords
+    cover
+        hit chance multiplier of troops at coords
+    """
+
+    def __init__(self, size, features=(), cell=TR_CELL):
+        self.features = list(features)
+        self.size = size
+        self.cell = cell
+        self.surface = pygame.Surface(size)
+        self.surface.fill(BG_COLOR)
+        self.draw(self.surface)
+        self.pictures = {1: self.surface}
+        self.kinds = self.rasterize()
+
+    def draw(self, screen, scale=1, colors=None):
+        # draw features onto Surface, colors = kind to flat fill color
+        picture = colors is None
+        colors = COLORS if picture else colors
+        town = assets.get("town")[0]
+        townSize = town.get_rect().size
+        if picture:
+            town = assets.zoomed(town, scale)
+        for kind, x1, y1, x2, y2, start, stop, width in self.features:
+            color = colors.get(kind)
+            width = max(1, round(width * scale))
+            if kind == "fleche":
+                box = pygame.Rect(x1 * scale, y1 * scale,
+                                  (x2 - x1) * scale, (y2 - y1) * scale)
+                if picture:
+                    pygame.draw.arc(screen, color, box, start * math.pi,
+                                    stop * math.pi, width)
+                else:
+                    # troops inside a fleche are covered by it
+                    pygame.draw.ellipse(screen, color, box)
+            elif kind in ("river", "road"):
+                pygame.draw.line(screen, color, (x1 * scale, y1 * scale),
+                                 (x2 * scale, y2 * scale), width)
+            elif kind == "town":
+                box = pygame.Rect(x1 * scale, y1 * scale,
+                                  townSize[0] * scale, townSize[1] * scale)
+                if picture:
+                    screen.blit(town, box)
+                else:
+                    screen.fill(color, box)
+
+    def picture(self, zoom):
+        # picture of terrain drawn at zoom, drawn on first use
+        if zoom not in self.pictures:
+            size = [round(i * zoom) for i in self.size]
+            surface = pygame.Surface(size)
+            surface.fill(BG_COLOR)
+            self.draw(surface, zoom)
+            self.pictures[zoom] = surface
+        return self.pictures[zoom]
+
+    def rasterize(self):
+        # kind of terrain in each cell, later features cover earlier ones
+        shape = (math.ceil(self.size[0] / self.cell),
+                 math.ceil(self.size[1] / self.cell))
+        raster = pygame.Surface(shape)
+        raster.fill((0, 0, 0))
+        colors = {kind: (k, 0, 0) for k, kind in enumerate(KINDS)}
+        self.draw(raster, 1 / self.cell, colors)
+        return pygame.surfarray.array_red(raster).astype(np.uint8)
+
+    def sample(self, coords):
+        # kind of terrain at coords, open outside battlefield
+        cells = np.floor(np.asarray(coords) / self.cell).astype(int)
+        inside = ((cells >= 0) & (cells < self.kinds.shape)).all(axis=-1)
+        cells = np.where(inside[..., None], cells, 0)
+        kinds = self.kinds[cells[..., 0], cells[..., 1]]
+        return np.where(inside, kinds, 0)
+
+    def cost(self, coords):
+        # marching speed multiplier at coords
+        return COST[self.sample(coords)]
+
+    def cover(self, coords):
+        # hit chance multiplier of troops at coords
+        return COVER[self.sample(coords)]
+
+
+def loadTerrain(file, size):
+    """read terrain features of a level
+
+    Parameters
+    ----------
+    file : str
+        path of scenario, its terrain section has columns kind, x1, y1, x2,
+        y2, start, stop, width
+    size : tuple of int
+        width, height of battlefield in pixels
+
+    Returns
+    -------
+    Terrain
+        features compiled into picture and raster
+    """
+    table = loadTable(file, TERRAIN, "terrain")
+    return Terrain(size, zip(*(table[name].tolist() for name in TERRAIN)))
@@ -0,0 +1,78 @@
+import os
+# replays are never drawn, must be set before settings makes the screen
+os.environ.setdefault("MUSKETCRAFT_HEADLESS", "1")
+import numpy as np  # noqa: E402
+from settings import SCREEN  # noqa: E402
+from battlestate import state, COLUMNS  # noqa: E402
+from projectiles import SHOT_COLUMNS  # noqa: E402
+from game_functions import simulate, spawn  # noqa: E402
+from level import loadLevel  # noqa: E402
+from commandlog import commands  # noqa: E402
+from replay import Replay  # noqa: E402
+
+LEVEL = "Skirmish"  # fights from the first tick, reinforced at tick 150
+SEED = 11
+TICKS = 900
+PERIOD = 200  # ticks between keyframes, some taken with shots in flight
+CHECKS = (210, 500, 700, TICKS)  # ticks state is compared at
+
+
+def columns():
+    # copy of every BattleState column of rows in use, losses and shots in
+    # flight
+    kept = {name: getattr(state, name)[:state.count].copy()
+            for name in COLUMNS}
+    kept["losses"] = state.losses.copy()
+    active = state.shots.active.copy()
+    kept.update({"shots." + name: getattr(state.shots, name)[active].copy()
+                 for name in SHOT_COLUMNS})
+    return kept
+
+
+def mismatched(expected):
+    # names of columns that differ from expected
+    now = columns()
+    return [name for name in expected
+            if not np.array_equal(expected[name], now[name], equal_nan=True)]
+
+
+def record(file):
+    # run the battle straight, record it to file, keep state at start
+    # and at CHECKS
+    state.reset(seed=SEED)
+    flags = []
+    units = loadLevel(SCREEN, flags, LEVEL)
+    [state.roster.add(unit) for unit in units]
+    commands.record(LEVEL, SEED, units, file, PERIOD)
+    kept = {0: columns()}
+    for tick in range(TICKS):
+        if state.tick == 400:
+            commands.spawn("c", "green", (700, 520))
+            spawn(units, SCREEN, flags, "c", "green", (700, 520))
+        simulate(units, flags)
+        if state.tick in CHECKS:
+            kept[state.tick] = columns()
+    commands.save()
+    commands.stop()
+    return kept
+
+
+def test_seek_matches_straight_run(tmp_path):
+    file = str(tmp_path / "battle.replay")
+    kept = record(file)
+    # both sides lost men, troops died and units were spawned by the
+    # event and the hotkey, so fire, morale rolls and spawns are covered
+    assert state.losses.min() > 0
+    assert not kept[TICKS]["alive"].all()
+    assert len(state.events.fired) == 1
+    assert kept[TICKS]["alive"].size > kept[0]["alive"].size
+    # from the start
+    replay = Replay(file)
+    replay.seek(TICKS)
+    assert mismatched(kept[TICKS]) == []
+    # from the keyframe before each check, back and forth
+    replay = Replay(file)
+    for tick in (700, 210, 500, TICKS):
+        replay.seek(tick)
+        assert mismatched(kept[tick]) == [], tick
+    commands.stop()
@@ -0,0 +1,59 @@
+import numpy as np
+from rng import philox, binomial, CounterRandom, RS_FIRE
+
+
+def words(*values):
+    # uint32 array of hex words
+    return np.array(values, dtype=np.uint32)
+
+
+def test_philox_zero():
+    # known answer of Philox4x32-10, counter and key zero
+    block = philox(words(0, 0, 0, 0), words(0, 0))
+    expected = words(0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)
+    assert np.array_equal(block, expected)
+
+
+def test_philox_pi():
+    # known answer of Philox4x32-10, counter and key digits of pi
+    counter = words(0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344)
+    block = philox(counter, words(0xa4093822, 0x299f31d0))
+    expected = words(0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)
+    assert np.array_equal(block, expected)
+
+
+def test_philox_blocks():
+    # many blocks at once give the bits of each block on its own
+    counter = np.arange(40, dtype=np.uint32).reshape(10, 4)
+    key = words(0xa4093822, 0x299f31d0)
+    many = philox(counter, key)
+    assert np.array_equal(many, [philox(block, key) for block in counter])
+
+
+def test_binomial_moments():
+    # mean and variance match n p and n p (1 - p), p on both sides of .5
+    u = np.random.default_rng(0).random(50000)
+    for n, p in ((20, .3), (20, .8), (100, .05)):
+        draws = binomial(n, p, u)
+        assert draws.min() >= 0 and draws.max() <= n
+        assert abs(draws.mean() - n * p) < .02 * n * p
+        assert abs(draws.var() - n * p * (1 - p)) < .05 * n * p * (1 - p)
+
+
+def test_binomial_edges():
+    # no tries, no chance and certain success
+    u = np.linspace(0, 1, 11, endpoint=False)
+    assert (binomial(0, .5, u) == 0).all()
+    assert (binomial(10, 0, u) == 0).all()
+    assert (binomial(10, 1, u) == 10).all()
+
+
+def test_draws_by_key():
+    # a draw depends on its key only, not on what else is drawn with it
+    rng = CounterRandom(seed=12345)
+    rows = np.arange(50)
+    together = rng.binomial(RS_FIRE, rows, 7, 3, 30, .4)
+    alone = [rng.binomial(RS_FIRE, row, 7, 3, 30, .4) for row in rows]
+    assert np.array_equal(together, alone)
+    again = CounterRandom(seed=12345).uniform(RS_FIRE, rows, 7)
+    assert np.array_equal(rng.uniform(RS_FIRE, rows, 7), again)
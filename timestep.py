@@ -0,0 +1,58 @@
+import pygame
+
+
+class FixedStep():
+    """Clock running the simulation at a fixed tick rate
+
+    Time passed between frames is added to lag, and as many whole ticks as
+    fit in lag are simulated before drawing. A slow frame only delays
+    drawing, the ticks it missed are caught up on next frame. Lag beyond
+    maxLag is dropped, so a machine too slow for the tick rate slows the
+    game down instead of never drawing.
+
+    Attributes
+    ----------
+    tickRate : float, > 0
+        simulation ticks per second
+    step : float, > 0
+        milliseconds per tick
+    frameCap : int, >= 0
+        most frames per second, 0 = no cap
+    maxLag : float, > 0
+        most milliseconds of ticks kept waiting to be simulated
+    clock : pygame.time.Clock
+        measures time between frames, waits to keep frame cap
+    lag : float, >= 0
+        milliseconds passed that have not been simulated yet
+
+    Properties
+    ----------
+    alpha : float, 0 - 1
+        fraction of a tick passed since the last tick, for drawing
+
+    Methods
+    -------
+    steps
+        number of ticks to simulate before the next frame
+    """
+
+    def __init__(self, tickRate, frameCap, maxLag):
+        self.tickRate = tickRate
+        self.step = 1000 / tickRate
+        self.frameCap = frameCap
+        self.maxLag = maxLag
+        self.clock = pygame.time.Clock()
+        self.lag = 0
+
+    @property
+    def alpha(self):
+        # fraction of a tick passed since the last tick, for drawing
+        return min(self.lag / self.step, 1)
+
+    def steps(self):
+        # number of ticks to simulate before the next frame
+        self.lag = min(self.lag + self.clock.tick(self.frameCap),
+                       self.maxLag)
+        count = int(self.lag // self.step)
+        self.lag -= count * self.step
+        return count